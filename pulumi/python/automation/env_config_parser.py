@@ -5,7 +5,7 @@ operations using the Pulumi Automation API.
 """
 
 import os
-from typing import Optional, Mapping
+from typing import Optional, Mapping, Dict, List, Tuple
 from configparser import ConfigParser
 
 import stack_config_parser
@@ -14,31 +14,58 @@ import stack_config_parser
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Default path to the MARA environment file
 DEFAULT_PATH = os.path.abspath(os.path.sep.join([SCRIPT_DIR, '..', '..', '..', 'config', 'pulumi', 'environment']))
+# Default path to the per-user environment file that overrides values in the MARA environment file
+DEFAULT_USER_PATH = os.path.expanduser(os.path.sep.join(['~', '.config', 'mara', 'environment']))
+# Source names used for values that were not read from an environment file
+DEFAULTS_SOURCE = '<defaults>'
+PROCESS_ENV_SOURCE = '<process environment>'
 
 # Default environment variables set for all Pulumi executions invoked by the Automation API
 DEFAULT_ENV_VARS = {
     'PULUMI_SKIP_UPDATE_CHECK': 'true'
 }
 
+# Parsed environment files keyed by path - each entry is invalidated when the file's mtime or size changes
+_parsed_files: Dict[str, Tuple[Tuple[int, int], Mapping[str, str]]] = {}
+
 
 class EnvConfig(dict):
     """Object containing environment variables used when executing operations with the Pulumi Automation API"""
 
     _stack_config: Optional[stack_config_parser.PulumiStackConfig] = None
     config_path: Optional[str] = None
+    sources: Dict[str, str]
 
     def __init__(self,
                  env_vars: Mapping[str, str],
                  file_vars: Mapping[str, str],
                  stack_config: Optional[stack_config_parser.PulumiStackConfig] = None,
-                 config_path: Optional[str] = None) -> None:
+                 config_path: Optional[str] = None,
+                 override_layers: Optional[List[Tuple[str, Mapping[str, str]]]] = None) -> None:
         super().__init__()
-        self.update(DEFAULT_ENV_VARS)
-        self.update(env_vars)
-        self.update(file_vars)
+        self.sources = {}
+        self._update_from_source(DEFAULT_ENV_VARS, DEFAULTS_SOURCE)
+        self._update_from_source(env_vars, PROCESS_ENV_SOURCE)
+        self._update_from_source(file_vars, config_path or '<file>')
+        for layer_path, layer_vars in override_layers or []:
+            self._update_from_source(layer_vars, layer_path)
         self._stack_config = stack_config
         self.config_path = config_path
 
+    def _update_from_source(self, values: Mapping[str, str], source: str):
+        self.update(values)
+        for key in values.keys():
+            self.sources[key] = source
+
+    def source_of(self, key: str) -> Optional[str]:
+        """Returns the name of the source (file path or pseudo-source) that the value of the given key was read from"""
+        return self.sources.get(key)
+
+    def file_sources(self) -> Mapping[str, str]:
+        """Returns a mapping of each key read from an environment file to the path of the file that set it"""
+        return {key: source for key, source in self.sources.items()
+                if source not in (DEFAULTS_SOURCE, PROCESS_ENV_SOURCE)}
+
     def stack_name(self) -> str:
         """Returns the stack name used in the environment"""
         return self.get('PULUMI_STACK')
@@ -55,11 +82,19 @@ class EnvConfig(dict):
             return 'auto'
 
 
-def read(config_file_path: str = DEFAULT_PATH) -> EnvConfig:
-    """Reads the contents of the specified file path into a new instance of `EnvConfig`.
+def parse_file(config_file_path: str) -> Mapping[str, str]:
+    """Parses the KEY=VALUE pairs in the specified environment file. Parsed results are cached and only re-parsed
+    when the modification time or size of the file changes.
     :param config_file_path: path to environment variable file
-    :return: new instance of EnvConfig
+    :return: mapping of the keys and values in the file
     """
+    stat = os.stat(config_file_path)
+    file_version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _parsed_files.get(config_file_path)
+    if cached and cached[0] == file_version:
+        return cached[1]
+
     config_parser = ConfigParser()
     config_parser.optionxform = lambda option: option
 
@@ -73,4 +108,43 @@ def read(config_file_path: str = DEFAULT_PATH) -> EnvConfig:
 
         config_parser.read_string(content)
 
-    return EnvConfig(env_vars=os.environ, file_vars=config_parser['main'], config_path=config_file_path)
+    file_vars = dict(config_parser['main'])
+    _parsed_files[config_file_path] = (file_version, file_vars)
+    return file_vars
+
+
+def stack_override_path(config_file_path: str, stack_name: str) -> str:
+    """Path to the environment file that overrides the values in the given environment file for a single stack"""
+    return f'{config_file_path}.{stack_name}'
+
+
+def read(config_file_path: str = DEFAULT_PATH,
+         user_config_file_path: Optional[str] = DEFAULT_USER_PATH) -> EnvConfig:
+    """Reads the contents of the specified file path into a new instance of `EnvConfig`. Values are layered in the
+    following order, with later layers overriding earlier ones:
+
+    1. the default environment variables and the environment of the current process
+    2. the environment file at the specified path
+    3. the per-stack environment file (`<config_file_path>.<PULUMI_STACK>`), if present
+    4. the per-user environment file (`~/.config/mara/environment` by default), if present
+
+    :param config_file_path: path to environment variable file
+    :param user_config_file_path: path to per-user environment variable file
+    :return: new instance of EnvConfig
+    """
+    file_vars = parse_file(config_file_path)
+    override_layers = []
+
+    stack_name = file_vars.get('PULUMI_STACK') or os.environ.get('PULUMI_STACK')
+    layer_paths = [stack_override_path(config_file_path, stack_name)] if stack_name else []
+    if user_config_file_path:
+        layer_paths.append(user_config_file_path)
+
+    for layer_path in layer_paths:
+        try:
+            override_layers.append((layer_path, parse_file(layer_path)))
+        except FileNotFoundError:
+            continue
+
+    return EnvConfig(env_vars=os.environ, file_vars=file_vars, config_path=config_file_path,
+                     override_layers=override_layers)
@@ -26,13 +26,15 @@ import yaml
 
 import env_config_parser
 import headers
+import preflight
 from typing import List, Optional
 from getpass import getpass
 
+from kic_util import pulumi_config
 from providers.base_provider import Provider, InvalidConfigurationException
 from providers.pulumi_project import PulumiProject, PulumiProjectEventParams
 from pulumi import automation as auto
-from typing import Any, Hashable, Dict, Union
+from typing import Any, Hashable, Dict, Union, Mapping
 
 import stack_config_parser
 
@@ -225,11 +227,8 @@ def main():
         env_config = env_config_parser.read()
 
     if env_config.stack_name() is None:
-        # Found file, if there is no stack we append it
-        try:
-            env_config = env_config_parser.read()
-        except FileNotFoundError:
-            sys.exit(2)
+        # Found file, if there is no stack we append it. The parsed file is cached until its mtime changes, so
+        # reading it back in after the append only re-parses the file that was modified.
         append_env(env_config, stack_name)
         env_config = env_config_parser.read()
     elif env_config.stack_name() != stack_name:
@@ -238,12 +237,15 @@ def main():
         RUNNER_LOG.error(msg, stack_name, env_config.stack_name())
         sys.exit(2)
 
+    for key, source in env_config.file_sources().items():
+        RUNNER_LOG.debug('environment key [%s] set by: %s', key, source)
+
     stack_config = read_stack_config(provider=provider, env_config=env_config)
 
     validate_with_verbosity = operation == 'validate' or debug_on
     try:
         validate(provider=provider, env_config=env_config, stack_config=stack_config,
-                 verbose=validate_with_verbosity)
+                 verbose=validate_with_verbosity, use_cache=operation != 'validate')
     except Exception as e:
         RUNNER_LOG.error('Validation failed: %s', e)
         sys.exit(3)
@@ -269,6 +271,7 @@ def main():
     if pulumi_cmd:
         init_secrets(env_config=env_config,
                      pulumi_projects=provider.execution_order())
+        resolve_pulumi_user(env_config)
         try:
             pulumi_cmd(provider=provider, env_config=env_config)
         except Exception as e:
@@ -357,78 +360,102 @@ def prompt_for_stack_config(provider: Provider,
 def validate(provider: Provider,
              env_config: env_config_parser.EnvConfig,
              stack_config: Optional[stack_config_parser.PulumiStackConfig],
-             verbose: Optional[bool] = False):
+             verbose: Optional[bool] = False,
+             use_cache: Optional[bool] = True):
     """Validates that the runtime environment for MARA is correct. Will validate that external tools are present and
-    configurations are correct. If validation fails, an exception will be raised.
+    configurations are correct. The checks are run concurrently and if any fail, an exception describing every failure
+    will be raised. A passing validation is remembered for a few minutes, so that it is not repeated needlessly.
     :param provider: reference to infrastructure provider
     :param env_config: reference to environment configuration
     :param stack_config: reference to stack configuration
     :param verbose: flag to enable verbose output mode
+    :param use_cache: flag to skip validation if the same configuration recently passed validation
     """
+    cache_key = preflight.fingerprint({
+        'provider': provider.infra_type(),
+        'env': {key: env_config.get(key) for key in env_config.file_sources().keys()},
+        'path': env_config.get('PATH'),
+        'credentials': preflight.credential_fingerprints(env_config),
+        'stack_config': stack_config
+    })
+    if use_cache and preflight.recently_passed(cache_key):
+        RUNNER_LOG.debug('Configuration passed validation within the last %d seconds - skipping validation',
+                         preflight.PASS_TTL_SECONDS)
+        return
 
-    # First, we validate that we have the right tools installed
-    def check_path(cmd: str, fail_message: str) -> bool:
-        cmd_path = shutil.which(cmd)
-        if cmd_path:
+    # Validate presence of required tools
+    def check_path(cmd: str, fail_message: str) -> preflight.Check:
+        def check():
+            cmd_path = shutil.which(cmd)
+            if not cmd_path:
+                raise FileNotFoundError(f'[{cmd}] is not installed - {fail_message}')
             RUNNER_LOG.debug('[%s] found at path: %s', cmd, cmd_path)
-            return True
-        else:
-            RUNNER_LOG.error('[%s] is not installed - %s', cmd, fail_message)
-            return False
 
-    success = True
+        return preflight.Check(name=f'{cmd} installed', func=check)
 
-    # Validate presence of required tools
-    if not check_path('make', 'it must be installed if you intend to build NGINX Ingress Controller from source'):
-        success = False
-    if not check_path('docker', 'it must be installed if you intend to build NGINX Ingress Controller from source'):
-        success = False
-    if not check_path('node', 'NodeJS is required to run required Pulumi modules, install in order to continue'):
-        success = False
-
-    if not success:
-        sys.exit(3)
-
-    # Next, we validate that the environment file has the required values
-    try:
-        provider.validate_env_config(env_config)
-    except InvalidConfigurationException as e:
-        if e.key == 'PULUMI_STACK':
-            msg = 'Environment file [%s] does not contain the required key PULUMI_STACK. This key specifies the ' \
-                  'name of the Pulumi Stack (https://www.pulumi.com/docs/intro/concepts/stack/) that is used ' \
-                  'globally across Pulumi projects in MARA.'
-        else:
-            msg = 'Environment file [%s] failed validation'
-
-        RUNNER_LOG.error(msg, env_config.config_path)
-        raise e
-    if verbose:
-        RUNNER_LOG.debug(
-            'environment file [%s] passed validation', env_config.config_path)
+    # Validate that the environment file has the required values
+    def check_env_config():
+        try:
+            provider.validate_env_config(env_config)
+        except InvalidConfigurationException as e:
+            if e.key == 'PULUMI_STACK':
+                msg = 'Environment file [%s] does not contain the required key PULUMI_STACK. This key specifies ' \
+                      'the name of the Pulumi Stack (https://www.pulumi.com/docs/intro/concepts/stack/) that is ' \
+                      'used globally across Pulumi projects in MARA.'
+            else:
+                msg = 'Environment file [%s] failed validation'
 
-    if not stack_config:
+            RUNNER_LOG.error(msg, env_config.config_path)
+            raise e
+        if verbose:
+            RUNNER_LOG.debug('environment file [%s] passed validation', env_config.config_path)
+
+    # Validate that the stack was not already used with a different provider
+    def check_infra_type():
+        if 'kubernetes:infra_type' in stack_config['config']:
+            previous_provider = stack_config['config']['kubernetes:infra_type']
+            if previous_provider.lower() != provider.infra_type().lower():
+                raise InvalidConfigurationException(
+                    f'Stack has already been used with the provider [{previous_provider}], so it cannot be run '
+                    f'with the specified provider [{provider.infra_type()}]. Destroy all resources and remove the '
+                    'kubernetes:infra_type key from the stack configuration.', key='kubernetes:infra_type')
+
+    # Validate the stack configuration - this often involves authenticating with the infrastructure provider
+    def check_stack_config():
+        try:
+            provider.validate_stack_config(stack_config, env_config)
+        except (Exception, SystemExit) as e:
+            RUNNER_LOG.error('Stack configuration file [%s] at path failed validation', stack_config.config_path)
+            raise e
+        if verbose:
+            RUNNER_LOG.debug('Stack configuration file [%s] passed validation', stack_config.config_path)
+
+    checks = [
+        check_path('make', 'it must be installed if you intend to build NGINX Ingress Controller from source'),
+        check_path('docker', 'it must be installed if you intend to build NGINX Ingress Controller from source'),
+        check_path('node', 'NodeJS is required to run required Pulumi modules, install in order to continue'),
+        preflight.Check(name='environment configuration', func=check_env_config)
+    ]
+
+    if stack_config:
+        checks.append(preflight.Check(name='provider', func=check_infra_type))
+        checks.append(preflight.Check(name='stack configuration', func=check_stack_config))
+    else:
         RUNNER_LOG.debug('stack configuration is not available')
-        return False
 
-    if 'kubernetes:infra_type' in stack_config['config']:
-        previous_provider = stack_config['config']['kubernetes:infra_type']
-        if previous_provider.lower() != provider.infra_type().lower():
-            RUNNER_LOG.error('Stack has already been used with the provider [%s], so it cannot '
-                             'be run with the specified provider [%s]. Destroy all resources '
-                             'and remove the kubernetes:infra_type key from the stack configuration.',
-                             previous_provider, provider.infra_type())
-            sys.exit(3)
+    results = preflight.run_checks(checks)
+    for result in results:
+        if result.passed():
+            RUNNER_LOG.debug('Check [%s] passed in %.2fs', result.name, result.duration)
+        else:
+            RUNNER_LOG.error('Check [%s] failed in %.2fs: %s', result.name, result.duration, result.error_message())
 
-    try:
-        provider.validate_stack_config(stack_config, env_config)
-    except Exception as e:
-        RUNNER_LOG.error(
-            'Stack configuration file [%s] at path failed validation', stack_config.config_path)
-        raise e
-    if verbose:
-        RUNNER_LOG.debug(
-            'Stack configuration file [%s] passed validation', stack_config.config_path)
+    failures = [result for result in results if not result.passed()]
+    if failures:
+        raise preflight.PreflightError(failures)
 
+    if stack_config:
+        preflight.record_pass(cache_key)
     RUNNER_LOG.debug('All configuration is OK')
 
 
@@ -452,23 +479,67 @@ def init_secrets(env_config: env_config_parser.EnvConfig,
         project_name='secrets',
         work_dir=secrets_work_dir)
 
+    current_config = stack.get_all_config()
+    desired_config = {}
+
     for project in pulumi_projects:
         if not project.config_keys_with_secrets:
             continue
         for secret_config_key in project.config_keys_with_secrets:
-            if secret_config_key.key_name not in stack.get_all_config().keys():
-                if secret_config_key.default:
-                    prompt = f'{secret_config_key.prompt} [{secret_config_key.default}]: '
-                else:
-                    prompt = f'{secret_config_key.prompt}: '
-
-                value = getpass(prompt)
-                if secret_config_key.default and value.strip() == '':
-                    value = secret_config_key.default
-
-                config_value = auto.ConfigValue(secret=True, value=value)
-                stack.set_config(secret_config_key.key_name,
-                                 value=config_value)
+            if secret_config_key.key_name in current_config.keys() or secret_config_key.key_name in desired_config:
+                continue
+
+            if secret_config_key.default:
+                prompt = f'{secret_config_key.prompt} [{secret_config_key.default}]: '
+            else:
+                prompt = f'{secret_config_key.prompt}: '
+
+            value = getpass(prompt)
+            if secret_config_key.default and value.strip() == '':
+                value = secret_config_key.default
+
+            desired_config[secret_config_key.key_name] = auto.ConfigValue(secret=True, value=value)
+
+    push_stack_config(stack=stack, desired_config=desired_config, current_config=current_config)
+
+
+def resolve_pulumi_user(env_config: env_config_parser.EnvConfig):
+    """Resolves the Pulumi user once and passes it to every Pulumi project through the environment, so that each
+    project does not need to query the Pulumi backend for it again.
+    :param env_config: reference to environment configuration
+    """
+    if env_config.get(pulumi_config.PULUMI_USER_ENV_VAR):
+        return
+
+    try:
+        env_config[pulumi_config.PULUMI_USER_ENV_VAR] = pulumi_config.get_pulumi_user(env=env_config)
+    except pulumi_config.PulumiExecError as e:
+        # Each project will attempt to resolve the user itself, so this is not fatal
+        RUNNER_LOG.warning('unable to resolve Pulumi user: %s', e)
+
+
+def push_stack_config(stack: auto.Stack,
+                      desired_config: Mapping[str, auto.ConfigValue],
+                      current_config: Optional[Mapping[str, auto.ConfigValue]] = None) -> \
+        stack_config_parser.ConfigDiff:
+    """Writes only the configuration values that differ from the current configuration of the stack. All changed
+    values are written with a single call to the Pulumi CLI, and no call is made when nothing changed.
+    :param stack: reference to the stack to update
+    :param desired_config: configuration values that should be present in the stack
+    :param current_config: current configuration of the stack; read from the stack when not specified
+    :return: the differences that were applied
+    """
+    if current_config is None:
+        current_config = stack.get_all_config()
+
+    config_diff = stack_config_parser.diff_config(desired=desired_config, current=current_config)
+    if config_diff.has_changes():
+        stack.set_all_config(config_diff.changes())
+        RUNNER_LOG.info('Stack [%s] configuration updated: %s', stack.name, config_diff.summary())
+    else:
+        RUNNER_LOG.debug('Stack [%s] configuration unchanged: %s', stack.name, config_diff.summary())
+
+    return config_diff
 
 
 def build_pulumi_stack(pulumi_project: PulumiProject,
@@ -0,0 +1,134 @@
+"""
+This file defines the primitives used to run the pre-flight validation checks of the MARA runner. Checks are
+independent of each other, so they are run concurrently and every failure is reported at once. A successful
+validation is remembered for a short time so that repeated invocations of the runner do not pay for the same
+(often network bound) checks again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Mapping, Any
+
+from providers.options_cache import DEFAULT_CACHE_DIR, credential_fingerprint
+
+# Number of seconds for which a successful validation is remembered
+PASS_TTL_SECONDS = 5 * 60
+# Directory in which successful validations are recorded
+PASS_CACHE_DIR = os.path.sep.join([os.path.dirname(DEFAULT_CACHE_DIR), 'validation'])
+# Maximum number of checks run at the same time
+MAX_CONCURRENT_CHECKS = 8
+# Environment variables selecting the credentials, profile or cluster that the checks run against, which may be set
+# in the process environment rather than in the environment file
+CREDENTIAL_ENV_KEYS = ['AWS_PROFILE', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN',
+                       'AWS_DEFAULT_REGION', 'AWS_REGION', 'AWS_ENDPOINT_URL', 'AWS_CONFIG_FILE',
+                       'AWS_SHARED_CREDENTIALS_FILE', 'DIGITALOCEAN_TOKEN', 'LINODE_TOKEN', 'KUBECONFIG',
+                       'PULUMI_ACCESS_TOKEN', 'PULUMI_BACKEND_URL']
+
+
+class Check:
+    """A single named validation check - the check function raises an exception when validation fails"""
+    name: str
+    func: Callable[[], Any]
+
+    def __init__(self, name: str, func: Callable[[], Any]) -> None:
+        self.name = name
+        self.func = func
+
+
+class CheckResult:
+    """Outcome of running a single validation check"""
+    name: str
+    duration: float
+    error: Optional[BaseException]
+
+    def __init__(self, name: str, duration: float, error: Optional[BaseException] = None) -> None:
+        self.name = name
+        self.duration = duration
+        self.error = error
+
+    def passed(self) -> bool:
+        return self.error is None
+
+    def error_message(self) -> str:
+        if isinstance(self.error, SystemExit):
+            return f'exited with status {self.error.code}'
+        return str(self.error)
+
+
+class PreflightError(Exception):
+    """Error thrown when one or more validation checks failed"""
+    failures: List[CheckResult]
+
+    def __init__(self, failures: List[CheckResult]) -> None:
+        self.failures = failures
+        details = '; '.join([f'[{failure.name}] {failure.error_message()}' for failure in failures])
+        super().__init__(f'{len(failures)} check(s) failed: {details}')
+
+
+def _run_check(check: Check) -> CheckResult:
+    start = time.perf_counter()
+    try:
+        check.func()
+        return CheckResult(name=check.name, duration=time.perf_counter() - start)
+    # Providers may call sys.exit() when they find a problem, that is captured as a failure of the
+    # check rather than allowed to terminate the runner before the other checks complete
+    except (Exception, SystemExit) as e:
+        return CheckResult(name=check.name, duration=time.perf_counter() - start, error=e)
+
+
+def run_checks(checks: List[Check]) -> List[CheckResult]:
+    """Runs all of the passed checks concurrently.
+    :param checks: checks to run
+    :return: result of each check in the same order as the checks were passed
+    """
+    if not checks:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(checks), MAX_CONCURRENT_CHECKS)) as executor:
+        return list(executor.map(_run_check, checks))
+
+
+def fingerprint(inputs: Mapping[str, Any]) -> str:
+    """Returns a fingerprint of all of the inputs that determine the outcome of a validation"""
+    serialized = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def credential_fingerprints(env: Mapping[str, str]) -> Mapping[str, str]:
+    """Returns a non-reversible fingerprint of each credential environment variable, so that a validation that
+    passed with one set of credentials is not reused for another"""
+    return {key: credential_fingerprint(env.get(key)) for key in CREDENTIAL_ENV_KEYS}
+
+
+def _marker_path(key: str) -> str:
+    return os.path.join(PASS_CACHE_DIR, f'{key}.passed')
+
+
+def recently_passed(key: str, ttl_seconds: int = PASS_TTL_SECONDS) -> bool:
+    """Returns true if a validation with the given fingerprint passed within the time-to-live"""
+    try:
+        return time.time() - os.path.getmtime(_marker_path(key)) < ttl_seconds
+    except OSError:
+        return False
+
+
+def record_pass(key: str):
+    """Records that a validation with the given fingerprint passed by writing a marker file whose modification time
+    is the time of the pass"""
+    try:
+        os.makedirs(PASS_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PASS_CACHE_DIR, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(key)
+            os.replace(tmp_path, _marker_path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        # Not being able to record a pass only means that the next run validates again
+        pass
@@ -6,18 +6,34 @@ import json
 import logging
 import os
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from kic_util import external_process
 from typing import List, Optional, Union, Hashable, Dict, Any, Mapping
 
 from .base_provider import PulumiProject, Provider, InvalidConfigurationException
 from .pulumi_project import PulumiProjectEventParams
+from .update_kubeconfig import update_kubeconfig
+from .options_cache import ProviderOptionsCache
+
+# botocore is installed as a dependency of the AWS CLI, when it is available the AWS API is
+# called in-process rather than paying the startup cost of the AWS CLI for each call.
+try:
+    import botocore.session
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    botocore = None
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 RUNNER_LOG = logging.getLogger('runner')
 AUTH_ERR_MSG = '''Unable to authenticate to AWS with provided credentials. Are the settings in your ~/.aws/credentials 
 correct? Error: %s
 '''
+# Version of the client authentication API written to kubeconfig files for EKS clusters
+KUBECONFIG_EXEC_API_VERSION = 'client.authentication.k8s.io/v1beta1'
+
 
 class AwsProviderException(Exception):
     pass
@@ -68,6 +84,129 @@ class AwsCli:
         return f"{self.base_cmd()} ec2 describe-availability-zones --filter " \
                f"'Name=state,Values=available' --zone-ids"
 
+    def validate_credentials(self) -> Optional[str]:
+        """
+        Verifies that AWS has valid credentials
+        :return: error message if the credentials are not valid, otherwise None
+        """
+        _, err = external_process.run(cmd=self.validate_credentials_cmd(), suppress_error=True)
+        return err or None
+
+    def list_azs(self) -> List[str]:
+        """
+        Lists the AWS availability zones that can be provisioned to by the current user
+        :return: list of availability zone names
+        """
+        az_data, _ = external_process.run(self.list_azs_cmd())
+        return AwsCli._zone_names(json.loads(az_data)['AvailabilityZones'])
+
+    def update_kubeconfig(self, cluster_name: str, env: Mapping[str, str]) -> str:
+        """
+        Adds or updates the credentials for the passed cluster name in the kubeconfig
+        :param cluster_name: name of the cluster to add to the kubeconfig
+        :param env: map environment variables to get KUBECONFIG from
+        :return: output describing the change made
+        """
+        res, _ = external_process.run(self.update_kubeconfig_cmd(cluster_name))
+        return res
+
+    @staticmethod
+    def _zone_names(zones: List[Mapping[str, Any]]) -> List[str]:
+        return [zone['ZoneName'] for zone in zones if zone['ZoneType'] == 'availability-zone']
+
+
+class AwsSdk(AwsCli):
+    """AWS CLI compatible helper class that calls the AWS API in-process using a single reused botocore session"""
+    endpoint_url: Optional[str]
+
+    def __init__(self, region: Optional[str] = None, profile: Optional[str] = None,
+                 endpoint_url: Optional[str] = None):
+        super().__init__(region=region, profile=profile)
+        self.endpoint_url = endpoint_url
+        self._session = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name: str):
+        """
+        Returns a client for the given AWS service - clients are created once and are safe to share between threads
+        :param service_name: name of the AWS service (e.g. sts, ec2, eks)
+        :return: botocore client for the service
+        """
+        with self._lock:
+            if not self._session:
+                self._session = botocore.session.Session(profile=self.profile or None)
+            if service_name not in self._clients:
+                self._clients[service_name] = self._session.create_client(service_name,
+                                                                          region_name=self.region or None,
+                                                                          endpoint_url=self.endpoint_url)
+            return self._clients[service_name]
+
+    def validate_credentials(self) -> Optional[str]:
+        try:
+            self.client('sts').get_caller_identity()
+            return None
+        except (BotoCoreError, ClientError) as e:
+            return str(e)
+
+    def list_azs(self) -> List[str]:
+        response = self.client('ec2').describe_availability_zones(
+            Filters=[{'Name': 'state', 'Values': ['available']}])
+        return AwsCli._zone_names(response['AvailabilityZones'])
+
+    def update_kubeconfig(self, cluster_name: str, env: Mapping[str, str]) -> str:
+        cluster = self.client('eks').describe_cluster(name=cluster_name)['cluster']
+        if cluster.get('status') not in ['ACTIVE', 'UPDATING']:
+            raise AwsProviderException(f"EKS cluster [{cluster_name}] status is {cluster.get('status')}")
+
+        # The kubeconfig entries mirror the ones written by `aws eks update-kubeconfig`
+        arn = cluster['arn']
+        user_exec = OrderedDict([
+            ('apiVersion', KUBECONFIG_EXEC_API_VERSION),
+            ('args', ['--region', arn.split(':')[3], 'eks', 'get-token', '--cluster-name', cluster_name]),
+            ('command', 'aws')
+        ])
+        if self.profile:
+            user_exec['env'] = [OrderedDict([('name', 'AWS_PROFILE'), ('value', self.profile)])]
+
+        kubeconfig = {
+            'clusters': [OrderedDict([
+                ('cluster', OrderedDict([
+                    ('certificate-authority-data', cluster.get('certificateAuthority', {'data': ''})['data']),
+                    ('server', cluster.get('endpoint'))
+                ])),
+                ('name', arn)
+            ])],
+            'users': [OrderedDict([('name', arn), ('user', OrderedDict([('exec', user_exec)]))])],
+            'contexts': [{'name': arn}]
+        }
+        update_kubeconfig(cluster_name=arn, env=env, kubeconfig=kubeconfig)
+        return ''
+
+
+# Helper instances are cached so that the same session and clients are reused for every call made by the runner
+_aws_helpers: Dict[tuple, AwsCli] = {}
+
+
+def aws_helper(region: Optional[str] = None,
+               profile: Optional[str] = None,
+               endpoint_url: Optional[str] = None) -> AwsCli:
+    """
+    Returns a helper that calls the AWS API in-process when botocore is available, otherwise one that uses the
+    AWS CLI.
+    :param region: AWS region
+    :param profile: AWS profile
+    :param endpoint_url: alternative AWS API endpoint (e.g. a local stand-in for testing); in-process only
+    :return: AWS helper instance
+    """
+    key = (region, profile, endpoint_url)
+    if key not in _aws_helpers:
+        if botocore:
+            _aws_helpers[key] = AwsSdk(region=region, profile=profile, endpoint_url=endpoint_url)
+        else:
+            _aws_helpers[key] = AwsCli(region=region, profile=profile)
+    return _aws_helpers[key]
+
 
 class AwsProvider(Provider):
     """AWS infrastructure provider"""
@@ -108,19 +247,31 @@ class AwsProvider(Provider):
         if aws_profile != 'none':
             config['aws:profile'] = aws_profile
 
-        aws_cli = AwsCli(region=aws_region, profile=aws_profile)
+        aws = aws_helper(region=aws_region, profile=config.get('aws:profile'),
+                         endpoint_url=env_config.get('AWS_ENDPOINT_URL'))
 
-        _, err = external_process.run(cmd=aws_cli.validate_credentials_cmd(), suppress_error=True)
-        if err:
-            RUNNER_LOG.error(AUTH_ERR_MSG, err.lstrip())
-            sys.exit(3)
+        # The availability zone listing is cached on disk per region and set of credentials
+        credential = f"{config.get('aws:profile', '')}:{env_config.get('AWS_ACCESS_KEY_ID', '')}"
+        options_cache = ProviderOptionsCache(provider='aws', credential=credential)
+
+        def list_azs() -> List[str]:
+            zones_json = options_cache.fetch(key=f'availability-zones:{aws_region}',
+                                             func=lambda: json.dumps(aws.list_azs()))
+            return json.loads(zones_json)
 
-        # AWS availability zones
-        az_data, _ = external_process.run(aws_cli.list_azs_cmd())
-        zones = []
-        for zone in json.loads(az_data)['AvailabilityZones']:
-            if zone['ZoneType'] == 'availability-zone':
-                zones.append(zone['ZoneName'])
+        # Credentials are validated while the availability zones are being listed, so that
+        # the two API round-trips overlap
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            validate_future = executor.submit(aws.validate_credentials)
+            zones_future = executor.submit(list_azs)
+
+            err = validate_future.result()
+            if err:
+                RUNNER_LOG.error(AUTH_ERR_MSG, err.lstrip())
+                sys.exit(3)
+
+            # AWS availability zones
+            zones = zones_future.result()
 
         def validate_selected_azs(selected: List[str]) -> bool:
             for az in selected:
@@ -188,8 +339,9 @@ class AwsProvider(Provider):
             raise InvalidConfigurationException('When using the AWS provider, the region [aws:region] '
                                                 'must be specified')
 
-        aws_cli = AwsCli(region=config['aws:region'], profile=config['aws:profile'])
-        _, err = external_process.run(cmd=aws_cli.validate_credentials_cmd(), suppress_error=True)
+        aws = aws_helper(region=config['aws:region'], profile=config.get('aws:profile'),
+                         endpoint_url=env_config.get('AWS_ENDPOINT_URL'))
+        err = aws.validate_credentials()
         if err:
             RUNNER_LOG.error(AUTH_ERR_MSG, err.lstrip())
             sys.exit(3)
@@ -199,12 +351,16 @@ class AwsProvider(Provider):
         if 'cluster_name' not in params.stack_outputs:
             raise AwsProviderException('Cannot find key [cluster_name] in stack output')
 
-        aws_cli = AwsCli(region=params.config.get('aws:region').value,
-                         profile=params.config.get('aws:profile').value)
+        def config_value(key: str) -> Optional[str]:
+            return params.config[key].value if key in params.config else None
+
+        aws = aws_helper(region=config_value('aws:region'),
+                         profile=config_value('aws:profile'),
+                         endpoint_url=params.env_config.get('AWS_ENDPOINT_URL'))
         cluster_name = params.stack_outputs['cluster_name'].value
-        cmd = aws_cli.update_kubeconfig_cmd(cluster_name)
-        res, err = external_process.run(cmd)
-        print(res)
+        res = aws.update_kubeconfig(cluster_name=cluster_name, env=params.env_config)
+        if res:
+            print(res)
 
 
 INSTANCE = AwsProvider()
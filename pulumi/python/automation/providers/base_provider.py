@@ -33,7 +33,8 @@ class Provider:
             return file.is_file() and \
                    not file.stem.endswith('base_provider') and \
                    not file.stem.endswith('pulumi_project') and \
-                   not file.stem.endswith('update_kubeconfig')
+                   not file.stem.endswith('update_kubeconfig') and \
+                   not file.stem.endswith('options_cache')
 
         path = pathlib.Path(SCRIPT_DIR)
         return [os.path.splitext(file.stem)[0] for file in path.iterdir() if is_provider(file)]
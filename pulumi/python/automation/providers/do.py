@@ -12,6 +12,8 @@ from kic_util import external_process
 
 from .base_provider import PulumiProject, Provider, InvalidConfigurationException
 from .pulumi_project import PulumiProjectEventParams
+from .options_cache import ProviderOptionsCache
+from .update_kubeconfig import update_kubeconfig
 
 
 class DigitalOceanProviderException(Exception):
@@ -48,14 +50,6 @@ class DoctlCli:
         """
         return f'{self.base_cmd()} auth init'
 
-    def save_kubernetes_cluster_cmd(self, cluster_name: str) -> str:
-        """
-        Returns the command used to update the kubeconfig with the passed cluster name
-        :param cluster_name: name of the cluster to add to the kubeconfig
-        :return: command to be executed
-        """
-        return f'{self.base_cmd()} kubernetes cluster config save {cluster_name}'
-
     def get_kubernetes_versions_json(self) -> str:
         """
         Returns the command that lists the Kubernetes versions available.
@@ -129,9 +123,15 @@ class DigitalOceanProvider(Provider):
         # FQDN
         config['kic-helm:fqdn'] = input(f'Fully qualified domain name (FQDN) for application: ')
 
+        # The option listings are read-only and rarely change, so they are cached on disk and any
+        # expired listings are refreshed concurrently
+        options_cache = ProviderOptionsCache(provider='do', credential=token)
+        options = options_cache.run_all({'versions': do_cli.get_kubernetes_versions_json(),
+                                         'regions': do_cli.get_kubernetes_regions_json(),
+                                         'sizes': do_cli.get_kubernetes_instance_sizes_json()})
+
         # Kubernetes versions
-        k8s_versions_json_str, _ = external_process.run(do_cli.get_kubernetes_versions_json())
-        k8s_versions_json = json.loads(k8s_versions_json_str)
+        k8s_versions_json = json.loads(options['versions'])
         k8s_version_slugs = [version['slug'] for version in k8s_versions_json]
 
         print('Supported Kubernetes versions:')
@@ -142,8 +142,7 @@ class DigitalOceanProvider(Provider):
         print(f"Kubernetes version: {config['docean:k8s_version']}")
 
         # Kubernetes regions
-        k8s_regions_json_str, _ = external_process.run(do_cli.get_kubernetes_regions_json())
-        k8s_regions_json = json.loads(k8s_regions_json_str)
+        k8s_regions_json = json.loads(options['regions'])
         default_region = defaults['docean:region'] or k8s_regions_json[-1]['slug']
 
         print('Supported Regions:')
@@ -153,8 +152,7 @@ class DigitalOceanProvider(Provider):
         print(f"Region: {config['docean:region']}")
 
         # Kubernetes instance size
-        k8s_sizes_json_str, _ = external_process.run(do_cli.get_kubernetes_instance_sizes_json())
-        k8s_sizes_json = json.loads(k8s_sizes_json_str)
+        k8s_sizes_json = json.loads(options['sizes'])
         k8s_sizes_slugs = [size['slug'] for size in k8s_sizes_json]
         default_size = defaults['docean:instance_size'] or 's-2vcpu-4gb'
 
@@ -189,26 +187,18 @@ class DigitalOceanProvider(Provider):
 
     @staticmethod
     def _update_kubeconfig(params: PulumiProjectEventParams):
-        if 'cluster_name' not in params.stack_outputs:
-            raise DigitalOceanProviderException('Cannot find key [cluster_name] in stack output')
-
+        if 'kubeconfig' not in params.stack_outputs:
+            raise DigitalOceanProviderException('Cannot find key [kubeconfig] in stack output')
+
+        # The stack already outputs the full kubeconfig, so it is merged into the local kubectl
+        # configuration in-process rather than by running kubectl and doctl. Unlike the configuration
+        # saved by doctl, which uses doctl as an exec credential plugin, the merged configuration contains
+        # a static Digital Ocean token that expires. Once it has expired, this hook (or
+        # `doctl kubernetes cluster kubeconfig save <cluster>`) must be run again to refresh it.
         kubeconfig = yaml.safe_load(params.stack_outputs['kubeconfig'].value)
         full_cluster_name = kubeconfig['clusters'][0]['name']
 
-        res, _ = external_process.run('kubectl config get-clusters')
-        clusters = filter(lambda cluster: cluster != 'NAME', res.splitlines())
-
-        if full_cluster_name in clusters:
-            print(f'Local kubectl configuration already has credentials for cluster {full_cluster_name}')
-        else:
-            print(f'Adding credentials for cluster {full_cluster_name} to local kubectl configuration')
-            cluster_name = params.stack_outputs['cluster_name'].value
-            token = DigitalOceanProvider.token(stack_config=params.config, env_config=params.env_config)
-            do_cli = DoctlCli(access_token=token)
-
-            res, _ = external_process.run(do_cli.save_kubernetes_cluster_cmd(cluster_name))
-            if res:
-                print(res)
+        update_kubeconfig(env=params.env_config, cluster_name=full_cluster_name, kubeconfig=kubeconfig)
 
     @staticmethod
     def token(stack_config: Union[Mapping[str, Any], MutableMapping[str, auto._config.ConfigValue]],
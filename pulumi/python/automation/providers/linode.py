@@ -8,10 +8,9 @@ from typing import List, Union, Dict, Hashable, Any, Mapping, MutableMapping
 import yaml
 from pulumi import automation as auto
 
-from kic_util import external_process
-
 from .base_provider import PulumiProject, Provider, InvalidConfigurationException
 from .pulumi_project import PulumiProjectEventParams, SecretConfigKey
+from .options_cache import ProviderOptionsCache
 
 from .update_kubeconfig import update_kubeconfig
 
@@ -106,26 +105,28 @@ class LinodeProvider(Provider):
         config['linode:soa_email'] = input(f'DNS Start of Authority (SOA) email address for container registry domain: ').strip()
         print(f"SOA email address: {config['linode:soa_email']}")
 
+        # The option listings are read-only and rarely change, so they are cached on disk and any
+        # expired listings are refreshed concurrently
+        options_cache = ProviderOptionsCache(provider='linode', credential=token)
+        options = options_cache.run_all({'versions': linode_cli.get_k8s_versions(),
+                                         'regions': linode_cli.get_regions(),
+                                         'instance_types': linode_cli.get_instance_sizes()},
+                                        env=cli_env)
+
         # Kubernetes versions
-        k8s_version_list, _ = external_process.run(cmd=linode_cli.get_k8s_versions(),
-                                                   env=cli_env)
-        print(f'Supported Kubernetes versions:\n{k8s_version_list}')
+        print(f"Supported Kubernetes versions:\n{options['versions']}")
         default_version = defaults['linode:k8s_version'] or '1.22'
         config['linode:k8s_version'] = input(f'Kubernetes version [{default_version}]: ').strip() or default_version
         print(f"Kubernetes version: {config['linode:k8s_version']}")
 
         # Region
-        regions_list, _ = external_process.run(cmd=linode_cli.get_regions(),
-                                               env=cli_env)
-        print(f'Supported regions:\n{regions_list}')
+        print(f"Supported regions:\n{options['regions']}")
         default_region = defaults['linode:region'] or 'us-central'
         config['linode:region'] = input(f'Region [{default_region}]: ').strip() or default_region
         print(f"Region: {config['linode:region']}")
 
         # Instance Type
-        instance_type_list, _ = external_process.run(cmd=linode_cli.get_instance_sizes(),
-                                                     env=cli_env)
-        print(f'Supported instance types:\n{instance_type_list}')
+        print(f"Supported instance types:\n{options['instance_types']}")
         default_type = defaults['linode:instance_type'] or 'g6-standard-8'
         config['linode:instance_type'] = input(f'Instance type [{default_type}]: ').strip() or default_type
         print(f"Instance type: {config['linode:instance_type']}")
@@ -176,15 +177,16 @@ class LinodeProvider(Provider):
 
     @staticmethod
     def _update_kubeconfig(params: PulumiProjectEventParams):
-        if 'cluster_name' not in params.stack_outputs:
-            raise LinodeProviderException('Cannot find key [cluster_name] in stack output')
+        if 'kubeconfig' not in params.stack_outputs:
+            raise LinodeProviderException('Cannot find key [kubeconfig] in stack output')
 
-        cluster_name = params.stack_outputs['cluster_name'].value
         kubeconfig_encoded = params.stack_outputs['kubeconfig'].value
         kubeconfig_bytes = base64.b64decode(kubeconfig_encoded)
         kubeconfig = yaml.safe_load(kubeconfig_bytes)
+        # Entries in the kubeconfig are named after the LKE cluster id rather than the Pulumi resource name
+        full_cluster_name = kubeconfig['clusters'][0]['name']
 
-        update_kubeconfig(env=params.env_config, cluster_name=cluster_name, kubeconfig=kubeconfig)
+        update_kubeconfig(env=params.env_config, cluster_name=full_cluster_name, kubeconfig=kubeconfig)
 
 
 INSTANCE = LinodeProvider()
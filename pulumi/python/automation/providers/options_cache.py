@@ -0,0 +1,129 @@
+"""
+This file contains an on-disk cache for the read-only option listings (Kubernetes versions, regions, instance
+sizes, etc.) that infrastructure providers query from their CLI tools when creating a new stack configuration.
+These listings rarely change, so caching them makes creating subsequent stacks near-instant.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Mapping, Dict
+
+from kic_util import external_process
+
+# Default directory in which cached option listings are stored
+DEFAULT_CACHE_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                      'mara', 'provider_options'])
+# Default number of seconds for which a cached option listing is considered fresh
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Maximum number of expired entries refreshed at the same time
+MAX_CONCURRENT_REFRESHES = 4
+RUNNER_LOG = logging.getLogger('runner')
+
+
+def credential_fingerprint(credential: Optional[str]) -> str:
+    """Returns a non-reversible fingerprint of a credential so that it can be used as part of a cache key without
+    being written to disk.
+    :param credential: API token or other value identifying the credentials used to run a command
+    :return: hex encoded fingerprint
+    """
+    if not credential:
+        return 'anonymous'
+    return hashlib.sha256(credential.encode('utf-8')).hexdigest()[:16]
+
+
+class ProviderOptionsCache:
+    """Persistent cache with a time-to-live for the output of read-only provider commands. Entries are keyed by
+    provider, command and credential fingerprint."""
+    provider: str
+    fingerprint: str
+    cache_dir: str
+    ttl_seconds: int
+
+    def __init__(self,
+                 provider: str,
+                 credential: Optional[str] = None,
+                 cache_dir: str = DEFAULT_CACHE_DIR,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 runner=external_process.run) -> None:
+        self.provider = provider
+        self.fingerprint = credential_fingerprint(credential)
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.runner = runner
+
+    def entry_path(self, key: str) -> str:
+        """Path to the file storing the cached value for the given key"""
+        digest = hashlib.sha256(f'{self.provider}\0{key}\0{self.fingerprint}'.encode('utf-8')).hexdigest()
+        return os.path.sep.join([self.cache_dir, f'{self.provider}-{digest}.json'])
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value for the given key if it exists and has not expired, otherwise None"""
+        try:
+            with open(self.entry_path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl_seconds:
+            return None
+
+        return entry.get('value')
+
+    def put(self, key: str, value: str):
+        """Stores the value for the given key - the write is atomic so that concurrent readers never see a
+        partially written entry"""
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.entry_')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'created': time.time(), 'provider': self.provider, 'value': value}, f)
+            os.replace(temp_path, self.entry_path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def fetch(self, key: str, func: Callable[[], str]) -> str:
+        """Returns the cached value for the given key, calling the passed function to refresh it when it is missing
+        or expired.
+        :param key: cache key
+        :param func: function returning the current value
+        :return: cached or refreshed value
+        """
+        value = self.get(key)
+        if value is not None:
+            RUNNER_LOG.debug('using cached %s options for: %s', self.provider, key)
+            return value
+
+        value = func()
+        try:
+            self.put(key, value)
+        except OSError as e:
+            RUNNER_LOG.warning('unable to cache %s options in %s: %s', self.provider, self.cache_dir, e)
+        return value
+
+    def run(self, cmd: str, env: Optional[Mapping[str, str]] = None) -> str:
+        """Returns the STDOUT of the passed command from the cache, running the command when needed"""
+        return self.fetch(key=cmd, func=lambda: self.runner(cmd=cmd, env=env)[0])
+
+    def run_all(self, cmds: Mapping[str, str], env: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+        """Returns the STDOUT of each of the passed commands, running every missing or expired command concurrently.
+        :param cmds: mapping of a name to the command to run
+        :param env: environment to run the commands with
+        :return: mapping of each name to the output of its command
+        """
+        results = {name: self.get(cmd) for name, cmd in cmds.items()}
+        stale = [name for name, value in results.items() if value is None]
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(len(stale), MAX_CONCURRENT_REFRESHES)) as executor:
+                futures = {name: executor.submit(self.run, cmds[name], env) for name in stale}
+                for name, future in futures.items():
+                    results[name] = future.result()
+
+        return results
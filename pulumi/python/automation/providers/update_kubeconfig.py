@@ -43,6 +43,7 @@ def update_kubeconfig(cluster_name: str, env: Mapping[str, str], kubeconfig: Map
     config_selector = KubeconfigSelector(env_variable=env.get('KUBECONFIG', ''),
                                          path_in=None)
     config = config_selector.choose_kubeconfig(cluster_name)
+    updating_existing = config.has_cluster(cluster_name)
 
     appender = KubeconfigAppender()
     new_context_dict = appender.insert_cluster_user_pair(config=config,
@@ -53,7 +54,7 @@ def update_kubeconfig(cluster_name: str, env: Mapping[str, str], kubeconfig: Map
     writer = KubeconfigWriter()
     writer.write_kubeconfig(config)
 
-    if config.has_cluster(cluster_name):
+    if updating_existing:
         LOG.info('Updated context %s in %s', new_context_dict["name"], config.path)
     else:
         LOG.info('Added new context %s to %s', new_context_dict["name"], config.path)
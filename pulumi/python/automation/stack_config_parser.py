@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Optional, MutableMapping
+from typing import Optional, MutableMapping, Mapping, Dict, List
 
 from pulumi.automation import ConfigValue
 
@@ -20,6 +20,59 @@ class EmptyConfigurationException(RuntimeError):
         self.filename = filename
 
 
+class ConfigDiff:
+    """Object containing the differences between the desired configuration of a Pulumi stack and its current
+    configuration. Keys present in the current configuration but absent from the desired configuration are left
+    untouched because they may have been set by another source (e.g. `pulumi config set`)."""
+
+    added: Dict[str, ConfigValue]
+    changed: Dict[str, ConfigValue]
+    unchanged: List[str]
+
+    def __init__(self) -> None:
+        self.added = {}
+        self.changed = {}
+        self.unchanged = []
+
+    def has_changes(self) -> bool:
+        return len(self.added) > 0 or len(self.changed) > 0
+
+    def changes(self) -> MutableMapping[str, ConfigValue]:
+        """Returns the configuration values that need to be written to the stack in order to bring it up to date"""
+        changes = {}
+        changes.update(self.added)
+        changes.update(self.changed)
+        return changes
+
+    def summary(self) -> str:
+        """Returns a single line summary of the changes - secret values are never included"""
+        text = f'{len(self.added)} added, {len(self.changed)} changed, {len(self.unchanged)} unchanged'
+        keys = [f'+{key}' for key in sorted(self.added.keys())] + [f'~{key}' for key in sorted(self.changed.keys())]
+        if keys:
+            text += f" ({', '.join(keys)})"
+        return text
+
+
+def diff_config(desired: Mapping[str, ConfigValue], current: Mapping[str, ConfigValue]) -> ConfigDiff:
+    """Compares the desired configuration of a stack to its current configuration.
+    :param desired: configuration values that should be present in the stack
+    :param current: configuration values currently set in the stack (e.g. from `Stack.get_all_config()`)
+    :return: the keys that need to be added or changed
+    """
+    config_diff = ConfigDiff()
+
+    for key, desired_val in desired.items():
+        current_val = current.get(key)
+        if current_val is None:
+            config_diff.added[key] = desired_val
+        elif str(current_val.value) != str(desired_val.value) or current_val.secret != desired_val.secret:
+            config_diff.changed[key] = desired_val
+        else:
+            config_diff.unchanged.append(key)
+
+    return config_diff
+
+
 class PulumiStackConfig(dict):
     """Object containing the configuration parameters used by Pulumi to stand up projects. When this file is loaded by
     Pulumi within the context of a project execution, it is *not* loaded into this object. This object is used only by
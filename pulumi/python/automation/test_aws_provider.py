@@ -0,0 +1,96 @@
+import os
+import socket
+import tempfile
+import unittest
+
+import yaml
+
+from providers import aws
+
+try:
+    from moto.server import ThreadedMotoServer
+except ImportError:
+    ThreadedMotoServer = None
+
+TEST_CREDENTIALS = '''[default]
+aws_access_key_id = testing
+aws_secret_access_key = testing
+
+[mara]
+aws_access_key_id = testing
+aws_secret_access_key = testing
+'''
+
+
+@unittest.skipIf(aws.botocore is None or ThreadedMotoServer is None,
+                 'botocore and moto are required to run the AWS API against a local stand-in')
+class TestAwsSdk(unittest.TestCase):
+    server = None
+    endpoint_url = None
+    orig_credentials_file = None
+    tmp_dir = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        credentials_path = os.path.join(cls.tmp_dir.name, 'credentials')
+        with open(credentials_path, 'w') as f:
+            f.write(TEST_CREDENTIALS)
+        cls.orig_credentials_file = os.environ.get('AWS_SHARED_CREDENTIALS_FILE')
+        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = credentials_path
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        cls.server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+        cls.server.start()
+        cls.endpoint_url = f'http://127.0.0.1:{port}'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+        cls.tmp_dir.cleanup()
+        if cls.orig_credentials_file is None:
+            os.environ.pop('AWS_SHARED_CREDENTIALS_FILE', None)
+        else:
+            os.environ['AWS_SHARED_CREDENTIALS_FILE'] = cls.orig_credentials_file
+
+    def new_sdk(self) -> aws.AwsSdk:
+        return aws.AwsSdk(region='us-west-2', endpoint_url=self.endpoint_url)
+
+    def test_validate_credentials(self):
+        self.assertIsNone(self.new_sdk().validate_credentials())
+
+    def test_list_azs(self):
+        zones = self.new_sdk().list_azs()
+        self.assertIn('us-west-2a', zones)
+
+    def test_clients_are_reused(self):
+        sdk = self.new_sdk()
+        self.assertIs(sdk.client('sts'), sdk.client('sts'))
+
+    def test_aws_helper_is_cached(self):
+        helper = aws.aws_helper(region='us-west-2', endpoint_url=self.endpoint_url)
+        self.assertIsInstance(helper, aws.AwsSdk)
+        self.assertIs(helper, aws.aws_helper(region='us-west-2', endpoint_url=self.endpoint_url))
+
+    def test_update_kubeconfig(self):
+        sdk = aws.AwsSdk(region='us-west-2', profile='mara', endpoint_url=self.endpoint_url)
+        iam_role = 'arn:aws:iam::123456789012:role/eks'
+        sdk.client('eks').create_cluster(name='mara-test', roleArn=iam_role,
+                                         resourcesVpcConfig={'subnetIds': ['subnet-1']})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            kubeconfig_path = os.path.join(tmp_dir, 'config')
+            sdk.update_kubeconfig(cluster_name='mara-test', env={'KUBECONFIG': kubeconfig_path})
+
+            with open(kubeconfig_path, 'r') as f:
+                kubeconfig = yaml.safe_load(f)
+
+        arn = kubeconfig['clusters'][0]['name']
+        self.assertTrue(arn.endswith(':cluster/mara-test'))
+        self.assertEqual(arn, kubeconfig['current-context'])
+        user_exec = kubeconfig['users'][0]['user']['exec']
+        self.assertEqual(['--region', 'us-west-2', 'eks', 'get-token', '--cluster-name', 'mara-test'],
+                         user_exec['args'])
+        self.assertEqual([{'name': 'AWS_PROFILE', 'value': 'mara'}], user_exec['env'])
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import env_config_parser
+
+
+class TestEnvConfigParser(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, 'environment')
+        self.user_config_path = os.path.join(self.tmp_dir.name, 'user_environment')
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def write(self, path: str, content: str):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_read_single_file(self):
+        self.write(self.config_path, 'PULUMI_STACK=mystack\nAWS_PROFILE=default\n')
+        env_config = env_config_parser.read(self.config_path, self.user_config_path)
+        self.assertEqual('mystack', env_config.stack_name())
+        self.assertEqual('default', env_config['AWS_PROFILE'])
+        self.assertEqual(self.config_path, env_config.source_of('AWS_PROFILE'))
+        self.assertEqual(env_config_parser.DEFAULTS_SOURCE, env_config.source_of('PULUMI_SKIP_UPDATE_CHECK'))
+
+    def test_read_with_stack_and_user_layers(self):
+        self.write(self.config_path, 'PULUMI_STACK=mystack\nAWS_PROFILE=default\nAWS_DEFAULT_REGION=us-west-2\n')
+        stack_path = env_config_parser.stack_override_path(self.config_path, 'mystack')
+        self.write(stack_path, 'AWS_DEFAULT_REGION=eu-west-1\nAWS_PROFILE=stack\n')
+        self.write(self.user_config_path, 'AWS_PROFILE=user\n')
+
+        env_config = env_config_parser.read(self.config_path, self.user_config_path)
+        self.assertEqual('eu-west-1', env_config['AWS_DEFAULT_REGION'])
+        self.assertEqual(stack_path, env_config.source_of('AWS_DEFAULT_REGION'))
+        self.assertEqual('user', env_config['AWS_PROFILE'])
+        self.assertEqual(self.user_config_path, env_config.source_of('AWS_PROFILE'))
+        self.assertEqual(self.config_path, env_config.file_sources()['PULUMI_STACK'])
+
+    def test_parse_file_is_cached_until_file_changes(self):
+        self.write(self.config_path, 'PULUMI_STACK=mystack\n')
+        first = env_config_parser.parse_file(self.config_path)
+        second = env_config_parser.parse_file(self.config_path)
+        self.assertIs(first, second)
+
+        with open(self.config_path, 'a') as f:
+            f.write('AWS_PROFILE=default\n')
+        third = env_config_parser.parse_file(self.config_path)
+        self.assertIsNot(first, third)
+        self.assertEqual('default', third['AWS_PROFILE'])
+
+    def test_read_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            env_config_parser.read(self.config_path, self.user_config_path)
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from providers.options_cache import ProviderOptionsCache, credential_fingerprint
+
+
+class TestProviderOptionsCache(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def runner(self, cmd, env=None):
+        with self.lock:
+            self.calls.append(cmd)
+        return f'output of {cmd}', ''
+
+    def new_cache(self, credential='token', ttl_seconds=60) -> ProviderOptionsCache:
+        return ProviderOptionsCache(provider='test', credential=credential, cache_dir=self.tmp_dir.name,
+                                    ttl_seconds=ttl_seconds, runner=self.runner)
+
+    def test_run_caches_output_across_instances(self):
+        self.assertEqual('output of cmd1', self.new_cache().run('cmd1'))
+        self.assertEqual('output of cmd1', self.new_cache().run('cmd1'))
+        self.assertEqual(['cmd1'], self.calls)
+
+    def test_entries_are_keyed_by_credential(self):
+        self.new_cache(credential='token1').run('cmd1')
+        self.new_cache(credential='token2').run('cmd1')
+        self.assertEqual(['cmd1', 'cmd1'], self.calls)
+
+    def test_expired_entries_are_refreshed(self):
+        cache = self.new_cache(ttl_seconds=60)
+        cache.run('cmd1')
+        entry_path = cache.entry_path('cmd1')
+        with open(entry_path, 'r') as f:
+            entry = json.load(f)
+        entry['created'] = time.time() - 120
+        with open(entry_path, 'w') as f:
+            json.dump(entry, f)
+        cache.run('cmd1')
+        self.assertEqual(['cmd1', 'cmd1'], self.calls)
+
+    def test_run_all_only_runs_stale_commands(self):
+        cache = self.new_cache()
+        cache.run('cmd1')
+        results = cache.run_all({'one': 'cmd1', 'two': 'cmd2', 'three': 'cmd3'})
+        self.assertEqual({'one': 'output of cmd1', 'two': 'output of cmd2', 'three': 'output of cmd3'}, results)
+        self.assertEqual(['cmd1', 'cmd2', 'cmd3'], sorted(self.calls))
+
+    def test_credential_is_not_written_to_disk(self):
+        cache = self.new_cache(credential='super-secret-token')
+        cache.run('cmd1')
+        for name in os.listdir(self.tmp_dir.name):
+            with open(os.path.join(self.tmp_dir.name, name), 'r') as f:
+                self.assertNotIn('super-secret-token', f.read())
+        self.assertNotIn('super-secret-token', credential_fingerprint('super-secret-token'))
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import preflight
+
+
+class TestPreflight(unittest.TestCase):
+    def test_run_checks_reports_every_failure(self):
+        def fail():
+            raise ValueError('bad value')
+
+        def exit_check():
+            sys.exit(3)
+
+        checks = [preflight.Check('ok', lambda: None),
+                  preflight.Check('fail', fail),
+                  preflight.Check('exit', exit_check)]
+        results = preflight.run_checks(checks)
+
+        self.assertEqual(['ok', 'fail', 'exit'], [result.name for result in results])
+        self.assertTrue(results[0].passed())
+        self.assertEqual('bad value', results[1].error_message())
+        self.assertEqual('exited with status 3', results[2].error_message())
+
+        error = preflight.PreflightError([result for result in results if not result.passed()])
+        self.assertIn('[fail] bad value', str(error))
+        self.assertIn('[exit] exited with status 3', str(error))
+
+    def test_run_checks_runs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        checks = [preflight.Check(f'check{i}', barrier.wait) for i in range(3)]
+        results = preflight.run_checks(checks)
+        self.assertTrue(all(result.passed() for result in results))
+
+    def test_record_pass(self):
+        orig_dir = preflight.PASS_CACHE_DIR
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            preflight.PASS_CACHE_DIR = tmp_dir
+            try:
+                key = preflight.fingerprint({'provider': 'AWS', 'stack_config': {'config': {'aws:region': 'x'}}})
+                self.assertFalse(preflight.recently_passed(key))
+                preflight.record_pass(key)
+                self.assertTrue(preflight.recently_passed(key))
+                self.assertFalse(preflight.recently_passed(key, ttl_seconds=-1))
+                self.assertEqual([f'{key}.passed'], os.listdir(tmp_dir))
+            finally:
+                preflight.PASS_CACHE_DIR = orig_dir
+
+    def test_credential_fingerprints(self):
+        fingerprints = preflight.credential_fingerprints({'AWS_PROFILE': 'dev', 'LINODE_TOKEN': 'super-secret-token'})
+        self.assertEqual(set(preflight.CREDENTIAL_ENV_KEYS), set(fingerprints))
+        self.assertNotIn('super-secret-token', json.dumps(fingerprints))
+        self.assertNotEqual(preflight.fingerprint({'credentials': fingerprints}),
+                            preflight.fingerprint({'credentials': preflight.credential_fingerprints(
+                                {'AWS_PROFILE': 'prod', 'LINODE_TOKEN': 'super-secret-token'})}))
@@ -0,0 +1,45 @@
+import unittest
+
+from pulumi.automation import ConfigValue
+
+import stack_config_parser
+
+
+class TestStackConfigParser(unittest.TestCase):
+    def test_diff_config_detects_added_changed_and_unchanged(self):
+        desired = {
+            'kic:make_target': ConfigValue(value='debian-image'),
+            'eks:min_size': ConfigValue(value=3),
+            'sirius:ledger_pwd': ConfigValue(value='secret', secret=True),
+        }
+        current = {
+            'kic:make_target': ConfigValue(value='alpine-image'),
+            'eks:min_size': ConfigValue(value='3'),
+            'aws:region': ConfigValue(value='us-west-2'),
+        }
+        config_diff = stack_config_parser.diff_config(desired=desired, current=current)
+
+        self.assertTrue(config_diff.has_changes())
+        self.assertEqual(['sirius:ledger_pwd'], list(config_diff.added.keys()))
+        self.assertEqual(['kic:make_target'], list(config_diff.changed.keys()))
+        self.assertEqual(['eks:min_size'], config_diff.unchanged)
+        self.assertEqual({'sirius:ledger_pwd', 'kic:make_target'}, set(config_diff.changes().keys()))
+
+    def test_diff_config_secret_flag_change_is_a_change(self):
+        desired = {'linode:token': ConfigValue(value='abc', secret=True)}
+        current = {'linode:token': ConfigValue(value='abc', secret=False)}
+        config_diff = stack_config_parser.diff_config(desired=desired, current=current)
+        self.assertEqual(['linode:token'], list(config_diff.changed.keys()))
+
+    def test_diff_config_no_changes(self):
+        desired = {'aws:region': ConfigValue(value='us-west-2')}
+        current = {'aws:region': ConfigValue(value='us-west-2')}
+        config_diff = stack_config_parser.diff_config(desired=desired, current=current)
+        self.assertFalse(config_diff.has_changes())
+        self.assertEqual('0 added, 0 changed, 1 unchanged', config_diff.summary())
+
+    def test_summary_does_not_contain_values(self):
+        desired = {'sirius:ledger_pwd': ConfigValue(value='hunter2', secret=True)}
+        config_diff = stack_config_parser.diff_config(desired=desired, current={})
+        self.assertNotIn('hunter2', config_diff.summary())
+        self.assertIn('+sirius:ledger_pwd', config_diff.summary())
@@ -0,0 +1,62 @@
+import base64
+import os
+import tempfile
+import unittest
+
+import yaml
+from pulumi import automation as auto
+
+from providers.do import DigitalOceanProvider
+from providers.linode import LinodeProvider
+from providers.pulumi_project import PulumiProjectEventParams
+
+
+def kubeconfig_yaml(cluster_name: str, token: str) -> str:
+    return yaml.safe_dump({
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'clusters': [{'name': cluster_name, 'cluster': {'server': f'https://{cluster_name}.example.com'}}],
+        'users': [{'name': f'{cluster_name}-admin', 'user': {'token': token}}],
+        'contexts': [{'name': cluster_name, 'context': {'cluster': cluster_name, 'user': f'{cluster_name}-admin'}}],
+        'current-context': cluster_name
+    })
+
+
+class TestUpdateKubeconfig(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.kubeconfig_path = os.path.join(self.tmp_dir.name, 'config')
+        self.env = {'KUBECONFIG': self.kubeconfig_path}
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def params(self, kubeconfig: str) -> PulumiProjectEventParams:
+        outputs = {'cluster_name': auto.OutputValue(value='cluster', secret=False),
+                   'kubeconfig': auto.OutputValue(value=kubeconfig, secret=False)}
+        return PulumiProjectEventParams(stack_outputs=outputs, config={}, env_config=self.env)
+
+    def read_kubeconfig(self):
+        with open(self.kubeconfig_path, 'r') as f:
+            return yaml.safe_load(f)
+
+    def test_digital_ocean_merges_stack_output(self):
+        DigitalOceanProvider._update_kubeconfig(self.params(kubeconfig_yaml('do-sfo3-mara', 'token1')))
+        DigitalOceanProvider._update_kubeconfig(self.params(kubeconfig_yaml('do-sfo3-other', 'token2')))
+        # Updating an existing cluster replaces its entries rather than adding new ones
+        DigitalOceanProvider._update_kubeconfig(self.params(kubeconfig_yaml('do-sfo3-mara', 'token3')))
+
+        kubeconfig = self.read_kubeconfig()
+        self.assertEqual(['do-sfo3-mara', 'do-sfo3-other'], [c['name'] for c in kubeconfig['clusters']])
+        self.assertEqual('token3', kubeconfig['users'][0]['user']['token'])
+        self.assertEqual('do-sfo3-mara', kubeconfig['current-context'])
+
+    def test_linode_merges_stack_output(self):
+        encoded = base64.b64encode(kubeconfig_yaml('lke1234', 'token1').encode('utf-8')).decode('utf-8')
+        LinodeProvider._update_kubeconfig(self.params(encoded))
+
+        kubeconfig = self.read_kubeconfig()
+        self.assertEqual(['lke1234'], [c['name'] for c in kubeconfig['clusters']])
+        self.assertEqual('lke1234', kubeconfig['current-context'])
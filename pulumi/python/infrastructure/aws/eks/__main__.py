@@ -1,22 +1,15 @@
 import collections
-import os
 
 import pulumi
 import pulumi_aws as aws
 import pulumi_eks as eks
 
 import iam
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 VPCDefinition = collections.namedtuple('VPCDefinition', ['vpc_id', 'public_subnet_ids', 'private_subnet_ids'])
 
 
-def pulumi_vpc_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    vpc_project_path = os.path.join(script_dir, '..', 'vpc')
-    return pulumi_config.get_pulumi_project_name(vpc_project_path)
-
-
 def retrieve_vpc_and_subnets(vpc) -> VPCDefinition:
     pulumi.log.info(f"vpc id: {vpc['id']}")
 
@@ -44,7 +37,7 @@ desired_capacity = config.get_int('desired_capacity') if config.get('desired_cap
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
-vpc_project_name = pulumi_vpc_project_name()
+vpc_project_name = project_index.project_name('infrastructure/aws/vpc')
 pulumi_user = pulumi_config.get_pulumi_user()
 aws_config = pulumi.Config("aws")
 aws_profile = aws_config.get("profile")
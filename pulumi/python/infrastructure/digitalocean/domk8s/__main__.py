@@ -1,5 +1,3 @@
-import os
-
 import pulumi
 from pulumi_digitalocean import KubernetesCluster, KubernetesClusterNodePoolArgs
 
@@ -24,12 +22,6 @@ project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
 
-def container_registry_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', 'container-registry')
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 # Derive our names for the cluster and the pool
 resource_name = f'do-{stack_name}-cluster'
 pool_name = f'do-{stack_name}-pool'
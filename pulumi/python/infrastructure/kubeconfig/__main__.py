@@ -1,18 +1,10 @@
 import pulumi
-import os
 import base64
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 config = pulumi.Config('kubernetes')
 
 
-# Determine directory path
-def project_name_from_project_dir(dirname1: str, dirname2: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'python', 'infrastructure', dirname1, dirname2)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 def get_kubeconfig():
     decoded = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(base64.b64decode(c), 'utf-8'))
     kubeconfig = pulumi.Output.secret(decoded)
@@ -36,7 +28,7 @@ if infra_type == 'AWS':
     stack_name = pulumi.get_stack()
     project_name = pulumi.get_project()
     pulumi_user = pulumi_config.get_pulumi_user()
-    k8_project_name = project_name_from_project_dir('aws', 'eks')
+    k8_project_name = project_index.project_name('infrastructure/aws/eks')
     k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
     k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
     kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
@@ -51,7 +43,7 @@ elif infra_type == 'DO':
     stack_name = pulumi.get_stack()
     project_name = pulumi.get_project()
     pulumi_user = pulumi_config.get_pulumi_user()
-    k8_project_name = project_name_from_project_dir('digitalocean', 'domk8s')
+    k8_project_name = project_index.project_name('infrastructure/digitalocean/domk8s')
     k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
     k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
     kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
@@ -67,7 +59,7 @@ elif infra_type == 'LKE':
     stack_name = pulumi.get_stack()
     project_name = pulumi.get_project()
     pulumi_user = pulumi_config.get_pulumi_user()
-    k8_project_name = project_name_from_project_dir('linode', 'lke')
+    k8_project_name = project_index.project_name('infrastructure/linode/lke')
     k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
     k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
     cluster_name = k8_stack_ref.require_output('cluster_name').apply(lambda c: str(c))
@@ -1,11 +1,10 @@
 import json
-import os
 import base64
 from typing import List
 
 import pulumi
 from pulumi import StackReference
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 import pulumi_kubernetes as k8s
 from pulumi_kubernetes.core.v1 import Secret, SecretInitArgs
 
@@ -13,36 +12,20 @@ from pulumi_kubernetes.core.v1 import Secret, SecretInitArgs
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-
-def project_name_from_kubeconfig():
-    project_path = os.path.join(script_dir, '..', '..', 'kubeconfig')
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_from_same_parent(directory: str):
-    project_path = os.path.join(script_dir, '..', directory)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_of_namespace_project():
-    project_path = os.path.join(script_dir, '..', '..', '..', 'kubernetes', 'nginx', 'ingress-controller-namespace')
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-k8_project_name = project_name_from_kubeconfig()
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
 
-container_registry_stack_ref_id = f"{pulumi_user}/{project_name_from_same_parent('harbor')}/{stack_name}"
+container_registry_project_name = project_index.project_name('infrastructure/linode/harbor')
+container_registry_stack_ref_id = f"{pulumi_user}/{container_registry_project_name}/{stack_name}"
 harbor_stack_ref = StackReference(container_registry_stack_ref_id)
 harbor_hostname_output = harbor_stack_ref.require_output('harbor_hostname')
 harbor_user_output = harbor_stack_ref.require_output('harbor_user')
 harbor_password_output = harbor_stack_ref.require_output('harbor_password')
 
-namespace_stack_ref_id = f"{pulumi_user}/{project_name_of_namespace_project()}/{stack_name}"
+namespace_project_name = project_index.project_name('kubernetes/nginx/ingress-controller-namespace')
+namespace_stack_ref_id = f"{pulumi_user}/{namespace_project_name}/{stack_name}"
 ns_stack_ref = StackReference(namespace_stack_ref_id)
 namespace_name_output = ns_stack_ref.require_output('ingress_namespace_name')
 
@@ -2,25 +2,18 @@ import base64
 import json
 import urllib.request
 import urllib.error
-import os
 import time
 from typing import List
 
 import pulumi
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
 
-def project_name_from_harbor_dir():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', 'harbor')
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-harbor_project_name = project_name_from_harbor_dir()
+harbor_project_name = project_index.project_name('infrastructure/linode/harbor')
 stack_ref_id = f"{pulumi_user}/{harbor_project_name}/{stack_name}"
 stack_ref = pulumi.StackReference(stack_ref_id)
 harbor_hostname_output = stack_ref.require_output('harbor_hostname')
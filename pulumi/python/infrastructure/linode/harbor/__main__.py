@@ -7,7 +7,7 @@ import pulumi
 import pulumi_linode as linode
 import pulumi_kubernetes as k8s
 from pulumi_kubernetes.core.v1 import Secret
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
@@ -44,26 +44,14 @@ harbor_stackscript_id = 912262
 harbor_os_image = 'linode/ubuntu20.04'
 
 
-def project_name_from_kubernetes_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'kubernetes', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_from_infrastructure_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-k8_project_name = project_name_from_infrastructure_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
 k8s_provider = k8s.Provider(resource_name=f'lke-provider',
                             kubeconfig=kubeconfig)
 
-secrets_project_name = project_name_from_kubernetes_dir('secrets')
+secrets_project_name = project_index.project_name('kubernetes/secrets')
 secrets_stack_ref_id = f"{pulumi_user}/{secrets_project_name}/{stack_name}"
 secrets_stack_ref = pulumi.StackReference(secrets_stack_ref_id)
 pulumi_secrets = secrets_stack_ref.require_output('pulumi_secrets')
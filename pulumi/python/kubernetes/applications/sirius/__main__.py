@@ -9,7 +9,7 @@ from Crypto.PublicKey import RSA
 from pulumi_kubernetes.yaml import ConfigFile
 from pulumi_kubernetes.yaml import ConfigGroup
 
-from kic_util import pulumi_config
+from kic_util import stack_references
 
 
 # Removes the status field from the Nginx Ingress Helm Chart, so that i#t is
@@ -19,37 +19,6 @@ def remove_status_field(obj):
         del obj['status']
 
 
-def project_name_from_infrastructure_dir():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    eks_project_path = os.path.join(
-        script_dir, '..', '..', '..', 'infrastructure', 'kubeconfig')
-    return pulumi_config.get_pulumi_project_name(eks_project_path)
-
-
-def project_name_from_kubernetes_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-#
-# This is just used for the kubernetes config deploy....
-#
-
-
-def pulumi_repo_ingress_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    ingress_project_path = os.path.join(
-        script_dir, '..', '..', 'nginx', 'ingress-controller-repo-only')
-    return pulumi_config.get_pulumi_project_name(ingress_project_path)
-
-
-def pulumi_ingress_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    ingress_project_path = os.path.join(
-        script_dir, '..', '..', 'nginx', 'ingress-controller')
-    return pulumi_config.get_pulumi_project_name(ingress_project_path)
-
-
 def sirius_manifests_location():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     sirius_manifests_path = os.path.join(
@@ -94,21 +63,11 @@ def add_namespace(obj):
     obj['metadata']['namespace'] = 'bos'
 
 
-stack_name = pulumi.get_stack()
-project_name = pulumi.get_project()
-k8_project_name = project_name_from_infrastructure_dir()
-pulumi_user = pulumi_config.get_pulumi_user()
-
-k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
-k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
-kubeconfig = k8_stack_ref.get_output('kubeconfig').apply(lambda c: str(c))
-k8_stack_ref.get_output('cluster_name').apply(
+kubeconfig = stack_references.get_output('infrastructure/kubeconfig', 'kubeconfig').apply(lambda c: str(c))
+stack_references.get_output('infrastructure/kubeconfig', 'cluster_name').apply(
     lambda s: pulumi.log.info(f'Cluster name: {s}'))
 
-secrets_project_name = project_name_from_kubernetes_dir('secrets')
-secrets_stack_ref_id = f"{pulumi_user}/{secrets_project_name}/{stack_name}"
-secrets_stack_ref = pulumi.StackReference(secrets_stack_ref_id)
-pulumi_secrets = secrets_stack_ref.require_output('pulumi_secrets')
+pulumi_secrets = stack_references.require_output('kubernetes/secrets', 'pulumi_secrets')
 
 k8s_provider = k8s.Provider(resource_name='ingress-controller')
 
@@ -117,32 +76,23 @@ k8s_provider = k8s.Provider(resource_name='ingress-controller')
 # slightly # different logic path than the mainline. This will be removed once
 # the kubeconfig deploys are moved to the Pulumi Automation API.
 #
-config = pulumi.Config('kubernetes')
-infra_type = config.require('infra_type')
+k8s_config = pulumi.Config('kubernetes')
+infra_type = k8s_config.require('infra_type')
 
 if infra_type == 'kubeconfig':
     #
     # Logic to extract the FQDN of the load balancer for Ingress
     #
-    ingress_project_name = pulumi_repo_ingress_project_name()
-    ingress_stack_ref_id = f"{pulumi_user}/{ingress_project_name}/{stack_name}"
-    ingress_stack_ref = pulumi.StackReference(ingress_stack_ref_id)
-    lb_ingress_hostname = ingress_stack_ref.get_output('lb_ingress_hostname')
-    #
-    # Set back to kubernetes
-    #
-    config = pulumi.Config('kubernetes')
-    lb_ingress_ip = ingress_stack_ref.get_output('lb_ingress_ip')
+    ingress_project_dir = 'kubernetes/nginx/ingress-controller-repo-only'
+    lb_ingress_hostname = stack_references.get_output(ingress_project_dir, 'lb_ingress_hostname')
+    lb_ingress_ip = stack_references.get_output(ingress_project_dir, 'lb_ingress_ip')
     sirius_host = lb_ingress_hostname
 else:
     #
     # We use the hostname to set the value for our FQDN, which drives the cert
     # process as well.
     #
-    ingress_project_name = pulumi_ingress_project_name()
-    ingress_stack_ref_id = f"{pulumi_user}/{ingress_project_name}/{stack_name}"
-    ingress_stack_ref = pulumi.StackReference(ingress_stack_ref_id)
-    lb_ingress_hostname = ingress_stack_ref.get_output('lb_ingress_hostname')
+    lb_ingress_hostname = stack_references.get_output('kubernetes/nginx/ingress-controller', 'lb_ingress_hostname')
     sirius_host = lb_ingress_hostname
 
 #
@@ -424,9 +374,6 @@ bosingress = k8s.networking.v1.Ingress("bosingress",
 # kubeconfig # deployments are moved over to the automation api. Until then,
 # we have to use a different process.
 #
-
-config = pulumi.Config('kubernetes')
-infra_type = config.require('infra_type')
 if infra_type == 'kubeconfig':
     pulumi.export('hostname', lb_ingress_hostname)
     pulumi.export('ipaddress', lb_ingress_ip)
@@ -436,10 +383,8 @@ else:
     pulumi.export('application_url', application_url)
 
 #
-# Get the chart values for both monitoring charts, switch back to the Sirius
-# namespace.
+# Get the chart values for both monitoring charts.
 #
-config = pulumi.Config('sirius')
 chart = config.get('chart')
 if not chart:
     chart = 'prometheus-postgres-exporter'
@@ -1,11 +1,10 @@
-import os
 from pulumi import Output
 
 import pulumi
 import pulumi_kubernetes as k8s
 from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
 
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 config = pulumi.Config('logagent')
 chart_name = config.get('chart_name')
@@ -30,23 +29,11 @@ if not helm_timeout:
     helm_timeout = 300
 
 
-def project_name_from_project_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'python', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def pulumi_logstore_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    logstore_project_path = os.path.join(script_dir, '..', 'logstore')
-    return pulumi_config.get_pulumi_project_name(logstore_project_path)
-
-
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-k8_project_name = project_name_from_project_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
@@ -59,7 +46,7 @@ ns = k8s.core.v1.Namespace(resource_name='logagent',
                            opts=pulumi.ResourceOptions(provider=k8s_provider))
 
 # Logic to extract the FQDN of logstore
-logstore_project_name = pulumi_logstore_project_name()
+logstore_project_name = project_index.project_name('kubernetes/logstore')
 logstore_stack_ref_id = f"{pulumi_user}/{logstore_project_name}/{stack_name}"
 logstore_stack_ref = pulumi.StackReference(logstore_stack_ref_id)
 elastic_hostname = logstore_stack_ref.get_output('elastic_hostname')
@@ -1,11 +1,9 @@
-import os
-
 import pulumi
 import pulumi_kubernetes as k8s
 from pulumi import Output
 from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
 
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 config = pulumi.Config('logstore')
 chart_name = config.get('chart_name')
@@ -51,17 +49,11 @@ if not coordinating_replicas:
     coordinating_replicas = 1
 
 
-def project_name_from_project_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'python', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-k8_project_name = project_name_from_project_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
@@ -1,22 +1,14 @@
-import os
-
 import pulumi
 import pulumi_kubernetes as k8s
 
-from kic_util import pulumi_config
-
-
-def infrastructure_project_name_from_project_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
+from kic_util import pulumi_config, project_index
 
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-k8_project_name = infrastructure_project_name_from_project_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
@@ -7,7 +7,7 @@ from pulumi_kubernetes.core.v1 import Service
 from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
 from pulumi_kubernetes.yaml import ConfigFile
 
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 #
 # We default to the OSS IC; if the user wants Plus they need to enable it in the config file
@@ -48,12 +48,6 @@ if not helm_timeout:
 fqdn = config.get('fqdn')
 
 
-def project_name_from_project_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 def k8_manifest_location():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     k8_manifest_path = os.path.join(script_dir, 'manifests', 'regcred.yaml')
@@ -128,7 +122,7 @@ stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-kube_project_name = project_name_from_project_dir('kubeconfig')
+kube_project_name = project_index.project_name('infrastructure/kubeconfig')
 kube_stack_ref_id = f"{pulumi_user}/{kube_project_name}/{stack_name}"
 kube_stack_ref = pulumi.StackReference(kube_stack_ref_id)
 kubeconfig = kube_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
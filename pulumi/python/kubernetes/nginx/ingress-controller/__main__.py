@@ -1,4 +1,3 @@
-import os
 from typing import Dict, Mapping, Any, Optional
 
 import pulumi
@@ -7,9 +6,7 @@ import pulumi_kubernetes as k8s
 from pulumi_kubernetes.core.v1 import Service
 from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
 
-from kic_util import pulumi_config
-
-script_dir = os.path.dirname(os.path.abspath(__file__))
+from kic_util import pulumi_config, project_index
 
 config = pulumi.Config('kic-helm')
 chart_name = config.get('chart_name')
@@ -36,21 +33,6 @@ if not helm_timeout:
     helm_timeout = 300
 
 
-def infrastructure_project_name_from_project_dir(dirname: str):
-    project_path = os.path.join(script_dir, '..', '..', '..', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_from_utility_dir(dirname: str):
-    project_path = os.path.join(script_dir, '..', '..', '..', 'utility', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_from_same_parent(directory: str):
-    project_path = os.path.join(script_dir, '..', directory)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 def find_image_tag(repository: dict) -> Optional[str]:
     """
     Inspect the repository dictionary as returned from a stack reference for a valid image_tag_alias or image_tag.
@@ -159,17 +141,18 @@ stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-k8_project_name = infrastructure_project_name_from_project_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
 cluster_name = k8_stack_ref.require_output('cluster_name').apply(lambda c: str(c))
 
-namespace_stack_ref_id = f"{pulumi_user}/{project_name_from_same_parent('ingress-controller-namespace')}/{stack_name}"
+namespace_project_name = project_index.project_name('kubernetes/nginx/ingress-controller-namespace')
+namespace_stack_ref_id = f"{pulumi_user}/{namespace_project_name}/{stack_name}"
 ns_stack_ref = StackReference(namespace_stack_ref_id)
 ns_name_output = ns_stack_ref.require_output('ingress_namespace_name')
 
-image_push_project_name = project_name_from_utility_dir('kic-image-push')
+image_push_project_name = project_index.project_name('utility/kic-image-push')
 image_push_ref_id = f"{pulumi_user}/{image_push_project_name}/{stack_name}"
 image_push_ref = StackReference(image_push_ref_id)
 container_repo_push = image_push_ref.get_output('container_repo_push')
@@ -4,7 +4,7 @@ import pulumi
 import pulumi_kubernetes as k8s
 from pulumi_kubernetes.yaml import ConfigGroup
 
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 
 # Removes the status field from the Nginx Ingress Helm Chart, so that i#t is
@@ -14,12 +14,6 @@ def remove_status_field(obj):
         del obj['status']
 
 
-def pulumi_k8_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    eks_project_path = os.path.join(script_dir, '..', '..', '..', 'python', 'infrastructure', 'kubeconfig')
-    return pulumi_config.get_pulumi_project_name(eks_project_path)
-
-
 def otel_operator_location():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     otel_operator_path = os.path.join(script_dir, 'otel-operator', '*.yaml')
@@ -38,7 +32,7 @@ def add_namespace(obj):
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
-k8_project_name = pulumi_k8_project_name()
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 pulumi_user = pulumi_config.get_pulumi_user()
 
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
@@ -9,19 +9,7 @@ from pulumi import Output
 from pulumi_kubernetes.yaml import ConfigGroup
 from pulumi import CustomTimeouts
 
-from kic_util import pulumi_config
-
-
-def project_name_from_infrastructure_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', '..', '..', 'python', 'infrastructure', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
-def project_name_from_kubernetes_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
+from kic_util import pulumi_config, project_index
 
 
 def servicemon_manifests_location():
@@ -43,12 +31,12 @@ stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 
-k8_project_name = project_name_from_infrastructure_dir('kubeconfig')
+k8_project_name = project_index.project_name('infrastructure/kubeconfig')
 k8_stack_ref_id = f"{pulumi_user}/{k8_project_name}/{stack_name}"
 k8_stack_ref = pulumi.StackReference(k8_stack_ref_id)
 kubeconfig = k8_stack_ref.require_output('kubeconfig').apply(lambda c: str(c))
 
-secrets_project_name = project_name_from_kubernetes_dir('secrets')
+secrets_project_name = project_index.project_name('kubernetes/secrets')
 secrets_stack_ref_id = f"{pulumi_user}/{secrets_project_name}/{stack_name}"
 secrets_stack_ref = pulumi.StackReference(secrets_stack_ref_id)
 pulumi_secrets = secrets_stack_ref.require_output('pulumi_secrets')
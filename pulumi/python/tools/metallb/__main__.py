@@ -5,7 +5,7 @@ import ipaddress
 import os
 import pulumi_kubernetes as k8s
 from pulumi_kubernetes.yaml import ConfigFile
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 
 # We need the kubeconfig and cluster name.
 config = pulumi.Config('kubernetes')
@@ -19,12 +19,6 @@ def add_namespace(obj):
     obj['metadata']['namespace'] = 'metallb-system'
 
 
-def pulumi_kube_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    kube_project_path = os.path.join(script_dir, '..', 'common')
-    return pulumi_config.get_pulumi_project_name(kube_project_path)
-
-
 # Where are our manifests?
 def k8_manifest_location():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -34,7 +28,7 @@ def k8_manifest_location():
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
-kube_project_name = pulumi_kube_project_name()
+kube_project_name = project_index.project_name('tools/common')
 pulumi_user = pulumi_config.get_pulumi_user()
 
 kube_stack_ref_id = f"{pulumi_user}/{kube_project_name}/{stack_name}"
@@ -1,7 +1,6 @@
 import pulumi
-import os
 import pulumi_kubernetes as k8s
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
 
 # We need the kubeconfig and cluster name.
@@ -16,15 +15,9 @@ def add_namespace(obj):
     obj['metadata']['namespace'] = 'nfsvols'
 
 
-def pulumi_kube_project_name():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    kube_project_path = os.path.join(script_dir, '..', 'common')
-    return pulumi_config.get_pulumi_project_name(kube_project_path)
-
-
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
-kube_project_name = pulumi_kube_project_name()
+kube_project_name = project_index.project_name('tools/common')
 pulumi_user = pulumi_config.get_pulumi_user()
 
 kube_stack_ref_id = f"{pulumi_user}/{kube_project_name}/{stack_name}"
@@ -1,11 +1,16 @@
+import os
+
 import pulumi
 
+from build_output import write_build_steps_report
 from ingress_controller_image import IngressControllerImage
 from ingress_controller_image_builder_args import IngressControllerImageBuilderArgs
 from ingress_controller_image_puller_args import IngressControllerImagePullerArgs
 from nginx_plus_args import NginxPlusArgs
 
 DEFAULT_KIC = "nginx/nginx-ingress:2.4.2"
+# Directory holding the stack configuration files, as set by config in Pulumi.yaml
+STACK_CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'config', 'pulumi')
 
 stack_name = pulumi.get_stack()
 project_name = pulumi.get_project()
@@ -17,8 +22,12 @@ if not image_origin:
     image_origin = 'registry'
 
 make_target = config.get('make_target')
+make_targets = config.get_object('make_targets')
+max_concurrent_builds = config.get_int('max_concurrent_builds')
 kic_src_url = config.get('src_url')
 always_rebuild = config.get_bool('always_rebuild')
+build_cache = config.get('build_cache')
+build_cache_location = config.get('build_cache_location')
 
 plus_config = config.get_object('nginx_plus')
 if plus_config:
@@ -38,16 +47,43 @@ if image_origin == 'source':
     image_args = IngressControllerImageBuilderArgs(make_target=make_target,
                                                    kic_src_url=kic_src_url,
                                                    always_rebuild=always_rebuild,
-                                                   nginx_plus_args=nginx_plus_args)
+                                                   nginx_plus_args=nginx_plus_args,
+                                                   build_cache=build_cache,
+                                                   build_cache_location=build_cache_location,
+                                                   make_targets=make_targets,
+                                                   max_concurrent_builds=max_concurrent_builds)
 
     # Download KIC source code, run `make`, and build Docker images
     ingress_image = IngressControllerImage(name='nginx-ingress-controller',
                                            kic_image_args=image_args)
+
+    # Record the duration of each build step next to the stack configuration, so that build time can be
+    # compared across KIC versions
+    def write_build_steps(args):
+        kic_src_url, variants = args
+        report = {'stack': stack_name,
+                  'kic_src_url': kic_src_url,
+                  'variants': {make_target: {'image_name': variant.get('image_name'),
+                                             'build_hash': variant.get('build_hash'),
+                                             'build_duration_seconds': variant.get('build_duration_seconds'),
+                                             'build_steps': variant.get('build_steps')}
+                               for make_target, variant in (variants or {}).items()}}
+        write_build_steps_report(os.path.join(STACK_CONFIG_DIR, f'kic-build-steps.{stack_name}.json'), report)
+
+    if not pulumi.runtime.is_dry_run():
+        pulumi.Output.all(ingress_image.kic_src_url, ingress_image.variants).apply(write_build_steps)
 elif image_origin == 'registry':
-    if not config.get('image_name'):
-        image_args = IngressControllerImagePullerArgs(image_name=DEFAULT_KIC)
-    else:
-        image_args = IngressControllerImagePullerArgs(image_name=config.get('image_name'))
+    image_name = config.get('image_name')
+    prepull_images = config.get_object('prepull_images') or []
+    # kic:image_name may also be a list, in which case the first image is the KIC image and the rest are pre-pulled
+    if image_name and image_name.strip().startswith('['):
+        image_names = config.get_object('image_name')
+        image_name = image_names[0] if image_names else None
+        prepull_images = image_names[1:] + prepull_images
+
+    image_args = IngressControllerImagePullerArgs(image_name=image_name or DEFAULT_KIC,
+                                                  prepull_images=prepull_images,
+                                                  max_concurrent_pulls=config.get_int('max_concurrent_pulls'))
 
     ingress_image = IngressControllerImage(name='nginx-ingress-controller',
                                            kic_image_args=image_args)
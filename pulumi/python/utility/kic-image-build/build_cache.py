@@ -0,0 +1,83 @@
+import os
+from enum import Enum
+from typing import Optional, List, Iterable
+
+from build_output import BuildStep
+
+# Directory in which local BuildKit caches are stored when no location is configured
+DEFAULT_LOCAL_CACHE_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                            'mara', 'buildkit'])
+
+
+class BuildCacheMode(Enum):
+    """Ways in which the layers of KIC image builds can be cached between builds"""
+    NONE = 'none'
+    LOCAL = 'local'
+    INLINE = 'inline'
+    REGISTRY = 'registry'
+
+    @staticmethod
+    def from_config(value: Optional[str]) -> 'BuildCacheMode':
+        """
+        :rtype: BuildCacheMode
+        :param value: value of the kic:build_cache setting (defaults to no caching when not set)
+        """
+        if not value:
+            return BuildCacheMode.NONE
+        try:
+            return BuildCacheMode(value.strip().lower())
+        except ValueError:
+            valid = ', '.join(mode.value for mode in BuildCacheMode)
+            raise ValueError(f'unknown build cache mode [{value}] - expected one of: {valid}')
+
+
+def build_cache_options(mode: BuildCacheMode, location: Optional[str] = None, make_target: str = '') -> List[str]:
+    """Returns the docker build options that read and write the build cache in the given mode
+    :param mode: build cache mode
+    :param location: directory (local mode) or image reference (inline and registry modes) of the cache
+    :param make_target: make target being built, which separates the local caches of different variants
+    :return: docker build options
+    """
+    if mode == BuildCacheMode.NONE:
+        return ['--no-cache']
+
+    if mode == BuildCacheMode.LOCAL:
+        cache_dir = location or os.path.join(DEFAULT_LOCAL_CACHE_DIR, make_target or 'default')
+        # Exporting a local cache requires a BuildKit builder using the docker-container driver
+        return [f'--cache-from=type=local,src={cache_dir}',
+                f'--cache-to=type=local,dest={cache_dir},mode=max']
+
+    if mode == BuildCacheMode.INLINE:
+        # The cache metadata is embedded in the built image, so it is reused from wherever the image is pulled
+        options = ['--build-arg=BUILDKIT_INLINE_CACHE=1']
+        if location:
+            options.append(f'--cache-from={location}')
+        return options
+
+    if mode == BuildCacheMode.REGISTRY:
+        if not location:
+            raise ValueError('the registry build cache mode requires kic:build_cache_location to be set to an '
+                             'image reference')
+        return [f'--cache-from=type=registry,ref={location}',
+                f'--cache-to=type=registry,ref={location},mode=max']
+
+    raise ValueError(f'unsupported build cache mode: {mode}')
+
+
+class BuildCacheStats:
+    """Counts the build steps that produce image layers and how many of them were cached, from the steps that a
+    BuildStepTimer read from BuildKit's plain progress output"""
+    total_steps: int
+    cached_steps: int
+
+    def __init__(self, steps: Iterable[BuildStep]) -> None:
+        # Steps that load the build definition and context, and steps outside of any stage such as exporting the
+        # image, are not layers and are never cached
+        layer_steps = [step for step in steps if step.stage and step.stage != 'internal']
+        self.total_steps = len(layer_steps)
+        self.cached_steps = sum(1 for step in layer_steps if step.cached)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of the build steps that were cached"""
+        return self.cached_steps / self.total_steps if self.total_steps else 0.0
@@ -0,0 +1,223 @@
+import json
+import os
+import re
+import shlex
+import tempfile
+from enum import Enum
+from typing import Optional, List, Dict, Any
+
+from kic_util.docker_image_name import DockerImageName
+
+# Longest docker build command (including its continuation lines) that is accumulated while looking for its tag.
+# Anything longer is not a command that make printed, so it is dropped to keep memory use bounded.
+MAX_COMMAND_LENGTH = 64 * 1024
+# Longest build step name kept in outputs - RUN steps are named after their whole command
+MAX_STEP_NAME_LENGTH = 200
+
+
+class _CommandState(Enum):
+    """States of the parser of the docker build command that make prints to STDOUT"""
+    # Looking for the start of a docker build command
+    SEARCHING = 1
+    # Accumulating the continuation lines of a docker build command
+    IN_COMMAND = 2
+    # The image name has been found and the rest of the output is ignored
+    DONE = 3
+
+
+class BuildOutputParser:
+    """Extracts the name and id of the image built by the KIC make targets from the output of make, one line at a
+    time as the lines are produced. Only the docker build command being read is held in memory, so output of any
+    length is parsed in constant memory."""
+    # Matches the start of the docker build command, such as: docker build --build-arg IC_VERSION=2.4.2 ...
+    DOCKER_BUILD_REGEX = re.compile(r'^\s*docker\s+build')
+    # Matches the line of BuildKit output reporting the id of the image, such as: #19 writing image sha256:9358...
+    IMAGE_ID_REGEX = re.compile(r'^\s*#?\d*\s*writing image\s+(?P<hash_algo>sha256)?:?(?P<image_id>[a-f0-9]{64})')
+
+    image_name: Optional[DockerImageName]
+    image_id: Optional[str]
+
+    def __init__(self) -> None:
+        self.image_name = None
+        self.image_id = None
+        self._state = _CommandState.SEARCHING
+        self._command: List[str] = []
+        self._command_length = 0
+
+    def feed_stdout(self, line: str):
+        """Processes a line of the STDOUT of make, which includes the docker build command tagging the image"""
+        if self._state == _CommandState.DONE:
+            return
+
+        if self._state == _CommandState.SEARCHING:
+            if not BuildOutputParser.DOCKER_BUILD_REGEX.match(line):
+                return
+            self._state = _CommandState.IN_COMMAND
+
+        stripped = line.strip()
+        # Skip blank lines because they could imply a line continuation and skip comments because they
+        # would interfere with command parsing
+        if not stripped or stripped.startswith('#'):
+            return
+
+        continued = stripped.endswith('\\')
+        if continued:
+            stripped = stripped[:-1]
+        self._command.append(stripped)
+        self._command_length += len(stripped)
+
+        if self._command_length > MAX_COMMAND_LENGTH:
+            self._reset_command()
+        elif not continued:
+            self.image_name = BuildOutputParser.parse_tag(' '.join(self._command))
+            self._reset_command()
+            if self.image_name:
+                self._state = _CommandState.DONE
+
+    def feed_stderr(self, line: str):
+        """Processes a line of the STDERR of make, which includes the BuildKit progress output"""
+        # Checking for the literal text first avoids running the regular expression on every line of the build
+        if self.image_id or 'writing image' not in line:
+            return
+
+        matches = BuildOutputParser.IMAGE_ID_REGEX.match(line)
+        if matches:
+            self.image_id = f"{matches.group('hash_algo') or 'sha256'}:{matches.group('image_id')}"
+
+    def _reset_command(self):
+        self._state = _CommandState.SEARCHING
+        self._command = []
+        self._command_length = 0
+
+    @staticmethod
+    def parse_tag(cmd: str) -> Optional[DockerImageName]:
+        """Returns the image name that a docker build command tags the image with
+        :param cmd: docker build command
+        :return: image name or None if the command does not tag the image with a name and tag
+        """
+        # Use shlex here to split the command in order to properly handle all sorts of Posix
+        # weirdness and inconsistencies
+        try:
+            args = shlex.split(cmd)
+        except ValueError:
+            return None
+
+        # Either -t or --tag may be given. When an option is repeated, the last value is used.
+        short_tag = None
+        long_tag = None
+        args_iter = iter(args[1:])
+        for arg in args_iter:
+            if arg == '-t':
+                short_tag = next(args_iter, None)
+            elif arg.startswith('-t') and not arg.startswith('--'):
+                short_tag = arg[2:].lstrip('=')
+            elif arg == '--tag':
+                long_tag = next(args_iter, None)
+            elif arg.startswith('--tag='):
+                long_tag = arg[len('--tag='):]
+
+        full_image_name = short_tag or long_tag
+        if not full_image_name:
+            return None
+
+        parts = full_image_name.split(':')
+        # If there aren't two values, that's invalid and we treat that as bad input
+        if len(parts) < 2:
+            return None
+
+        return DockerImageName(repository=':'.join(parts[0:len(parts) - 1]), tag=parts[-1])
+
+
+class BuildStep:
+    """A step of a BuildKit build, as reported in its plain progress output"""
+    number: int
+    stage: str
+    name: str
+    duration_seconds: float
+    cached: bool
+
+    def __init__(self, number: int, stage: str, name: str) -> None:
+        self.number = number
+        self.stage = stage
+        self.name = name
+        self.duration_seconds = 0.0
+        self.cached = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'step': self.number,
+                'stage': self.stage,
+                'name': self.name,
+                'duration_seconds': self.duration_seconds,
+                'cached': self.cached}
+
+
+class BuildStepTimer:
+    """Records the duration of each step of a build and whether it was cached from BuildKit's plain progress
+    output, such as:
+
+        #17 [builder 3/3] RUN CGO_ENABLED=0 go build -o /nginx-ingress
+        #17 0.512 go: downloading github.com/nginxinc/nginx-plus-go-client v0.10.0
+        #17 DONE 95.2s
+    """
+    # Matches the first line of a step, such as: #17 [builder 3/3] RUN ... or #19 exporting to image
+    HEADER_REGEX = re.compile(r'^\s*#(?P<step>\d+)\s+(?:\[(?P<stage>[^\]]+)\]\s*)?(?P<name>[^\d\s].*?)\s*$')
+    # Matches the line ending a step, such as: #17 DONE 95.2s or #16 CACHED
+    RESULT_REGEX = re.compile(r'^\s*#(?P<step>\d+)\s+(?:DONE\s+(?P<seconds>\d+(?:\.\d+)?)s|(?P<cached>CACHED))\s*$')
+    # Matches the number of a stage step, such as the 3/3 of: [builder 3/3]
+    STAGE_POSITION_REGEX = re.compile(r'\s+\d+/\d+$')
+
+    steps: Dict[int, BuildStep]
+
+    def __init__(self) -> None:
+        self.steps = {}
+
+    def feed(self, line: str):
+        """Processes a line of build output"""
+        if '#' not in line:
+            return
+
+        matches = BuildStepTimer.RESULT_REGEX.match(line)
+        if matches:
+            step = self.steps.get(int(matches.group('step')))
+            if step:
+                if matches.group('cached'):
+                    step.cached = True
+                else:
+                    step.duration_seconds = float(matches.group('seconds'))
+            return
+
+        matches = BuildStepTimer.HEADER_REGEX.match(line)
+        if not matches:
+            return
+        number = int(matches.group('step'))
+        name = matches.group('name')
+        # BuildKit repeats the header of a step when its output is interleaved with other steps and follows it with
+        # lines such as "#14 sha256:f7e8..." or "#19 exporting layers done", so only the first line names the step
+        if number in self.steps or name.startswith('sha256:') or name.startswith('ERROR'):
+            return
+        stage = BuildStepTimer.STAGE_POSITION_REGEX.sub('', matches.group('stage') or '')
+        self.steps[number] = BuildStep(number=number, stage=stage, name=name[:MAX_STEP_NAME_LENGTH])
+
+    @property
+    def total_seconds(self) -> float:
+        """Sum of the durations of the steps, which exceeds the elapsed time when stages are built in parallel"""
+        return round(sum(step.duration_seconds for step in self.steps.values()), 1)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Returns the steps in the order that they were numbered"""
+        return [self.steps[number].to_dict() for number in sorted(self.steps)]
+
+
+def write_build_steps_report(path: str, report: Dict[str, Any]):
+    """Writes the build step timings of a stack to a JSON file, replacing any earlier report atomically"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.build-steps-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
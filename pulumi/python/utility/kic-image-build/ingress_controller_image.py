@@ -40,11 +40,28 @@ class IngressControllerImage(Resource):
                 props['image_tag_alias'] = None
             if 'nginx_plus_args' not in props:
                 props['nginx_plus_args'] = None
+            if 'build_hash' not in props:
+                props['build_hash'] = None
+            if 'build_cache' not in props:
+                props['build_cache'] = None
+            if 'build_cache_location' not in props:
+                props['build_cache_location'] = None
+            if 'make_targets' not in props:
+                props['make_targets'] = None
+            if 'max_concurrent_builds' not in props:
+                props['max_concurrent_builds'] = None
+            for output in ['build_cache_steps', 'build_cache_hits', 'build_cache_hit_ratio', 'build_steps',
+                           'build_duration_seconds', 'variants']:
+                if output not in props:
+                    props[output] = None
 
             if 'kic_src_url' not in props or not props['kic_src_url']:
                 pulumi.log.warn("No source url specified for 'kic_src_url', using latest tag from github", self)
                 props['kic_src_url'] = IngressControllerSourceArchiveUrl.from_github()
-            if 'make_target' not in props or not props['make_target']:
+            if ('make_target' not in props or not props['make_target']) and props['make_targets']:
+                # The first of the make targets is the primary one
+                props['make_target'] = props['make_targets'][0]
+            elif 'make_target' not in props or not props['make_target']:
                 pulumi.log.warn("'make_target' not specified, using " +
                                 f"{IngressControllerImageBuilderProvider.MAKE_TARGET}", self)
                 props['make_target'] = IngressControllerImageBuilderProvider.MAKE_TARGET
@@ -58,6 +75,12 @@ class IngressControllerImage(Resource):
                 props['image_name'] = image_name
             props['image_id'] = None
             props['image_tag'] = None
+            props['image_digest'] = None
+            props['pulled_images'] = None
+            if 'prepull_images' not in props:
+                props['prepull_images'] = None
+            if 'max_concurrent_pulls' not in props:
+                props['max_concurrent_pulls'] = None
 
             provider = IngressControllerImagePullerProvider(self)
         else:
@@ -84,3 +107,39 @@ class IngressControllerImage(Resource):
     @property
     def image_tag_alias(self) -> pulumi.Output[str]:
         return pulumi.get(self, 'image_tag_alias')
+
+    @property
+    def image_digest(self) -> pulumi.Output[str]:
+        """Digest of the registry manifest that a pulled image was pulled from"""
+        return pulumi.get(self, 'image_digest')
+
+    @property
+    def pulled_images(self) -> pulumi.Output[dict]:
+        """Outputs (image_id, image_digest, pull_seconds, size_bytes) of each image pulled by image name"""
+        return pulumi.get(self, 'pulled_images')
+
+    @property
+    def kic_src_url(self) -> pulumi.Output[str]:
+        return pulumi.get(self, 'kic_src_url')
+
+    @property
+    def build_hash(self) -> pulumi.Output[str]:
+        return pulumi.get(self, 'build_hash')
+
+    @property
+    def build_cache_hit_ratio(self) -> pulumi.Output[float]:
+        return pulumi.get(self, 'build_cache_hit_ratio')
+
+    @property
+    def build_steps(self) -> pulumi.Output[list]:
+        """Duration and cache hit of each BuildKit step (step, stage, name, duration_seconds, cached) of the build"""
+        return pulumi.get(self, 'build_steps')
+
+    @property
+    def build_duration_seconds(self) -> pulumi.Output[float]:
+        return pulumi.get(self, 'build_duration_seconds')
+
+    @property
+    def variants(self) -> pulumi.Output[dict]:
+        """Outputs (image_id, image_name, image_name_alias, ...) of the image built for each make target"""
+        return pulumi.get(self, 'variants')
@@ -18,6 +18,8 @@ class IngressControllerBaseProvider(ResourceProvider):
                  debug_logger_func=None):
         self.resource = resource
         self.runner = runner
+        # Memoizes read-only Docker queries; it is cleared by every command that changes the local images
+        self.docker_query_cache = external_process.RunCache()
 
         if debug_logger_func:
             self.debug_logger = debug_logger_func
@@ -35,9 +37,24 @@ class IngressControllerBaseProvider(ResourceProvider):
     def _debug_logger_func(self, msg):
         pulumi.log.debug(msg, self.resource)
 
-    def _run_docker(self, cmd: str, suppress_error: bool = False) -> (str, str):
+    def _run_docker(self, cmd: str, suppress_error: bool = False, read_only: bool = False) -> (str, str):
+        """Runs a Docker command
+        :param cmd: Docker command to run
+        :param suppress_error: if true, no error is raised when the command fails
+        :param read_only: if true, the command only queries Docker and its output may be reused until a command
+                          that is not read-only is run
+        """
         self.debug_logger(f'running Docker cmd: {cmd}')
-        res, err = self.runner(cmd=cmd, suppress_error=suppress_error)
+        if read_only:
+            res, err = self.docker_query_cache.run(cmd=cmd, suppress_error=suppress_error, runner=self.runner)
+        else:
+            # Queries run by other threads while the command is running may see the state from before or after it,
+            # so the cache is cleared once the command has changed the local images as well
+            self.docker_query_cache.invalidate()
+            try:
+                res, err = self.runner(cmd=cmd, suppress_error=suppress_error)
+            finally:
+                self.docker_query_cache.invalidate()
         self.debug_logger(os.linesep.join([res, err]))
 
         return res, err
@@ -65,7 +82,7 @@ class IngressControllerBaseProvider(ResourceProvider):
         :return: checksum id of the image
         """
         cmd = f'docker image ls --quiet --no-trunc "{image_name}"'
-        res, _ = self._run_docker(cmd=cmd)
+        res, _ = self._run_docker(cmd=cmd, read_only=True)
         image_id = res.strip()
         return image_id
 
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, List
 import pulumi
 
 
@@ -10,12 +10,20 @@ class IngressControllerImageBuilderArgs:
                  kic_src_url: Optional[pulumi.Input[str]] = None,
                  make_target: Optional[pulumi.Input[str]] = None,
                  always_rebuild: Optional[bool] = False,
-                 nginx_plus_args: Optional[pulumi.InputType['NginxPlusArgs']] = None):
+                 nginx_plus_args: Optional[pulumi.InputType['NginxPlusArgs']] = None,
+                 build_cache: Optional[pulumi.Input[str]] = None,
+                 build_cache_location: Optional[pulumi.Input[str]] = None,
+                 make_targets: Optional[pulumi.Input[List[str]]] = None,
+                 max_concurrent_builds: Optional[int] = None):
         self.__dict__ = dict()
         pulumi.set(self, 'kic_src_url', kic_src_url)
         pulumi.set(self, 'make_target', make_target)
         pulumi.set(self, 'always_rebuild', always_rebuild)
         pulumi.set(self, 'nginx_plus_args', nginx_plus_args)
+        pulumi.set(self, 'build_cache', build_cache)
+        pulumi.set(self, 'build_cache_location', build_cache_location)
+        pulumi.set(self, 'make_targets', make_targets)
+        pulumi.set(self, 'max_concurrent_builds', max_concurrent_builds)
 
     @property
     @pulumi.getter
@@ -26,3 +34,18 @@ class IngressControllerImageBuilderArgs:
     @pulumi.getter
     def make_target(self) -> Optional[pulumi.Input[str]]:
         return pulumi.get(self, "make_target")
+
+    @property
+    @pulumi.getter
+    def build_cache(self) -> Optional[pulumi.Input[str]]:
+        return pulumi.get(self, "build_cache")
+
+    @property
+    @pulumi.getter
+    def build_cache_location(self) -> Optional[pulumi.Input[str]]:
+        return pulumi.get(self, "build_cache_location")
+
+    @property
+    @pulumi.getter
+    def make_targets(self) -> Optional[pulumi.Input[List[str]]]:
+        return pulumi.get(self, "make_targets")
@@ -1,22 +1,25 @@
-import argparse
+import json
 import os.path
-import re
-import shlex
 import shutil
+import tempfile
+import threading
 import uuid
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, List, Dict, Callable, Tuple
 from urllib import parse
 
 import pulumi
 from pulumi.dynamic import CreateResult, CheckResult, ReadResult, CheckFailure, \
     UpdateResult, DiffResult
 
+from build_cache import BuildCacheMode, BuildCacheStats, build_cache_options
+from build_output import BuildOutputParser, BuildStepTimer
 from nginx_plus_args import NginxPlusArgs
 from ingress_controller_image_base_provider import IngressControllerBaseProvider as BaseProvider
 from kic_util.docker_image_name import DockerImageName
-from kic_util import external_process, archive_download
+from kic_util import external_process, archive_download, http_download, source_hash, workspace
 from kic_util.url_type import URLType
 
 
@@ -34,10 +37,32 @@ class IngressControllerImageBuilderProvider(BaseProvider):
        code and builds a container image"""
     MAKE_TARGET = 'debian-image'
     REQUIRED_PROPS: List[str] = ['kic_src_url', 'make_target']
+    # Label stamped on built images recording the hash of everything that the build depends on
+    BUILD_HASH_LABEL = 'com.nginx.mara.kic.build-hash'
+    # Directory in which the outputs of builds are recorded by build hash
+    BUILD_RECORD_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                         'mara', 'kic-builds'])
+    # Files linked into the source tree for NGINX Plus builds that are not part of the source
+    NGINX_PLUS_FILES = ['nginx-repo.key', 'nginx-repo.crt']
+    # Number of make targets built at the same time when max_concurrent_builds is not set
+    DEFAULT_MAX_CONCURRENT_BUILDS = 2
+    # Source directories prepared within this process by source URL, reused by later create and update calls
+    _source_dirs: Dict[str, str] = {}
+    _source_dirs_lock = threading.Lock()
 
     def __init__(self, resource: Optional[pulumi.Resource] = None,
-                 debug_logger_func=None):
+                 debug_logger_func=None,
+                 build_runner: Optional[Callable[..., Tuple[str, str]]] = None,
+                 workspace_manager: Optional[workspace.WorkspaceManager] = None):
+        """
+        :param build_runner: function that runs make and streams its output, with the signature of
+                             external_process.run_streaming (defaults to external_process.run_streaming)
+        :param workspace_manager: manager of the private directories that builds are run in (defaults to the one
+                                  shared within this process)
+        """
         super().__init__(resource=resource, debug_logger_func=debug_logger_func, runner=external_process.run)
+        self.build_runner = build_runner or external_process.run_streaming
+        self.workspace_manager = workspace_manager or workspace.default_manager()
 
     @staticmethod
     def image_name_alias(make_target: str, image_tag) -> DockerImageName:
@@ -61,89 +86,49 @@ class IngressControllerImageBuilderProvider(BaseProvider):
 
     @staticmethod
     def parse_image_name_from_output(stdout: str) -> Optional[DockerImageName]:
-        def remove_suffix(input_string, suffix):
-            if suffix and input_string.endswith(suffix):
-                return input_string[:-len(suffix)]
-            return input_string
-
-        is_docker_build_cmd = re.compile(r'^\s*docker\s+build')
-        cmd = ''
-
+        parser = BuildOutputParser()
         for line in stdout.splitlines():
-            if is_docker_build_cmd.match(line) or len(cmd) > 0:
-                # Skip blank lines because they could imply a line continuation
-                stripped = line.strip()
-                if len(stripped) < 1:
-                    continue
-                # Skip comments because they will interfere with command parsing
-                if stripped.startswith('#'):
-                    continue
-
-                # Concatenate lines so that we can handle continuations
-                cmd = cmd + stripped
-
-                # Remove continuation characters and aggregate commands into a single string
-                # so that we can just hand it off to argparse
-                if cmd.endswith('\\'):
-                    remove_suffix(cmd, '\\')
-                    continue
-
-                parser = argparse.ArgumentParser()
-                # Add only Docker tag args so that we can extract them easily
-                parser.add_argument('-t', type=str, )
-                parser.add_argument('--tag', type=str, )
-                # Use shlex here to split the command in order to properly handle all sorts of Posix
-                # weirdness and inconsistencies
-                cmd_array = shlex.split(cmd)
-                # Omit the 'docker' portion of the command in order to not confuse argparse
-                cmd_args = parser.parse_known_args(args=cmd_array[1:])
-                # Select either -t or --tag because either value is possible
-                # We don't test for the presence of both because that is a bit of overkill
-                full_image_name = cmd_args[0].t or cmd_args[0].tag
-                # Bail on parsing if we don't have a --tag arg
-                if full_image_name is None:
-                    cmd = ''
-                    continue
-
-                parts = full_image_name.split(':')
-                # If there aren't two values, that's invalid and we treat that as bad input
-                if len(parts) < 2:
-                    cmd = ''
-                    continue
-
-                return DockerImageName(repository=':'.join(parts[0:len(parts) - 1]), tag=parts[-1])
-
-        return None
+            parser.feed_stdout(line)
+        return parser.image_name
 
     @staticmethod
     def parse_image_id_from_output(stderr: str) -> Optional[str]:
-        regex = r'^\s*#?\d*\s*writing image\s+(?P<hash_algo>sha256)?:?(?P<image_id>[a-f0-9]{64}).*$'
-        image_id_line_regex = re.compile(regex)
-
+        parser = BuildOutputParser()
         for line in stderr.splitlines():
-            matches = image_id_line_regex.match(line.strip())
-            if not matches:
-                continue
-
-            results = matches.groupdict()
-            return f"{results.get('hash_algo')}:{results.get('image_id')}"
-
-        return None
+            parser.feed_stderr(line)
+        return parser.image_id
 
     @staticmethod
     def find_kic_source_dir(url: str) -> str:
-        extracted_path = archive_download.download_and_extract_archive_from_url(url)
+        with IngressControllerImageBuilderProvider._source_dirs_lock:
+            source_dir = IngressControllerImageBuilderProvider._source_dirs.get(url)
+            if source_dir and os.path.isdir(source_dir):
+                return source_dir
+
+        def log_download(progress: http_download.DownloadProgress):
+            if progress.complete:
+                pulumi.log.info(f'Downloaded KIC source {progress}')
+
+        extracted_path = archive_download.download_and_extract_archive_from_url(url, on_progress=log_download)
 
         # Sometimes the extracted directory contains a single directory that represents the
         # name and version of the KIC release. In that case, we navigate to that directory
         # and use it as our source directory.
         listing = os.listdir(extracted_path)
         if len(listing) == 1:
-            return os.path.join(extracted_path, listing[0])
+            source_dir = os.path.join(extracted_path, listing[0])
         else:
-            return extracted_path
+            source_dir = extracted_path
+
+        with IngressControllerImageBuilderProvider._source_dirs_lock:
+            IngressControllerImageBuilderProvider._source_dirs[url] = source_dir
+        return source_dir
 
-    def link_nginx_plus_files_to_source_dir(self, nginx_plus_args: NginxPlusArgs, source_dir: str):
+    def link_nginx_plus_files_to_source_dir(self, nginx_plus_args: NginxPlusArgs, source_dir: str) -> List[str]:
+        """Links the NGINX Plus repository key and certificate into the source directory
+        :return: paths of the symlinks created
+        """
+        created_links = []
         key_path = pathlib.Path(nginx_plus_args['key_path'])
         key_link_path = pathlib.Path(os.path.join(source_dir, 'nginx-repo.key'))
 
@@ -153,6 +138,7 @@ class IngressControllerImageBuilderProvider(BaseProvider):
         if key_path != key_link_path:
             pulumi.log.debug(f'Creating nginx repository key symlink {key_path} -> {key_link_path}', self.resource)
             os.symlink(key_path, key_link_path)
+            created_links.append(str(key_link_path))
         else:
             pulumi.log.info('Not creating nginx repository key symlink because it is already in the target path ',
                             self.resource)
@@ -166,10 +152,26 @@ class IngressControllerImageBuilderProvider(BaseProvider):
         if cert_path != cert_link_path:
             pulumi.log.debug(f'Creating nginx repository cert symlink {cert_path} -> {cert_link_path}', self.resource)
             os.symlink(cert_path, cert_link_path)
+            created_links.append(str(cert_link_path))
         else:
             pulumi.log.info('Not creating nginx repository cert symlink because it is already in the target path ',
                             self.resource)
 
+        return created_links
+
+    @staticmethod
+    def link_source_tree(source_dir: str, dest_dir: str):
+        """Populates a directory with hard links to the files of a source tree, copying files that cannot be linked
+        (e.g. because the directories are on different file systems). The build only reads the source files, so the
+        links never change the files of the source tree."""
+        def link_or_copy(src: str, dst: str):
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+        shutil.copytree(source_dir, dest_dir, symlinks=True, copy_function=link_or_copy, dirs_exist_ok=True)
+
     @staticmethod
     def find_make_path() -> str:
         gmake_path = shutil.which('gmake')
@@ -182,55 +184,262 @@ class IngressControllerImageBuilderProvider(BaseProvider):
 
         raise ImageBuildStateError('unable to find `make` or `gmake` in the system PATH')
 
-    def build_image(self, props: Any) -> Dict[str, str]:
-        pulumi.log.info('building from source', self.resource)
-        kic_src_url = props['kic_src_url']
-        make_target = props['make_target']
+    def _log_build_output(self, line: str):
+        pulumi.log.debug(line, self.resource)
 
-        source_dir = IngressControllerImageBuilderProvider.find_kic_source_dir(kic_src_url)
-        pulumi.log.debug(f'Building KIC in source directory: {source_dir}', self.resource)
+    @staticmethod
+    def source_tree_hash(source_dir: str) -> str:
+        """Returns a hash of the content of the source tree, excluding any linked NGINX Plus files"""
+        excluded = source_hash.DEFAULT_EXCLUDED_NAMES + IngressControllerImageBuilderProvider.NGINX_PLUS_FILES
+        return source_hash.tree_hash(source_dir, excluded_names=excluded)
 
-        if not os.path.isdir(source_dir):
-            raise ImageBuildStateError(f'Expected source code directory not found at path: {source_dir}')
+    @staticmethod
+    def build_hash(source_dir: str, make_target: str, nginx_plus_args: Optional[NginxPlusArgs] = None,
+                   tree_hash: Optional[str] = None) -> str:
+        """Returns a hash of everything that the result of a build depends on: the content of the source tree, the
+        make target and, for NGINX Plus builds, the repository key and certificate"""
+        source = tree_hash or IngressControllerImageBuilderProvider.source_tree_hash(source_dir)
+        inputs = {'source': source,
+                  'make_target': make_target}
+        if nginx_plus_args:
+            # Only digests of the key and certificate become part of the hash
+            inputs['nginx_plus_key'] = source_hash.file_hash(nginx_plus_args['key_path'])
+            inputs['nginx_plus_cert'] = source_hash.file_hash(nginx_plus_args['cert_path'])
+        return source_hash.combined_hash(**inputs)
 
-        # Link nginx repo certificates into the source directory so that they can be referenced from the build process
-        if 'nginx_plus_args' in props and props['nginx_plus_args']:
-            self.link_nginx_plus_files_to_source_dir(nginx_plus_args=props['nginx_plus_args'],
-                                                     source_dir=source_dir)
+    @staticmethod
+    def build_hashes(source_dir: str, props: Any) -> Dict[str, str]:
+        """Returns the build hash of each make target of the props, hashing the source tree only once"""
+        nginx_plus_args = props['nginx_plus_args'] if 'nginx_plus_args' in props else None
+        tree_hash = IngressControllerImageBuilderProvider.source_tree_hash(source_dir)
+        return {make_target: IngressControllerImageBuilderProvider.build_hash(source_dir=source_dir,
+                                                                              make_target=make_target,
+                                                                              nginx_plus_args=nginx_plus_args,
+                                                                              tree_hash=tree_hash)
+                for make_target in IngressControllerImageBuilderProvider.make_targets(props)}
+
+    def _build_record_path(self, build_hash: str) -> str:
+        return os.path.join(IngressControllerImageBuilderProvider.BUILD_RECORD_DIR, f'{build_hash}.json')
+
+    def _write_build_record(self, build_hash: str, outputs: Dict[str, str]):
+        path = self._build_record_path(build_hash)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.build_')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(outputs, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            # Not being able to record the build only means that the next identical build is not skipped
+            pulumi.log.warn(f'Unable to record build outputs: {e}', self.resource)
+
+    def _read_build_record(self, build_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._build_record_path(build_hash), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def find_built_image(self, build_hash: str, make_target: str) -> Optional[Dict[str, Any]]:
+        """Returns the outputs of an earlier build with the same build hash if its image still exists locally. The
+        image is found by its build hash label, so the record of the build outputs only adds the build metadata that
+        cannot be read back from Docker."""
+        label = IngressControllerImageBuilderProvider.BUILD_HASH_LABEL
+        cmd = f'docker image ls --quiet --no-trunc --filter "label={label}={build_hash}"'
+        res, _ = self._run_docker(cmd=cmd, suppress_error=True, read_only=True)
+        image_ids = res.split()
+        if not image_ids:
+            return None
+        image_id = image_ids[0]
+
+        record = self._read_build_record(build_hash)
+        if record and record.get('image_name_alias'):
+            outputs = {**record, 'image_id': image_id}
+            # The alias tag may have been removed while the image was kept
+            if self._docker_image_id_from_image_name(outputs['image_name_alias']) != image_id:
+                self._docker_tag(source_image_identifier=image_id, target_image_identifier=outputs['image_name_alias'])
+            return outputs
+
+        # Without a record, the names of the image are recovered from the alias tag that every build adds
+        cmd = f'docker image inspect --format \'{{{{ json .RepoTags }}}}\' "{image_id}"'
+        res, _ = self._run_docker(cmd=cmd, suppress_error=True, read_only=True)
+        try:
+            repo_tags = json.loads(res) or []
+        except ValueError:
+            return None
+        image_type = make_target.replace('-image', '')
+        for repo_tag in repo_tags:
+            repository, _, tag_alias = repo_tag.rpartition(':')
+            if repository != 'nginx/nginx-ingress' or not tag_alias.endswith(f'-{image_type}'):
+                continue
+            image_tag = tag_alias[:-len(image_type) - 1]
+            image_name = next((name for name in repo_tags if name.rpartition(':')[2] == image_tag),
+                              f'{repository}:{image_tag}')
+            return {'image_id': image_id,
+                    'image_name': image_name,
+                    'image_name_alias': repo_tag,
+                    'image_tag': image_tag,
+                    'image_tag_alias': tag_alias,
+                    'make_target': make_target,
+                    'build_hash': build_hash,
+                    'build_cache_steps': None,
+                    'build_cache_hits': None,
+                    'build_cache_hit_ratio': None,
+                    'build_steps': None,
+                    'build_duration_seconds': None}
+        return None
 
+    @staticmethod
+    def make_targets(props: Any) -> List[str]:
+        """Returns the make targets to build, starting with the primary target whose image is also returned in
+        the top level outputs"""
+        targets = []
+        if BaseProvider._is_key_defined('make_target', props):
+            targets.append(props['make_target'])
+        if BaseProvider._is_key_defined('make_targets', props):
+            targets.extend(target for target in props['make_targets'] if target not in targets)
+        return targets or [IngressControllerImageBuilderProvider.MAKE_TARGET]
+
+    def _build_target(self, source_dir: str, make_target: str, build_hash: str, props: Any) -> Dict[str, Any]:
+        """Runs make in the source directory to build the image of a single make target"""
         make_path = IngressControllerImageBuilderProvider.find_make_path()
-
-        orig_dir = os.getcwd()
-        try:
-            os.chdir(source_dir)
-            # Invoke make in the KIC source tree to build the Docker image
-            env = dict(os.environ)
-            env['DOCKER_BUILD_OPTIONS'] = '--no-cache'
-            build_cmd = f'{make_path} {make_target} TARGET=container'
-            pulumi.log.info(f'Running build: {build_cmd}')
-            res, err = external_process.run(cmd=build_cmd, env=env)
-            # Extract the image name so that it can be used later in the build process
-            image_name = IngressControllerImageBuilderProvider.parse_image_name_from_output(res)
-            if not image_name:
-                raise ImageBuildOutputParseError(f'Unable to parse image name from STDOUT: \n{res}')
-            if not image_name.tag:
-                raise ImageBuildOutputParseError(f'Unable to parse image tag from STDOUT: \n{res}')
-            image_id = IngressControllerImageBuilderProvider.parse_image_id_from_output(err)
-            if not image_id:
-                raise ImageBuildOutputParseError(f'Unable to parse image id from STDERR: \n{err}')
-            pulumi.log.debug(os.linesep.join([res, err]), self.resource)
-        finally:
-            os.chdir(orig_dir)
+        cache_mode = BuildCacheMode.from_config(props.get('build_cache'))
+
+        # Invoke make in the KIC source tree to build the Docker image
+        env = dict(os.environ)
+        build_options = build_cache_options(mode=cache_mode, location=props.get('build_cache_location'),
+                                            make_target=make_target)
+        # The build hash label identifies the image as the result of this build, so later builds can skip it
+        build_options.append(f'--label={IngressControllerImageBuilderProvider.BUILD_HASH_LABEL}={build_hash}')
+        env['DOCKER_BUILD_OPTIONS'] = ' '.join(build_options)
+        build_cmd = [make_path, make_target, 'TARGET=container']
+        pulumi.log.info(f"Running build: {' '.join(build_cmd)} with build options: {env['DOCKER_BUILD_OPTIONS']}")
+        output_parser = BuildOutputParser()
+        step_timer = BuildStepTimer()
+
+        # Variants may be built concurrently, so each line of output is prefixed with the target that produced it
+        def on_stdout_line(line: str):
+            self._log_build_output(f'[{make_target}] {line}')
+            output_parser.feed_stdout(line)
+
+        def on_stderr_line(line: str):
+            self._log_build_output(f'[{make_target}] {line}')
+            output_parser.feed_stderr(line)
+            step_timer.feed(line)
+
+        # Build output is streamed to the debug log as it is produced rather than buffered until make exits.
+        # make is given the source directory as its working directory instead of this process changing its own,
+        # which is shared by every thread, so that builds and other provider callbacks can run in parallel.
+        res, err = self.build_runner(cmd=build_cmd, env=env, cwd=source_dir,
+                                     on_stdout_line=on_stdout_line,
+                                     on_stderr_line=on_stderr_line)
+        # The image name and id were extracted from the output as it was produced. Only the last lines of the
+        # output are kept, so they are included in errors for context.
+        image_name = output_parser.image_name
+        if not image_name:
+            raise ImageBuildOutputParseError(f'Unable to parse image name from STDOUT: \n{res}')
+        if not image_name.tag:
+            raise ImageBuildOutputParseError(f'Unable to parse image tag from STDOUT: \n{res}')
+        image_id = output_parser.image_id
+        if not image_id:
+            raise ImageBuildOutputParseError(f'Unable to parse image id from STDERR: \n{err}')
+
+        cache_stats = BuildCacheStats(step_timer.steps.values())
+        pulumi.log.info(f'{make_target} build cache ({cache_mode.value}): {cache_stats.cached_steps} of '
+                        f'{cache_stats.total_steps} steps cached ({cache_stats.hit_ratio:.0%})', self.resource)
+        slowest = sorted(step_timer.steps.values(), key=lambda step: step.duration_seconds, reverse=True)[:3]
+        if slowest:
+            slowest_steps = ', '.join(f'[{step.stage}] {step.name} {step.duration_seconds}s' for step in slowest)
+            pulumi.log.info(f'{make_target} slowest build steps: {slowest_steps}', self.resource)
 
         name_alias = IngressControllerImageBuilderProvider.image_name_alias(make_target, image_name.tag)
         self._docker_tag(source_image_identifier=image_id,
                          target_image_identifier=f'{name_alias.repository}:{name_alias.tag}')
 
-        return {'image_id': image_id,
-                'image_name': f'{image_name.repository}:{image_name.tag}',
-                'image_name_alias': f'{name_alias.repository}:{name_alias.tag}',
-                'image_tag': image_name.tag,
-                'image_tag_alias': name_alias.tag,
+        outputs = {'image_id': image_id,
+                   'image_name': f'{image_name.repository}:{image_name.tag}',
+                   'image_name_alias': f'{name_alias.repository}:{name_alias.tag}',
+                   'image_tag': image_name.tag,
+                   'image_tag_alias': name_alias.tag,
+                   'make_target': make_target,
+                   'build_hash': build_hash,
+                   'build_cache_steps': cache_stats.total_steps,
+                   'build_cache_hits': cache_stats.cached_steps,
+                   'build_cache_hit_ratio': cache_stats.hit_ratio,
+                   'build_steps': step_timer.to_list(),
+                   'build_duration_seconds': step_timer.total_seconds}
+        self._write_build_record(build_hash, outputs)
+        return outputs
+
+    def build_image(self, props: Any) -> Dict[str, Any]:
+        """Builds the images of all of the requested make targets from a single copy of the source code. Targets
+        are built concurrently, up to the max_concurrent_builds limit.
+        :return: outputs of the primary make target along with the outputs of every target by make target
+        """
+        pulumi.log.info('building from source', self.resource)
+        kic_src_url = props['kic_src_url']
+        make_targets = IngressControllerImageBuilderProvider.make_targets(props)
+
+        source_dir = IngressControllerImageBuilderProvider.find_kic_source_dir(kic_src_url)
+        pulumi.log.debug(f'Building KIC in source directory: {source_dir}', self.resource)
+
+        if not os.path.isdir(source_dir):
+            raise ImageBuildStateError(f'Expected source code directory not found at path: {source_dir}')
+
+        nginx_plus_args = props['nginx_plus_args'] if 'nginx_plus_args' in props else None
+
+        variants: Dict[str, Dict[str, Any]] = {}
+        build_hashes: Dict[str, str] = {}
+        for make_target, build_hash in IngressControllerImageBuilderProvider.build_hashes(source_dir, props).items():
+            built_image = self.find_built_image(build_hash=build_hash, make_target=make_target)
+            if built_image:
+                pulumi.log.info(f"image with build hash {build_hash} already exists ({built_image['image_id']}) - "
+                                f"skipping build of {make_target}", self.resource)
+                variants[make_target] = built_image
+            else:
+                build_hashes[make_target] = build_hash
+
+        if build_hashes:
+            # The source directory is a cached extraction shared with other builds and processes, so make is run in
+            # a private copy of it that the NGINX Plus files can be linked into - the copy is shared by all of the
+            # variants built by this call
+            build_workspace = f'kic_build_{uuid.uuid4().hex}'
+            build_dir = self.workspace_manager.prepare(
+                name=build_workspace,
+                prepare_func=lambda path: IngressControllerImageBuilderProvider.link_source_tree(source_dir, path),
+                ephemeral=True)
+            pulumi.log.debug(f'Building KIC in private copy of source directory: {build_dir}', self.resource)
+
+            max_workers = props.get('max_concurrent_builds') or \
+                IngressControllerImageBuilderProvider.DEFAULT_MAX_CONCURRENT_BUILDS
+            try:
+                # Link nginx repo certificates into the build directory so that they can be referenced from the
+                # build process
+                if nginx_plus_args:
+                    self.link_nginx_plus_files_to_source_dir(nginx_plus_args=nginx_plus_args, source_dir=build_dir)
+
+                with ThreadPoolExecutor(max_workers=min(int(max_workers), len(build_hashes))) as executor:
+                    futures = {make_target: executor.submit(self._build_target, build_dir, make_target,
+                                                            build_hash, props)
+                               for make_target, build_hash in build_hashes.items()}
+                # Every build has finished by now, so a failed build does not leave others running
+                for make_target, future in futures.items():
+                    variants[make_target] = future.result()
+            finally:
+                self.workspace_manager.remove(build_workspace)
+
+        primary = make_targets[0]
+        if len(make_targets) > 1:
+            # The make targets of every variant tag the same image name, so it refers to whichever variant finished
+            # last and is pointed back at the image of the primary target
+            self._docker_tag(source_image_identifier=variants[primary]['image_id'],
+                             target_image_identifier=variants[primary]['image_name'])
+
+        # Within the variants, each image is named by its alias, which is the only name unique to the variant
+        return {**variants[primary],
+                'variants': {make_target: {**variants[make_target],
+                                           'image_name': variants[make_target]['image_name_alias']}
+                             for make_target in make_targets},
                 'kic_src_url': kic_src_url}
 
     def check(self, _olds: Any, news: Any) -> CheckResult:
@@ -242,6 +451,12 @@ class IngressControllerImageBuilderProvider(BaseProvider):
         if url_type == URLType.UNKNOWN:
             failures.append(CheckFailure(property_='kic_src_url', reason=f"unsupported URL: {news['kic_src_url']}"))
 
+        try:
+            mode = BuildCacheMode.from_config(news.get('build_cache'))
+            build_cache_options(mode=mode, location=news.get('build_cache_location'))
+        except ValueError as e:
+            failures.append(CheckFailure(property_='build_cache', reason=str(e)))
+
         if 'nginx_plus_args' in news and news['nginx_plus_args']:
             pulumi.log.info(f"nginx_plus_args: {news['nginx_plus_args']}")
 
@@ -286,13 +501,41 @@ class IngressControllerImageBuilderProvider(BaseProvider):
             _olds['make_target'] = IngressControllerImageBuilderProvider.MAKE_TARGET
 
         changed = not BaseProvider._new_and_old_val_equal('kic_src_url', _news, _olds) \
-            or not BaseProvider._new_and_old_val_equal('make_target', _news, _olds)
+            or not BaseProvider._new_and_old_val_equal('make_target', _news, _olds) \
+            or IngressControllerImageBuilderProvider.make_targets(_news) != \
+            IngressControllerImageBuilderProvider.make_targets(_olds)
+
+        if not changed:
+            changed = self._build_hashes_changed(_olds, _news)
 
         if not changed:
             pulumi.log.info('image definition not changed - skipping rebuild', self.resource)
 
         return DiffResult(changes=changed)
 
+    def _build_hashes_changed(self, _olds: Any, _news: Any) -> bool:
+        """Returns true when the source that the URL refers to now, or anything else that the build depends on,
+        differs from what the existing images were built from. URLs such as git branches and latest release
+        archives may refer to different source over time."""
+        try:
+            source_dir = IngressControllerImageBuilderProvider.find_kic_source_dir(_news['kic_src_url'])
+            build_hashes = IngressControllerImageBuilderProvider.build_hashes(source_dir, _news)
+        except (archive_download.DownloadExtractError, ValueError, OSError) as e:
+            pulumi.log.warn(f'unable to hash KIC source - rebuilding image: {e}', self.resource)
+            return True
+
+        old_variants = _olds.get('variants') or {}
+        for make_target, build_hash in build_hashes.items():
+            old_variant = old_variants.get(make_target) or {}
+            old_build_hash = old_variant.get('build_hash')
+            if not old_build_hash and make_target == _olds.get('make_target'):
+                old_build_hash = _olds.get('build_hash')
+            if old_build_hash != build_hash:
+                pulumi.log.info(f'build hash of {make_target} changed from {old_build_hash} to {build_hash}',
+                                self.resource)
+                return True
+        return False
+
     def create(self, props: Any) -> CreateResult:
         outputs = self.build_image(props=props)
         id_ = str(uuid.uuid4())
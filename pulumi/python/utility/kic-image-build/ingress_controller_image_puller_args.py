@@ -1,15 +1,30 @@
-from typing import Optional
+from typing import Optional, List
 import pulumi
 
 
 @pulumi.input_type
 class IngressControllerImagePullerArgs:
     """Arguments needed for instantiating the IngressControllerImagePullerProvider"""
-    def __init__(self, image_name: Optional[pulumi.Input[str]] = None):
+    def __init__(self, image_name: Optional[pulumi.Input[str]] = None,
+                 prepull_images: Optional[pulumi.Input[List[str]]] = None,
+                 max_concurrent_pulls: Optional[int] = None):
         self.__dict__ = dict()
         pulumi.set(self, 'image_name', image_name)
+        pulumi.set(self, 'prepull_images', prepull_images)
+        pulumi.set(self, 'max_concurrent_pulls', max_concurrent_pulls)
 
     @property
     @pulumi.getter
     def image_name(self) -> Optional[pulumi.Input[str]]:
         return pulumi.get(self, "image_name")
+
+    @property
+    @pulumi.getter
+    def prepull_images(self) -> Optional[pulumi.Input[List[str]]]:
+        """Images pulled along with the KIC image to warm the local image cache"""
+        return pulumi.get(self, "prepull_images")
+
+    @property
+    @pulumi.getter
+    def max_concurrent_pulls(self) -> Optional[int]:
+        return pulumi.get(self, "max_concurrent_pulls")
@@ -1,4 +1,7 @@
+import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Any, Dict, List
 
 import pulumi
@@ -6,35 +9,101 @@ from pulumi.dynamic import CreateResult, UpdateResult, DiffResult, CheckResult,
 
 from ingress_controller_image_base_provider import IngressControllerBaseProvider as BaseProvider
 from kic_util.docker_image_name import DockerImageName, DockerImageNameError
-from kic_util import external_process
+from kic_util import external_process, registry
 
 
 class IngressControllerImagePullerProvider(BaseProvider):
     """Pulumi dynamic provider that pulls ingress container images from an external registry"""
 
     REQUIRED_PROPS: List[str] = ['image_name']
+    # Number of images pulled at the same time when max_concurrent_pulls is not set
+    DEFAULT_MAX_CONCURRENT_PULLS = 4
 
     def __init__(self,
                  resource: Optional[pulumi.Resource] = None,
                  debug_logger_func=None):
         super().__init__(resource=resource, debug_logger_func=debug_logger_func, runner=external_process.run)
 
-    def pull(self, props: Any) -> Dict[str, str]:
-        image_name = props['image_name']
-
-        pulumi.log.info(f'pulling from registry: {image_name}', self.resource)
+    @staticmethod
+    def image_names(props: Any) -> List[str]:
+        """Returns the images to pull, starting with the KIC image whose details are also returned in the top level
+        outputs and followed by the images that are pulled only to warm the local image cache"""
+        names = [props['image_name']]
+        if BaseProvider._is_key_defined('prepull_images', props):
+            names.extend(name for name in props['prepull_images'] if name not in names)
+        return names
+
+    def _pull_image(self, image_name: str) -> Dict[str, Any]:
+        """Pulls a single image and records how long it took and how large the image is"""
+        start = time.perf_counter()
         full_image_name = self._docker_pull(image_name)
+        pull_seconds = time.perf_counter() - start
         if full_image_name != image_name:
             pulumi.log.info(f'full image name: {full_image_name}', self.resource)
 
         image_id = self._docker_image_id_from_image_name(image_name)
-        image = DockerImageName.from_name(image_name=image_name, image_id=image_id)
+        size_bytes = self._docker_image_size(image_name)
+        pulumi.log.info(f'pulled {image_name} in {pull_seconds:.1f}s ({size_bytes / (1024 * 1024):.1f} MiB)',
+                        self.resource)
+        return {'image_id': image_id,
+                'image_digest': self._docker_repo_digest(image_name),
+                'pull_seconds': round(pull_seconds, 2),
+                'size_bytes': size_bytes}
+
+    def pull(self, props: Any) -> Dict[str, Any]:
+        image_name = props['image_name']
+        image_names = IngressControllerImagePullerProvider.image_names(props)
+        max_concurrent_pulls = props.get('max_concurrent_pulls') or \
+            IngressControllerImagePullerProvider.DEFAULT_MAX_CONCURRENT_PULLS
+
+        pulumi.log.info(f'pulling from registry: {", ".join(image_names)}', self.resource)
+        # docker pull mostly waits on the network, so images are pulled in parallel up to the limit
+        with ThreadPoolExecutor(max_workers=min(max_concurrent_pulls, len(image_names))) as executor:
+            pulled_images = dict(zip(image_names, executor.map(self._pull_image, image_names)))
+
+        image = DockerImageName.from_name(image_name=image_name, image_id=pulled_images[image_name]['image_id'])
+        total_seconds = sum(pulled['pull_seconds'] for pulled in pulled_images.values())
+        total_bytes = sum(pulled['size_bytes'] for pulled in pulled_images.values())
+        pulumi.log.info(f'pulled {len(image_names)} images ({total_bytes / (1024 * 1024):.1f} MiB) with '
+                        f'{total_seconds:.1f}s of pull time', self.resource)
 
         return {'image_id': image.id,
                 'image_name': str(image),
                 'image_name_alias': None,
                 'image_tag': image.tag,
-                'image_tag_alias': None}
+                'image_tag_alias': None,
+                'image_digest': pulled_images[image_name]['image_digest'],
+                'pulled_images': pulled_images}
+
+    def _docker_image_size(self, image_name: str) -> int:
+        """Get the size of a pulled image as reported by Docker
+        :param image_name: full container image name in the format of repository:tag
+        :return: size of the image in bytes or 0 if Docker did not report one
+        """
+        cmd = f'docker image inspect --format "{{{{.Size}}}}" "{image_name}"'
+        res, _ = self._run_docker(cmd=cmd, suppress_error=True, read_only=True)
+        try:
+            return int(res.strip())
+        except ValueError:
+            return 0
+
+    def _docker_repo_digest(self, image_name: str) -> Optional[str]:
+        """Get the digest of the registry manifest that a pulled image was pulled from
+        :param image_name: full container image name in the format of repository:tag
+        :return: manifest digest (e.g. sha256:9358...) or None if Docker did not record one
+        """
+        cmd = f'docker image inspect --format "{{{{json .RepoDigests}}}}" "{image_name}"'
+        res, _ = self._run_docker(cmd=cmd, suppress_error=True, read_only=True)
+        try:
+            repo_digests = json.loads(res.strip() or '[]') or []
+        except ValueError:
+            return None
+
+        # Docker records a digest for every repository that the image was pulled from
+        repository = DockerImageName.from_name(image_name).repository
+        digests = {repo_digest.split('@', 1)[0]: repo_digest.split('@', 1)[1]
+                   for repo_digest in repo_digests if '@' in repo_digest}
+        return digests.get(repository) or next(iter(digests.values()), None)
 
     def create(self, props: Any) -> CreateResult:
         outputs = self.pull(props)
@@ -46,10 +115,57 @@ class IngressControllerImagePullerProvider(BaseProvider):
         outputs = self.pull(props=_news)
         return UpdateResult(outs=outputs)
 
+    def _image_changed(self, image_name: str, pulled: Dict[str, Any]) -> bool:
+        """Checks whether an image needs to be pulled again
+        :param image_name: full container image name in the format of repository:tag
+        :param pulled: outputs recorded when the image was last pulled
+        """
+        # Images pulled before digests were recorded are pulled again to record one
+        stored_digest = pulled.get('image_digest')
+        if not stored_digest:
+            return True
+
+        # The image is pulled again when it has been removed from the local Docker images
+        if self._docker_image_id_from_image_name(image_name) != pulled.get('image_id'):
+            pulumi.log.info(f'image {image_name} is no longer present locally', self.resource)
+            return True
+
+        # Look up the digest that the tag currently refers to with a HEAD request, rather than running docker pull,
+        # so that the image and everything depending on it are only updated when the tag has moved
+        try:
+            remote_digest = registry.manifest_digest(image_name)
+        except registry.RegistryError as e:
+            pulumi.log.warn(f'unable to check registry for changes to {image_name}, pulling it again: {e}',
+                            self.resource)
+            return True
+
+        if remote_digest != stored_digest:
+            pulumi.log.info(f'image {image_name} changed in registry: {stored_digest} -> {remote_digest}',
+                            self.resource)
+            return True
+
+        return False
+
     def diff(self, _id: str, _olds: Any, _news: Any) -> DiffResult:
-        # Always assume that the container image has changed so that we run
-        # docker pull to see if a newer image is available
-        return DiffResult(changes=True)
+        if not BaseProvider._new_and_old_val_equal('image_name', _news, _olds):
+            return DiffResult(changes=True)
+        image_names = IngressControllerImagePullerProvider.image_names(_news)
+        if image_names != IngressControllerImagePullerProvider.image_names(_olds):
+            return DiffResult(changes=True)
+
+        # State recorded before the pre-pull images were added only has the details of the KIC image
+        pulled_images = dict(_olds.get('pulled_images') or {})
+        pulled_images.setdefault(_news['image_name'], {'image_id': _olds.get('image_id'),
+                                                       'image_digest': _olds.get('image_digest')})
+        if not all(image_name in pulled_images for image_name in image_names):
+            return DiffResult(changes=True)
+
+        max_concurrent_pulls = _news.get('max_concurrent_pulls') or \
+            IngressControllerImagePullerProvider.DEFAULT_MAX_CONCURRENT_PULLS
+        with ThreadPoolExecutor(max_workers=min(max_concurrent_pulls, len(image_names))) as executor:
+            changed = list(executor.map(lambda name: self._image_changed(name, pulled_images[name]), image_names))
+
+        return DiffResult(changes=any(changed))
 
     def check(self, _olds: Any, news: Any) -> CheckResult:
         failures = BaseProvider._check_for_required_params(news, IngressControllerImagePullerProvider.REQUIRED_PROPS)
@@ -59,4 +175,10 @@ class IngressControllerImagePullerProvider(BaseProvider):
         except DockerImageNameError as e:
             failures.append(CheckFailure(property_='image_name', reason=str(e)))
 
+        for image_name in news.get('prepull_images') or []:
+            try:
+                DockerImageName.from_name(image_name)
+            except DockerImageNameError as e:
+                failures.append(CheckFailure(property_='prepull_images', reason=str(e)))
+
         return CheckResult(inputs=news, failures=failures)
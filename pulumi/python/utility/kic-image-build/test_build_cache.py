@@ -0,0 +1,61 @@
+import unittest
+
+from build_cache import BuildCacheMode, BuildCacheStats, build_cache_options
+from build_output import BuildStepTimer
+
+
+class TestBuildCache(unittest.TestCase):
+    def test_mode_from_config(self):
+        self.assertEqual(BuildCacheMode.NONE, BuildCacheMode.from_config(None))
+        self.assertEqual(BuildCacheMode.REGISTRY, BuildCacheMode.from_config(' Registry '))
+        with self.assertRaises(ValueError):
+            BuildCacheMode.from_config('s3')
+
+    def test_none_disables_cache(self):
+        self.assertEqual(['--no-cache'], build_cache_options(BuildCacheMode.NONE))
+
+    def test_local_cache_options(self):
+        expected = ['--cache-from=type=local,src=/var/cache/kic',
+                    '--cache-to=type=local,dest=/var/cache/kic,mode=max']
+        self.assertEqual(expected, build_cache_options(BuildCacheMode.LOCAL, location='/var/cache/kic'))
+        self.assertIn('debian-image', build_cache_options(BuildCacheMode.LOCAL, make_target='debian-image')[0])
+
+    def test_inline_cache_options(self):
+        self.assertEqual(['--build-arg=BUILDKIT_INLINE_CACHE=1', '--cache-from=nginx/nginx-ingress:2.4.2'],
+                         build_cache_options(BuildCacheMode.INLINE, location='nginx/nginx-ingress:2.4.2'))
+
+    def test_registry_cache_options(self):
+        expected = ['--cache-from=type=registry,ref=registry.local/kic:cache',
+                    '--cache-to=type=registry,ref=registry.local/kic:cache,mode=max']
+        self.assertEqual(expected, build_cache_options(BuildCacheMode.REGISTRY, location='registry.local/kic:cache'))
+        with self.assertRaises(ValueError):
+            build_cache_options(BuildCacheMode.REGISTRY)
+
+    def test_cache_stats(self):
+        output = '''#1 [internal] load build definition from Dockerfile
+#1 DONE 0.0s
+#14 [files 2/2] COPY internal/configs/version1/nginx.ingress.tmpl /
+#14 sha256:f7e805d6e61f2589e1f5f7664ca7bec42d755a8aa7158e247c6e9300d4e96f1c
+#14 CACHED
+
+#16 [builder 2/3] COPY . /go/src/github.com/nginxinc/kubernetes-ingress/nginx-ingress/
+#16 CACHED
+
+#17 [builder 3/3] RUN CGO_ENABLED=0 go build -o /nginx-ingress
+#17 DONE 95.2s
+
+#18 [container 1/1] COPY --chown=nginx:0 --from=builder /nginx-ingress /
+#18 DONE 0.3s
+
+#19 exporting to image
+#19 DONE 0.2s'''
+        timer = BuildStepTimer()
+        for line in output.splitlines():
+            timer.feed(line)
+        stats = BuildCacheStats(timer.steps.values())
+        self.assertEqual(4, stats.total_steps)
+        self.assertEqual(2, stats.cached_steps)
+        self.assertEqual(0.5, stats.hit_ratio)
+
+    def test_cache_stats_without_steps(self):
+        self.assertEqual(0.0, BuildCacheStats([]).hit_ratio)
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from build_output import BuildOutputParser, BuildStepTimer, MAX_COMMAND_LENGTH, write_build_steps_report
+
+IMAGE_ID = 'sha256:9358beb5cb1c6d6a9c005b18bdad08b0f2259b82d32687b03334256cbd500997'
+
+
+def synthetic_build_log(megabytes: int):
+    """Yields (stream, line) pairs of a build log of roughly the given size, ending with the docker build
+    command on STDOUT and the line reporting the image id on STDERR"""
+    size = 0
+    step = 0
+    while size < megabytes * 1024 * 1024:
+        step += 1
+        stdout_line = f'go: downloading github.com/example/module{step} v1.{step}.0'
+        stderr_line = f'#{step % 30} sha256:{step:064x}'
+        size += len(stdout_line) + len(stderr_line) + 2
+        yield 'stdout', stdout_line
+        yield 'stderr', stderr_line
+    yield 'stdout', 'docker build --build-arg IC_VERSION=2.4.2 -f build/Dockerfile \\'
+    yield 'stdout', '    -t nginx/nginx-ingress:2.4.2 . --target debian'
+    yield 'stderr', f'#19 writing image {IMAGE_ID} 0.0s done'
+
+
+def feed(parser: BuildOutputParser, log):
+    for stream, line in log:
+        if stream == 'stdout':
+            parser.feed_stdout(line)
+        else:
+            parser.feed_stderr(line)
+
+
+class TestBuildOutputParser(unittest.TestCase):
+    def test_lines_parsed_as_they_arrive(self):
+        parser = BuildOutputParser()
+        parser.feed_stdout('Docker version 20.10.6, build 370c289')
+        parser.feed_stdout('docker build --build-arg IC_VERSION=2.4.2 \\')
+        self.assertIsNone(parser.image_name)
+        parser.feed_stdout('')
+        parser.feed_stdout('# comment between continuation lines')
+        parser.feed_stdout('--tag=nginx/nginx-ingress:2.4.2 .')
+        self.assertEqual('nginx/nginx-ingress', parser.image_name.repository)
+        self.assertEqual('2.4.2', parser.image_name.tag)
+
+        # Later commands do not replace the image name found
+        parser.feed_stdout('docker build -t example/other:1.0.0 .')
+        self.assertEqual('2.4.2', parser.image_name.tag)
+
+        parser.feed_stderr('#19 exporting layers done')
+        self.assertIsNone(parser.image_id)
+        parser.feed_stderr(f'#19 writing image {IMAGE_ID} 0.0s done')
+        self.assertEqual(IMAGE_ID, parser.image_id)
+
+    def test_continuation_without_trailing_space(self):
+        parser = BuildOutputParser()
+        parser.feed_stdout('docker build --build-arg VERSION=2.4.2\\')
+        parser.feed_stdout('-t nginx/nginx-ingress:2.4.2 .')
+        self.assertEqual('2.4.2', parser.image_name.tag)
+
+    def test_command_without_tag_is_skipped(self):
+        parser = BuildOutputParser()
+        parser.feed_stdout('docker build -f build/Dockerfile .')
+        parser.feed_stdout('docker build -tnginx/nginx-ingress:2.4.2 .')
+        self.assertEqual('nginx/nginx-ingress', parser.image_name.repository)
+
+    def test_overlong_command_is_dropped(self):
+        parser = BuildOutputParser()
+        parser.feed_stdout('docker build \\')
+        for _ in range(MAX_COMMAND_LENGTH // 1000 + 1):
+            parser.feed_stdout('x' * 1000 + ' \\')
+        parser.feed_stdout('-t nginx/nginx-ingress:2.4.2 .')
+        self.assertIsNone(parser.image_name)
+
+    def test_parse_tag(self):
+        self.assertEqual('latest', BuildOutputParser.parse_tag('docker build -t a/b:1 -t a/b:latest .').tag)
+        self.assertIsNone(BuildOutputParser.parse_tag('docker build -t nginx-ingress .'))
+        self.assertIsNone(BuildOutputParser.parse_tag('docker build -t "unterminated .'))
+
+    def test_synthetic_log(self):
+        parser = BuildOutputParser()
+        feed(parser, synthetic_build_log(megabytes=1))
+        self.assertEqual('nginx/nginx-ingress:2.4.2', f'{parser.image_name.repository}:{parser.image_name.tag}')
+        self.assertEqual(IMAGE_ID, parser.image_id)
+
+
+class TestBuildStepTimer(unittest.TestCase):
+    OUTPUT = '''#1 [internal] load build definition from Dockerfile
+#1 sha256:14b46a9847c33680288f606efc1d8af09f2f149e034235645d17e9bc0e5217db
+#1 transferring dockerfile: 38B done
+#1 DONE 0.1s
+
+#14 [files 2/2] COPY internal/configs/version1/nginx.ingress.tmpl /
+#14 sha256:f7e805d6e61f2589e1f5f7664ca7bec42d755a8aa7158e247c6e9300d4e96f1c
+#14 CACHED
+
+#17 [builder 3/3] RUN CGO_ENABLED=0 go build -o /nginx-ingress
+#17 0.512 go: downloading github.com/nginxinc/nginx-plus-go-client v0.10.0
+#18 [container 1/2] RUN apt-get update
+#17 [builder 3/3] RUN CGO_ENABLED=0 go build -o /nginx-ingress
+#17 DONE 95.2s
+#18 DONE 12.5s
+
+#19 exporting to image
+#19 exporting layers done
+#19 writing image sha256:9358beb5cb1c6d6a9c005b18bdad08b0f2259b82d32687b03334256cbd500997 0.0s done
+#19 DONE 0.2s'''
+
+    def test_steps_timed(self):
+        timer = BuildStepTimer()
+        for line in TestBuildStepTimer.OUTPUT.splitlines():
+            timer.feed(line)
+
+        expected = [{'step': 1, 'stage': 'internal', 'name': 'load build definition from Dockerfile',
+                     'duration_seconds': 0.1, 'cached': False},
+                    {'step': 14, 'stage': 'files', 'name': 'COPY internal/configs/version1/nginx.ingress.tmpl /',
+                     'duration_seconds': 0.0, 'cached': True},
+                    {'step': 17, 'stage': 'builder', 'name': 'RUN CGO_ENABLED=0 go build -o /nginx-ingress',
+                     'duration_seconds': 95.2, 'cached': False},
+                    {'step': 18, 'stage': 'container', 'name': 'RUN apt-get update',
+                     'duration_seconds': 12.5, 'cached': False},
+                    {'step': 19, 'stage': '', 'name': 'exporting to image',
+                     'duration_seconds': 0.2, 'cached': False}]
+        self.assertEqual(expected, timer.to_list())
+        self.assertEqual(108.0, timer.total_seconds)
+
+    def test_write_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'config', 'kic-build-steps.dev.json')
+            write_build_steps_report(path, {'stack': 'dev', 'variants': {}})
+            write_build_steps_report(path, {'stack': 'dev', 'variants': {'debian-image': {}}})
+            with open(path) as f:
+                self.assertEqual({'stack': 'dev', 'variants': {'debian-image': {}}}, json.load(f))
+            self.assertEqual(['kic-build-steps.dev.json'], os.listdir(os.path.dirname(path)))
+
+
+@unittest.skipUnless(os.environ.get('MARA_RUN_BENCHMARKS'), 'set MARA_RUN_BENCHMARKS=1 to run benchmarks')
+class BenchmarkBuildOutputParser(unittest.TestCase):
+    def test_parse_large_logs(self):
+        for megabytes in [8, 32]:
+            parser = BuildOutputParser()
+            tracemalloc.start()
+            start = time.perf_counter()
+            feed(parser, synthetic_build_log(megabytes=megabytes))
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'\n{megabytes} MB build log: {elapsed:.2f}s ({megabytes / elapsed:.0f} MB/s), '
+                  f'peak memory {peak / 1024:.0f} KiB')
+            self.assertEqual(IMAGE_ID, parser.image_id)
+            # Memory use does not grow with the size of the log
+            self.assertLess(peak, 1024 * 1024)
@@ -33,6 +33,38 @@ class TestIngressControllerBaseProvider(unittest.TestCase):
 
         self.assertEqual(expected_id, actual_id)
 
+    def test_docker_image_id_from_image_name_memoized_until_images_change(self):
+        calls = []
+
+        def output(cmd, **kwargs):
+            calls.append(cmd)
+            return 'sha256:aaaa\n', ''
+
+        provider = TestIngressControllerBaseProvider.mock_provider(output)
+        provider._docker_image_id_from_image_name('nginx:1.21')
+        provider._docker_image_id_from_image_name('nginx:1.21')
+        self.assertEqual(1, len(calls))
+
+        provider._docker_tag('nginx:1.21', 'nginx:latest')
+        provider._docker_image_id_from_image_name('nginx:1.21')
+        self.assertEqual(3, len(calls))
+
+    def test_docker_query_during_change_not_reused_after_it(self):
+        image_ids = {'nginx:latest': ''}
+
+        def output(cmd, **kwargs):
+            if cmd.startswith('docker tag'):
+                # Another thread queries the image while it is being tagged
+                provider._docker_image_id_from_image_name('nginx:latest')
+                image_ids['nginx:latest'] = 'sha256:aaaa'
+                return '', ''
+            image_name = cmd.split('"')[1]
+            return f'{image_ids[image_name]}\n', ''
+
+        provider = TestIngressControllerBaseProvider.mock_provider(output)
+        provider._docker_tag('nginx:1.21', 'nginx:latest')
+        self.assertEqual('sha256:aaaa', provider._docker_image_id_from_image_name('nginx:latest'))
+
     def test_docker_delete_image_from_existing_image(self):
         def output(**kwargs):
             return '''Untagged: aevea/commitsar:latest
@@ -1,8 +1,19 @@
+import hashlib
+import json
 import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 from ingress_controller_image_builder_provider import IngressControllerImageBuilderProvider
 
 from kic_util.docker_image_name import DockerImageName
+from kic_util.workspace import WorkspaceManager
 
 
 class TestIngressControllerImageBuilderProvider(unittest.TestCase):
@@ -184,3 +195,258 @@ class TestIngressControllerImageBuilderProvider(unittest.TestCase):
         expected = 'sha256:9358beb5cb1c6d6a9c005b18bdad08b0f2259b82d32687b03334256cbd500997'
         actual = self.provider.parse_image_id_from_output(stderr)
         self.assertEqual(expected, actual)
+
+
+def image_id(make_target: str) -> str:
+    return f"sha256:{hashlib.sha256(make_target.encode('utf-8')).hexdigest()}"
+
+
+class TestIngressControllerImageBuilderProviderBuild(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp_dir.name, 'kubernetes-ingress')
+        os.makedirs(self.source_dir)
+        with open(os.path.join(self.source_dir, 'Makefile'), 'w') as f:
+            f.write('debian-image:\n')
+        self.labels = {}
+        self.tags = {}
+        self.builds = []
+        self.build_dirs = []
+        self.build_dir_listings = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        manager = WorkspaceManager(root=os.path.join(self.tmp_dir.name, 'workspaces'))
+        self.provider = IngressControllerImageBuilderProvider(debug_logger_func=lambda msg: None,
+                                                              build_runner=self.make,
+                                                              workspace_manager=manager)
+        self.provider.runner = self.docker
+
+        patches = [mock.patch.object(IngressControllerImageBuilderProvider, 'BUILD_RECORD_DIR',
+                                     os.path.join(self.tmp_dir.name, 'builds')),
+                   mock.patch.object(IngressControllerImageBuilderProvider, 'find_kic_source_dir',
+                                     return_value=self.source_dir)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def docker(self, cmd: str, **kwargs):
+        if cmd.startswith('docker image ls') and '--filter' in cmd:
+            build_hash = cmd.split('"')[1].split('=')[-1]
+            return ''.join(f'{image}\n' for image, label in self.labels.items() if label == build_hash), ''
+        if cmd.startswith('docker image inspect'):
+            return json.dumps(sorted(self.tags.get(cmd.split('"')[-2], []))) + '\n', ''
+        if cmd.startswith('docker image ls'):
+            image_type = cmd.split('"')[1].split('-')[-1]
+            return f'{image_id(f"{image_type}-image")}\n', ''
+        if cmd.startswith('docker tag'):
+            source, target = cmd.split('"')[1::2]
+            self.tags.setdefault(source, set()).add(target)
+        return '', ''
+
+    def make(self, cmd, env, cwd, on_stdout_line, on_stderr_line, **kwargs):
+        make_target = cmd[1]
+        with self.lock:
+            self.builds.append(make_target)
+            self.build_dirs.append(cwd)
+            self.build_dir_listings.append(sorted(os.listdir(cwd)))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        # Give other builds the chance to start
+        time.sleep(0.05)
+        label = env['DOCKER_BUILD_OPTIONS'].split('--label=')[1].split('=')[1]
+        with self.lock:
+            self.labels[image_id(make_target)] = label
+            self.running -= 1
+        stdout = 'docker build -t nginx/nginx-ingress:2.4.2 .'
+        stderr = f'#19 writing image {image_id(make_target)} done'
+        on_stdout_line(stdout)
+        on_stderr_line(stderr)
+        return stdout, stderr
+
+    def build(self, **props):
+        return self.provider.build_image({'kic_src_url': 'https://example.com/kic.tar.gz',
+                                          'make_target': 'debian-image',
+                                          'nginx_plus_args': None,
+                                          **props})
+
+    def test_unchanged_source_is_not_rebuilt(self):
+        first = self.build()
+        second = self.build()
+        self.assertEqual(1, len(self.builds))
+        self.assertEqual(first, second)
+        self.assertEqual(self.labels[image_id('debian-image')], first['build_hash'])
+
+    def test_changed_source_is_rebuilt(self):
+        first = self.build()
+        with open(os.path.join(self.source_dir, 'Makefile'), 'a') as f:
+            f.write('alpine-image:\n')
+        second = self.build()
+        self.assertEqual(2, len(self.builds))
+        self.assertNotEqual(first['build_hash'], second['build_hash'])
+
+    def test_removed_image_is_rebuilt(self):
+        self.build()
+        self.labels.clear()
+        self.provider.docker_query_cache.invalidate()
+        self.build()
+        self.assertEqual(2, len(self.builds))
+
+    def test_image_found_by_label_without_build_record(self):
+        first = self.build()
+        shutil.rmtree(os.path.join(self.tmp_dir.name, 'builds'))
+        self.provider.docker_query_cache.invalidate()
+        second = self.build()
+        self.assertEqual(1, len(self.builds))
+        for key in ['image_id', 'image_name_alias', 'image_tag', 'image_tag_alias', 'make_target', 'build_hash']:
+            self.assertEqual(first[key], second[key])
+
+    def test_diff_compares_build_hashes(self):
+        news = {'kic_src_url': 'https://example.com/kic.tar.gz', 'make_target': 'debian-image',
+                'make_targets': ['debian-image', 'alpine-image'], 'nginx_plus_args': None}
+        olds = {**news, **self.build(**news)}
+        self.assertFalse(self.provider.diff('id', dict(olds), news).changes)
+
+        # A URL such as a branch may refer to different source than what the images were built from
+        with open(os.path.join(self.source_dir, 'Makefile'), 'a') as f:
+            f.write('alpine-image:\n')
+        self.assertTrue(self.provider.diff('id', dict(olds), news).changes)
+        self.assertTrue(self.provider.diff('id', {**olds, 'variants': None, 'build_hash': None}, news).changes)
+
+    def test_built_in_private_copy_of_source(self):
+        nginx_plus_args = {}
+        for name in ['key', 'cert']:
+            nginx_plus_args[f'{name}_path'] = os.path.join(self.tmp_dir.name, f'nginx-repo.{name}')
+            with open(nginx_plus_args[f'{name}_path'], 'w'):
+                pass
+
+        self.build(make_targets=['debian-image', 'alpine-image'], nginx_plus_args=nginx_plus_args)
+        # Both variants were built in the same copy, which had the NGINX Plus files linked into it
+        self.assertEqual(1, len(set(self.build_dirs)))
+        build_dir = self.build_dirs[0]
+        self.assertNotEqual(self.source_dir, build_dir)
+        self.assertEqual(['Makefile', 'nginx-repo.crt', 'nginx-repo.key'], self.build_dir_listings[0])
+        # The shared source directory was left alone and the copy was removed once the builds finished
+        self.assertEqual(['Makefile'], os.listdir(self.source_dir))
+        self.assertFalse(os.path.exists(build_dir))
+
+    def test_build_hash_depends_on_make_target_and_ignores_plus_links(self):
+        debian = IngressControllerImageBuilderProvider.build_hash(self.source_dir, 'debian-image')
+        alpine = IngressControllerImageBuilderProvider.build_hash(self.source_dir, 'alpine-image')
+        self.assertNotEqual(debian, alpine)
+        os.symlink(os.path.join(self.tmp_dir.name, 'key'), os.path.join(self.source_dir, 'nginx-repo.key'))
+        self.assertEqual(debian, IngressControllerImageBuilderProvider.build_hash(self.source_dir, 'debian-image'))
+
+    def test_make_targets(self):
+        self.assertEqual(['debian-image'], IngressControllerImageBuilderProvider.make_targets({}))
+        self.assertEqual(['alpine-image', 'debian-image'],
+                         IngressControllerImageBuilderProvider.make_targets(
+                             {'make_target': 'alpine-image', 'make_targets': ['debian-image', 'alpine-image']}))
+
+    def test_variants_built_concurrently_from_one_source(self):
+        outputs = self.build(make_targets=['debian-image', 'alpine-image', 'debian-image-plus'],
+                             max_concurrent_builds=3)
+        self.assertEqual(3, len(self.builds))
+        self.assertEqual(3, self.max_running)
+        self.assertEqual(image_id('debian-image'), outputs['image_id'])
+        self.assertEqual({'debian-image', 'alpine-image', 'debian-image-plus'}, set(outputs['variants']))
+        alpine = outputs['variants']['alpine-image']
+        self.assertEqual(image_id('alpine-image'), alpine['image_id'])
+        self.assertEqual('nginx/nginx-ingress:2.4.2-alpine', alpine['image_name'])
+        self.assertEqual('nginx/nginx-ingress:2.4.2-alpine', alpine['image_name_alias'])
+        self.assertEqual('nginx/nginx-ingress:2.4.2', outputs['image_name'])
+        # The shared image name refers to the primary image after every build finished
+        self.assertIn('nginx/nginx-ingress:2.4.2', self.tags[image_id('debian-image')])
+
+    def test_concurrency_limit(self):
+        self.build(make_targets=['debian-image', 'alpine-image', 'openshift-image'], max_concurrent_builds=1)
+        self.assertEqual(3, len(self.builds))
+        self.assertEqual(1, self.max_running)
+
+    def test_only_changed_variants_rebuilt(self):
+        self.build()
+        self.builds.clear()
+        outputs = self.build(make_targets=['debian-image', 'alpine-image'])
+        self.assertEqual(['alpine-image'], self.builds)
+        self.assertEqual(image_id('debian-image'), outputs['variants']['debian-image']['image_id'])
+
+
+# Stand-in for make that reports building an image tagged with the version found in its working directory
+STUB_MAKE = """#!{python}
+import hashlib, os, sys, time
+
+with open('VERSION') as f:
+    version = f.read().strip()
+with open({log!r}, 'a') as f:
+    f.write(f'start {{version}}\\n')
+# Stay running long enough for the other build to start
+time.sleep(0.5)
+print(f'docker build -t nginx/nginx-ingress:{{version}} .')
+print(f'#19 writing image sha256:{{hashlib.sha256(version.encode()).hexdigest()}} done', file=sys.stderr)
+with open({log!r}, 'a') as f:
+    f.write(f'end {{version}}\\n')
+"""
+
+
+class TestIngressControllerImageBuilderProviderConcurrentBuilds(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp_dir.name, 'make.log')
+        bin_dir = os.path.join(self.tmp_dir.name, 'bin')
+        os.makedirs(bin_dir)
+        for name in ['gmake', 'make']:
+            make_path = os.path.join(bin_dir, name)
+            with open(make_path, 'w') as f:
+                f.write(STUB_MAKE.format(python=sys.executable, log=self.log_path))
+            os.chmod(make_path, 0o755)
+
+        # Two different KIC source trees, each building a different version
+        self.source_dirs = {}
+        for version in ['2.4.1', '2.4.2']:
+            source_dir = os.path.join(self.tmp_dir.name, f'kubernetes-ingress-{version}')
+            os.makedirs(source_dir)
+            with open(os.path.join(source_dir, 'VERSION'), 'w') as f:
+                f.write(version)
+            self.source_dirs[f'https://example.com/kic-{version}.tar.gz'] = source_dir
+
+        patches = [mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ.get('PATH', '')}),
+                   mock.patch.object(IngressControllerImageBuilderProvider, 'BUILD_RECORD_DIR',
+                                     os.path.join(self.tmp_dir.name, 'builds')),
+                   mock.patch.object(IngressControllerImageBuilderProvider, 'find_kic_source_dir',
+                                     side_effect=self.source_dirs.get)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def docker(cmd: str, **kwargs):
+        # No image has been built before
+        return '', ''
+
+    def build(self, url: str):
+        manager = WorkspaceManager(root=os.path.join(self.tmp_dir.name, 'workspaces'))
+        provider = IngressControllerImageBuilderProvider(debug_logger_func=lambda msg: None,
+                                                         workspace_manager=manager)
+        provider.runner = self.docker
+        return provider.build_image({'kic_src_url': url, 'make_target': 'debian-image', 'nginx_plus_args': None})
+
+    def test_sources_built_at_the_same_time(self):
+        cwd = os.getcwd()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            outputs = dict(zip(self.source_dirs, executor.map(self.build, self.source_dirs)))
+
+        # Each build ran in its own source tree and the working directory of this process was left alone
+        self.assertEqual('nginx/nginx-ingress:2.4.1', outputs['https://example.com/kic-2.4.1.tar.gz']['image_name'])
+        self.assertEqual('nginx/nginx-ingress:2.4.2', outputs['https://example.com/kic-2.4.2.tar.gz']['image_name'])
+        self.assertEqual(cwd, os.getcwd())
+
+        # Both builds started before either of them finished
+        with open(self.log_path) as f:
+            events = [line.split()[0] for line in f]
+        self.assertEqual(['start', 'start', 'end', 'end'], events)
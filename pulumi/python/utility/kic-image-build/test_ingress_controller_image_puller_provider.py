@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from ingress_controller_image_puller_provider import IngressControllerImagePullerProvider
+
+IMAGE_ID = 'sha256:e8c613e07b0b7ff33893b694f7759a10d42e180f2b4dc349fb57dc6b71dcab00'
+DIGEST = 'sha256:9358beb5cb1c6d6a9c005b18bdad08b0f2259b82d32687b03334256cbd500997'
+NEW_DIGEST = 'sha256:14b46a9847c33680288f606efc1d8af09f2f149e034235645d17e9bc0e5217db'
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    """Stand-in for an anonymous registry:2 server that reports the digests that image tags refer to"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.server.heads += 1
+        digest = self.server.digests.get(self.path)
+        if not digest:
+            self.send_response(404)
+        else:
+            self.send_response(200)
+            self.send_header('Docker-Content-Digest', digest)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestIngressControllerImagePullerProviderDiff(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RegistryHandler)
+        self.server.digests = {'/v2/nginx/nginx-ingress/manifests/2.4.2': DIGEST,
+                               '/v2/otel/opentelemetry-collector/manifests/0.60.0': DIGEST,
+                               '/v2/beats/filebeat/manifests/8.4.3': DIGEST}
+        self.server.heads = 0
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.repository = f'127.0.0.1:{self.server.server_address[1]}/nginx/nginx-ingress'
+        self.image_name = f'{self.repository}:2.4.2'
+        self.registry = f'127.0.0.1:{self.server.server_address[1]}'
+        self.prepull_images = [f'{self.registry}/otel/opentelemetry-collector:0.60.0',
+                               f'{self.registry}/beats/filebeat:8.4.3']
+        self.local_image_id = IMAGE_ID
+        self.docker_cmds = []
+        self.lock = threading.Lock()
+        self.pulling = 0
+        self.max_pulling = 0
+        self.provider = IngressControllerImagePullerProvider(debug_logger_func=lambda msg: None)
+        self.provider.runner = self.docker
+
+        # No credentials are stored for the registry
+        config_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(config_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'DOCKER_CONFIG': config_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def docker(self, cmd: str, **kwargs):
+        image_name = cmd.split('"')[-2]
+        with self.lock:
+            self.docker_cmds.append(cmd)
+        if cmd.startswith('docker pull'):
+            with self.lock:
+                self.pulling += 1
+                self.max_pulling = max(self.max_pulling, self.pulling)
+            # Give other pulls the chance to start
+            time.sleep(0.05)
+            with self.lock:
+                self.pulling -= 1
+            return f'{image_name}\n', ''
+        if cmd.startswith('docker image ls'):
+            return f'{self.local_image_id}\n', ''
+        if '.Size' in cmd:
+            return '52428800\n', ''
+        if cmd.startswith('docker image inspect'):
+            repository, tag = image_name.rsplit(':', 1)
+            digest = self.server.digests[f"/v2/{repository.split('/', 1)[1]}/manifests/{tag}"]
+            return f'["other.example.com/kic@{NEW_DIGEST}","{repository}@{digest}"]\n', ''
+        return '', ''
+
+    def props(self, **props) -> dict:
+        return {'image_name': self.image_name, **props}
+
+    def pulled(self, **props) -> dict:
+        outputs = {**self.props(**props), **self.provider.pull(self.props(**props))}
+        self.provider.docker_query_cache.invalidate()
+        self.server.heads = 0
+        return outputs
+
+    def test_pull_records_digest(self):
+        outputs = self.pulled()
+        self.assertEqual(IMAGE_ID, outputs['image_id'])
+        self.assertEqual(DIGEST, outputs['image_digest'])
+
+    def test_unchanged_digest_is_not_pulled(self):
+        olds = self.pulled()
+        self.docker_cmds.clear()
+        result = self.provider.diff('id', olds, {'image_name': self.image_name})
+        self.assertFalse(result.changes)
+        self.assertEqual(1, self.server.heads)
+        self.assertFalse([cmd for cmd in self.docker_cmds if cmd.startswith('docker pull')])
+
+    def test_moved_tag_is_pulled(self):
+        olds = self.pulled()
+        self.server.digests['/v2/nginx/nginx-ingress/manifests/2.4.2'] = NEW_DIGEST
+        self.assertTrue(self.provider.diff('id', olds, {'image_name': self.image_name}).changes)
+
+    def test_changed_image_name_is_pulled(self):
+        olds = self.pulled()
+        self.assertTrue(self.provider.diff('id', olds, {'image_name': f'{self.repository}:2.4.3'}).changes)
+        self.assertEqual(0, self.server.heads)
+
+    def test_removed_local_image_is_pulled(self):
+        olds = self.pulled()
+        self.local_image_id = ''
+        self.assertTrue(self.provider.diff('id', olds, {'image_name': self.image_name}).changes)
+
+    def test_missing_digest_or_unreachable_registry_is_pulled(self):
+        olds = self.pulled()
+        self.assertTrue(self.provider.diff('id', {**olds, 'image_digest': None, 'pulled_images': None},
+                                           {'image_name': self.image_name}).changes)
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertTrue(self.provider.diff('id', olds, {'image_name': self.image_name}).changes)
+
+    def test_prepull_images_pulled_concurrently(self):
+        outputs = self.pulled(prepull_images=self.prepull_images + [self.image_name], max_concurrent_pulls=2)
+        self.assertEqual(2, self.max_pulling)
+        self.assertEqual([self.image_name] + self.prepull_images, list(outputs['pulled_images']))
+        filebeat = outputs['pulled_images'][self.prepull_images[1]]
+        self.assertEqual(DIGEST, filebeat['image_digest'])
+        self.assertEqual(52428800, filebeat['size_bytes'])
+        self.assertGreater(filebeat['pull_seconds'], 0)
+
+    def test_changed_prepull_image_is_pulled(self):
+        olds = self.pulled(prepull_images=self.prepull_images)
+        news = self.props(prepull_images=self.prepull_images)
+        self.assertFalse(self.provider.diff('id', olds, news).changes)
+        self.assertEqual(3, self.server.heads)
+
+        self.server.digests['/v2/beats/filebeat/manifests/8.4.3'] = NEW_DIGEST
+        self.assertTrue(self.provider.diff('id', olds, news).changes)
+
+    def test_added_prepull_image_is_pulled(self):
+        olds = self.pulled()
+        news = self.props(prepull_images=self.prepull_images)
+        self.assertTrue(self.provider.diff('id', olds, news).changes)
+        self.assertEqual(0, self.server.heads)
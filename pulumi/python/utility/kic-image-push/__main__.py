@@ -1,19 +1,12 @@
 import importlib
-import os
 import pulumi
 from pulumi import Output
-from kic_util import pulumi_config
+from kic_util import pulumi_config, project_index
 from registries.base_registry import ContainerRegistry
 
 from repository_push import RepositoryPush, RepositoryPushArgs
 
 
-def project_name_from_project_dir(dirname: str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_path = os.path.join(script_dir, '..', dirname)
-    return pulumi_config.get_pulumi_project_name(project_path)
-
-
 def select_image_name(image):
     if 'image_name_alias' in image:
         return image['image_name_alias']
@@ -45,7 +38,7 @@ project_name = pulumi.get_project()
 pulumi_user = pulumi_config.get_pulumi_user()
 k8s_config = pulumi.Config('kubernetes')
 
-kic_image_build_project_name = project_name_from_project_dir('kic-image-build')
+kic_image_build_project_name = project_index.project_name('utility/kic-image-build')
 kic_image_build_stack_ref_id = f"{pulumi_user}/{kic_image_build_project_name}/{stack_name}"
 kick_image_build_stack_ref = pulumi.StackReference(kic_image_build_stack_ref_id)
 ingress_image = kick_image_build_stack_ref.require_output('ingress_image')
@@ -1,11 +1,9 @@
-import os
-
 import requests
 from typing import List, Any
 
 from pulumi import Output, StackReference, log
 from pulumi_aws import ecr
-from kic_util import pulumi_config
+from kic_util import project_index
 from registries.base_registry import ContainerRegistry, RegistryCredentials
 
 
@@ -13,7 +11,7 @@ class ElasticContainerRegistry(ContainerRegistry):
     @classmethod
     def instance(cls, stack_name: str, pulumi_user: str) -> Output[ContainerRegistry]:
         super().instance(stack_name, pulumi_user)
-        ecr_project_name = ElasticContainerRegistry.aws_project_name_from_project_dir('ecr')
+        ecr_project_name = project_index.project_name('infrastructure/aws/ecr')
         ecr_stack_ref_id = f"{pulumi_user}/{ecr_project_name}/{stack_name}"
         stack_ref = StackReference(ecr_stack_ref_id)
         # Async query for credentials from stack reference
@@ -29,12 +27,6 @@ class ElasticContainerRegistry(ContainerRegistry):
 
         return Output.all(repository_url_output, credentials_output).apply(_make_instance)
 
-    @staticmethod
-    def aws_project_name_from_project_dir(dirname: str):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_path = os.path.join(script_dir, '..', '..', '..', 'infrastructure', 'aws', dirname)
-        return pulumi_config.get_pulumi_project_name(project_path)
-
     @staticmethod
     def get_ecr_credentials(registry_id: str) -> RegistryCredentials:
         credentials = ecr.get_credentials(registry_id)
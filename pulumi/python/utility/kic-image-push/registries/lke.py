@@ -1,9 +1,8 @@
 import json
-import os
 from typing import List, Any
 from pulumi import Output, StackReference, ResourceOptions, log
 
-from kic_util import pulumi_config
+from kic_util import project_index
 from registries.base_registry import ContainerRegistry, RegistryCredentials
 
 
@@ -12,7 +11,7 @@ class LinodeHarborRegistry(ContainerRegistry):
     def instance(cls, stack_name: str, pulumi_user: str) -> Output[ContainerRegistry]:
         super().instance(stack_name, pulumi_user)
         # Pull properties from the Pulumi project that defines the Linode Harbor repository
-        container_registry_project_name = LinodeHarborRegistry.project_name_from_linode_dir('harbor')
+        container_registry_project_name = project_index.project_name('infrastructure/linode/harbor')
         container_registry_stack_ref_id = f"{pulumi_user}/{container_registry_project_name}/{stack_name}"
         stack_ref = StackReference(container_registry_stack_ref_id)
         harbor_hostname_output = stack_ref.require_output('harbor_hostname')
@@ -31,12 +30,6 @@ class LinodeHarborRegistry(ContainerRegistry):
 
         return Output.all(harbor_hostname_output, harbor_user_output, harbor_password_output).apply(_make_instance)
 
-    @staticmethod
-    def project_name_from_linode_dir(dirname: str):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_path = os.path.join(script_dir, '..', '..', '..', 'infrastructure', 'linode', dirname)
-        return pulumi_config.get_pulumi_project_name(project_path)
-
     def registry_implementation_name(self) -> str:
         return 'Harbor'
 
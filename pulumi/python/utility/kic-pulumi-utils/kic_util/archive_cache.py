@@ -0,0 +1,212 @@
+"""
+This file contains a content-addressed cache for downloaded archives. Archives are stored by the SHA-256 digest of
+their content, and the URL each archive was downloaded from is recorded together with its ETag/Last-Modified
+validators. Subsequent requests for the same URL are revalidated with a conditional request, so an unchanged archive
+is never downloaded again. An interrupted download is resumed by the next request for the same URL. Extracted copies
+of archives are also kept, so that an unchanged archive is not extracted again either.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict
+from urllib import error
+
+from kic_util import archive_extract, http_download
+
+# Environment variable that can be set to change the directory in which archives are cached
+CACHE_DIR_ENV_VAR = 'MARA_ARCHIVE_CACHE_DIR'
+# Default directory in which archives are cached
+DEFAULT_CACHE_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                      'mara', 'archives'])
+# Number of bytes read at a time when computing the digest of an archive
+HASH_CHUNK_SIZE = 1024 * 1024
+# Suffix of the file written next to an extraction directory once the extraction has completed
+EXTRACTION_COMPLETE_SUFFIX = '.complete'
+
+
+class ArchiveChecksumError(RuntimeError):
+    """Error when the content of a downloaded archive does not match the expected checksum"""
+    def __init__(self, url: str, expected: str, actual: str):
+        self.url = url
+        self.expected = expected
+        self.actual = actual
+        super().__init__(f'Checksum of archive downloaded from [{url}] is sha256:{actual} '
+                         f'but expected sha256:{expected}')
+
+
+def default_cache_dir() -> str:
+    return os.environ.get(CACHE_DIR_ENV_VAR) or DEFAULT_CACHE_DIR
+
+
+def _normalize_checksum(checksum: Optional[str]) -> Optional[str]:
+    if not checksum:
+        return None
+    checksum = checksum.lower()
+    return checksum[len('sha256:'):] if checksum.startswith('sha256:') else checksum
+
+
+class ArchiveCache:
+    """Content-addressed cache of downloaded archives and their extracted contents"""
+    cache_dir: str
+    on_progress: Optional[http_download.ProgressCallback]
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 on_progress: Optional[http_download.ProgressCallback] = None) -> None:
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.on_progress = on_progress
+
+    def _path(self, *parts: str) -> str:
+        return os.path.sep.join([self.cache_dir, *parts])
+
+    def blob_path(self, sha256: str) -> str:
+        """Path of the archive with the given digest"""
+        return self._path('blobs', f'{sha256}.tar.gz')
+
+    def extraction_path(self, sha256: str) -> str:
+        """Path of the directory into which the archive with the given digest is extracted"""
+        return self._path('extracted', sha256)
+
+    def url_metadata_path(self, url: str) -> str:
+        """Path of the file recording the digest and validators of the archive last downloaded from the URL"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self._path('urls', f'{digest}.json')
+
+    def _read_url_metadata(self, url: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self.url_metadata_path(url), 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not os.path.isfile(self.blob_path(metadata.get('sha256', ''))):
+            return None
+        return metadata
+
+    def _write_url_metadata(self, url: str, metadata: Dict[str, str]):
+        path = self.url_metadata_path(url)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.url_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(temp_path, path)
+
+    def download_path(self, url: str) -> str:
+        """Path that the archive at the URL is downloaded into before it is moved to its digest's path - a partial
+        download left at this path is resumed by the next download of the URL"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self._path('blobs', f'.download_{digest}')
+
+    @contextmanager
+    def _locked(self, path: str):
+        """Holds a lock on a path of the cache that is shared with other processes"""
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with open(path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _store_download(self, download_path: str) -> str:
+        """Moves a completed download to the path of its digest, returning the digest"""
+        digest = hashlib.sha256()
+        with open(download_path, 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        os.replace(download_path, self.blob_path(sha256))
+        return sha256
+
+    def fetch(self, url: str, expected_sha256: Optional[str] = None) -> str:
+        """Returns the digest of the archive at the URL, downloading it only when it is not already cached.
+        :param url: URL of the archive
+        :param expected_sha256: optional SHA-256 checksum that the archive must match - when an archive with this
+                                checksum is already cached, no request is made at all
+        :return: SHA-256 digest of the cached archive
+        """
+        expected_sha256 = _normalize_checksum(expected_sha256)
+        if expected_sha256 and os.path.isfile(self.blob_path(expected_sha256)):
+            return expected_sha256
+
+        # Downloads of the same URL share a partial file, so only one process downloads the URL at a time. Others
+        # wait and then revalidate what it downloaded.
+        with self._locked(self.download_path(url)):
+            return self._fetch(url=url, expected_sha256=expected_sha256)
+
+    def _fetch(self, url: str, expected_sha256: Optional[str]) -> str:
+        metadata = self._read_url_metadata(url)
+        headers = {}
+        if metadata and metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata and metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+
+        download_path = self.download_path(url)
+        try:
+            result = http_download.download(url=url, dest_path=download_path, headers=headers,
+                                            on_progress=self.on_progress)
+            sha256 = self._store_download(download_path)
+            metadata = {'url': url,
+                        'sha256': sha256,
+                        'etag': result.headers.get('ETag'),
+                        'last_modified': result.headers.get('Last-Modified'),
+                        'fetched': time.time()}
+        except error.HTTPError as e:
+            if e.code != 304 or not metadata:
+                raise
+            # The archive has not changed since it was last downloaded
+            http_download.discard_partial(download_path)
+            sha256 = metadata['sha256']
+
+        if expected_sha256 and sha256 != expected_sha256:
+            raise ArchiveChecksumError(url=url, expected=expected_sha256, actual=sha256)
+
+        self._write_url_metadata(url, metadata)
+        return sha256
+
+    def extract(self, url: str, expected_sha256: Optional[str] = None) -> str:
+        """Returns a directory containing the extracted contents of the tar.gz archive at the URL, reusing an
+        earlier extraction of the same archive when one exists.
+        :param url: URL of the archive
+        :param expected_sha256: optional SHA-256 checksum that the archive must match
+        :return: path to the directory containing the extracted archive
+        """
+        sha256 = self.fetch(url=url, expected_sha256=expected_sha256)
+        extract_dir = self.extraction_path(sha256)
+        complete_marker = f'{extract_dir}{EXTRACTION_COMPLETE_SUFFIX}'
+        if os.path.isfile(complete_marker) and os.path.isdir(extract_dir):
+            return extract_dir
+
+        # Extract into a temporary directory that is moved into place once complete, so that an interrupted
+        # extraction is never mistaken for a complete one
+        parent_dir = os.path.dirname(extract_dir)
+        os.makedirs(parent_dir, mode=0o700, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=parent_dir, prefix='.extract_')
+        try:
+            archive_extract.extract_targz_file(archive_path=self.blob_path(sha256), dest_dir=temp_dir)
+            # Another process may have completed the same extraction in the meantime, in which case its directory
+            # may already be in use and this extraction is discarded instead
+            with self._locked(extract_dir):
+                if os.path.isfile(complete_marker) and os.path.isdir(extract_dir):
+                    shutil.rmtree(temp_dir)
+                    return extract_dir
+                if os.path.isdir(extract_dir):
+                    # Left behind by an interrupted extraction
+                    shutil.rmtree(extract_dir)
+                os.replace(temp_dir, extract_dir)
+                with open(complete_marker, 'w'):
+                    pass
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        return extract_dir
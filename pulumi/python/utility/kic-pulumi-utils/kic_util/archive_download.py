@@ -1,13 +1,13 @@
-import atexit
-import gzip
-import os
-import shutil
-import tarfile
+import hashlib
 import tempfile
 from git import Repo
-from typing import Optional
+from typing import Optional, List
 from urllib import request, parse
+from kic_util import archive_extract, http_download, workspace
 from kic_util.url_type import URLType
+from kic_util.archive_cache import ArchiveCache
+from kic_util.git_mirror import GitMirror
+from kic_util.workspace import WorkspaceManager
 
 
 class DownloadExtractError(RuntimeError):
@@ -28,28 +28,43 @@ class DownloadExtractError(RuntimeError):
         return self.msg()
 
 
-def download_and_extract_archive_from_url(url: str) -> str:
+def download_and_extract_archive_from_url(url: str,
+                                          expected_sha256: Optional[str] = None,
+                                          use_cache: bool = True,
+                                          on_progress: Optional[http_download.ProgressCallback] = None) -> str:
+    """Downloads and extracts the archive at the URL (or clones the git repository), returning the path to the
+    directory containing its contents.
+
+    :param url: URL of a tar.gz archive, a git repository or a local path
+    :param expected_sha256: optional SHA-256 checksum that a downloaded tar.gz archive must match
+    :param use_cache: if true, downloaded tar.gz archives and their extracted contents are cached and reused, and
+                      git repositories are checked out from a local mirror
+    :param on_progress: optional callback receiving the progress of tar.gz archive downloads
+    :return: path to the directory containing the contents of the archive
+    """
     parsed_url = parse.urlparse(url)
     archive_url_type = URLType.from_parsed_url(parsed_url)
 
-    if archive_url_type == URLType.GENERAL_TAR_GZ:
+    if archive_url_type == URLType.GENERAL_TAR_GZ and use_cache:
+        return download_and_extract_cached_targz_archive_from_url(url=url, expected_sha256=expected_sha256,
+                                                                  cache=ArchiveCache(on_progress=on_progress))
+    elif archive_url_type == URLType.GENERAL_TAR_GZ:
         return download_and_extract_targz_archive_from_url(url=url, temp_prefix='archive_download_')
     elif archive_url_type == URLType.LOCAL_TAR_GZ:
         return download_and_extract_targz_archive_from_url(url=url, temp_prefix='archive_local_')
     elif archive_url_type == URLType.LOCAL_PATH:
         return parsed_url.path
     elif archive_url_type == URLType.GIT_REPO:
-        return checkout_from_git(parsed_url=parsed_url, temp_prefix='archive_git_')
+        return checkout_from_git(parsed_url=parsed_url, temp_prefix='archive_git_', use_cache=use_cache)
 
     raise ValueError(f'Unable to download archive for unsupported url: {url}')
 
 
-def download_and_extract_targz_archive_from_url(url: str, temp_prefix: Optional[str]) -> str:
+def download_and_extract_targz_archive_from_url(url: str, temp_prefix: Optional[str],
+                                                paths: Optional[List[str]] = None) -> str:
     def download(extract_dir: tempfile):
         with request.urlopen(url) as response:
-            with gzip.GzipFile(fileobj=response) as uncompressed:
-                with tarfile.TarFile(fileobj=uncompressed) as tarball:
-                    tarball.extractall(path=extract_dir)
+            archive_extract.extract_targz(response, dest_dir=extract_dir, paths=paths)
 
     try:
         temp_dir = extract_stream_into_temp_dir(extract_func=download, temp_prefix=temp_prefix)
@@ -61,7 +76,20 @@ def download_and_extract_targz_archive_from_url(url: str, temp_prefix: Optional[
         raise DownloadExtractError(url=url, temp_dir=None) from e
 
 
-def checkout_from_git(parsed_url: parse.ParseResult, temp_prefix: Optional[str]) -> str:
+def download_and_extract_cached_targz_archive_from_url(url: str,
+                                                       expected_sha256: Optional[str] = None,
+                                                       cache: Optional[ArchiveCache] = None) -> str:
+    """Returns the extracted contents of a tar.gz archive from the archive cache, downloading the archive only when
+    it has changed since it was last downloaded. The returned directory is shared with later callers, so it
+    should not be modified."""
+    cache = cache or ArchiveCache()
+    try:
+        return cache.extract(url=url, expected_sha256=expected_sha256)
+    except Exception as e:
+        raise DownloadExtractError(url=url, temp_dir=None) from e
+
+
+def checkout_from_git(parsed_url: parse.ParseResult, temp_prefix: Optional[str], use_cache: bool = True) -> str:
     # Rebuild the parsed URL without the fragment so that git understands it.
     url = clone_and_clean_parsed_url(parsed_url).geturl()
     tag = parsed_url.fragment
@@ -76,8 +104,17 @@ def checkout_from_git(parsed_url: parse.ParseResult, temp_prefix: Optional[str])
         Repo.clone_from(url=url, to_path=working_dir, multi_options=opts)
 
     try:
-        temp_dir = extract_stream_into_temp_dir(extract_func=checkout, temp_prefix=temp_prefix)
-        return str(temp_dir)
+        if not use_cache:
+            return extract_stream_into_temp_dir(extract_func=checkout, temp_prefix=temp_prefix)
+
+        # Checkouts are named by the commit that they contain, so that a checkout of an unchanged ref is reused
+        mirror = GitMirror(url=url)
+        commit = mirror.fetch(ref=tag or None)
+        url_digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        return extract_stream_into_temp_dir(extract_func=lambda working_dir: mirror.worktree(dest_dir=working_dir,
+                                                                                             ref=commit),
+                                            temp_prefix=temp_prefix,
+                                            workspace_name=f'{temp_prefix}{url_digest}_{commit}')
     except DownloadExtractError as e:
         e.url = url
         raise e
@@ -112,17 +149,23 @@ def clone_and_clean_parsed_url(parsed_url: parse.ParseResult) -> parse.ParseResu
                              params='')
 
 
-def extract_stream_into_temp_dir(extract_func, temp_prefix: Optional[str]) -> str:
-    temp_dir = tempfile.mkdtemp(prefix=temp_prefix)
-    # Limit access of directory to only the creating user
-    os.chmod(path=temp_dir, mode=0o0700)
-    # Delete extracted directory upon exit, so that we don't have cruft lying around
-    atexit.register(lambda: shutil.rmtree(temp_dir))
+def extract_stream_into_temp_dir(extract_func, temp_prefix: Optional[str], workspace_name: Optional[str] = None,
+                                 manager: Optional[WorkspaceManager] = None) -> str:
+    """Runs the extract function in a workspace directory, returning the directory's path. Workspace directories
+    are only accessible to the creating user and are removed by the workspace manager rather than when the
+    process exits.
 
-    # Download archive
+    :param extract_func: function that populates the directory given to it
+    :param temp_prefix: prefix of the name of the directory when no workspace name is given
+    :param workspace_name: if given, a workspace already prepared with this name is reused rather than extracting
+                           into a new directory
+    :param manager: workspace manager (defaults to the one shared within this process)
+    :return: path to the populated directory
+    """
+    manager = manager or workspace.default_manager()
     try:
-        extract_func(temp_dir)
+        if workspace_name:
+            return manager.prepare(name=workspace_name, prepare_func=extract_func)
+        return manager.create_ephemeral(prefix=temp_prefix or 'workspace_', prepare_func=extract_func)
     except Exception as e:
-        raise DownloadExtractError(url=None, temp_dir=temp_dir) from e
-
-    return str(temp_dir)
+        raise DownloadExtractError(url=None, temp_dir=None) from e
@@ -0,0 +1,290 @@
+"""
+This file contains a streaming extractor for tar.gz archives. Reading the compressed stream, decompressing it and
+writing the extracted files each happen on their own threads, so that a slow download, decompression and disk
+writes overlap rather than running one after another. When pigz is installed it is used to decompress local
+archives on multiple cores. Every member is checked before it is extracted, so that an archive cannot write
+outside of the target directory through its paths or links.
+"""
+
+import gzip
+import os
+import queue
+import shutil
+import subprocess
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, List, Iterable, Tuple
+
+# Number of bytes read from the source or decompressed at a time
+READ_CHUNK_SIZE = 1024 * 1024
+# Number of chunks buffered between two stages of the pipeline
+PIPELINE_DEPTH = 8
+# Default number of threads writing extracted files
+DEFAULT_WRITE_WORKERS = 4
+
+
+class UnsafeArchiveMemberError(RuntimeError):
+    """Error when an archive member would be written outside of the target directory or is not a regular
+    file, directory or link"""
+    def __init__(self, member_name: str, reason: str):
+        self.member_name = member_name
+        self.reason = reason
+        super().__init__(f'Refusing to extract archive member [{member_name}]: {reason}')
+
+
+class _PipeReader:
+    """File-like object whose content is read ahead on a background thread from the given read function"""
+    _EOF = object()
+
+    def __init__(self, read_func: Callable[[int], bytes], chunk_size: int = READ_CHUNK_SIZE,
+                 depth: int = PIPELINE_DEPTH, name: str = 'archive-pipe') -> None:
+        self._read_func = read_func
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=depth)
+        self._buffer = bytearray()
+        self._eof = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._pump, name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _pump(self):
+        try:
+            while True:
+                chunk = self._read_func(self._chunk_size)
+                if not chunk:
+                    break
+                if not self._put(bytes(chunk)):
+                    return
+            self._put(self._EOF)
+        except BaseException as e:
+            self._put(e)
+
+    def _fill(self):
+        item = self._queue.get()
+        if item is self._EOF:
+            self._eof = True
+        elif isinstance(item, BaseException):
+            self._eof = True
+            raise item
+        else:
+            self._buffer.extend(item)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+def _normalize_member_name(name: str) -> str:
+    while name.startswith('./'):
+        name = name[2:]
+    return name
+
+
+def _is_within(directory: str, target: str) -> bool:
+    return os.path.commonpath([directory, target]) == directory
+
+
+def check_member(member: tarfile.TarInfo, dest_dir: str):
+    """Raises an UnsafeArchiveMemberError if the member would be extracted outside of the target directory, links
+    to a path outside of it or is a device or FIFO.
+    :param member: archive member to check
+    :param dest_dir: absolute path of the directory the archive is extracted into
+    """
+    name = _normalize_member_name(member.name)
+    if os.path.isabs(name) or os.path.splitdrive(name)[0]:
+        raise UnsafeArchiveMemberError(member.name, 'absolute path')
+
+    target = os.path.normpath(os.path.join(dest_dir, name))
+    if not _is_within(dest_dir, target):
+        raise UnsafeArchiveMemberError(member.name, 'path is outside of the target directory')
+
+    if member.issym() or member.islnk():
+        if os.path.isabs(member.linkname):
+            raise UnsafeArchiveMemberError(member.name, f'absolute link to {member.linkname}')
+        # Symbolic links are relative to the link's directory, hard links to the root of the archive
+        link_base = os.path.dirname(target) if member.issym() else dest_dir
+        link_target = os.path.normpath(os.path.join(link_base, member.linkname))
+        if not _is_within(dest_dir, link_target):
+            raise UnsafeArchiveMemberError(member.name, f'link to {member.linkname} is outside of the target directory')
+    elif not (member.isfile() or member.isdir()):
+        raise UnsafeArchiveMemberError(member.name, 'not a regular file, directory or link')
+
+
+def member_in_paths(name: str, paths: Optional[Iterable[str]]) -> bool:
+    """Returns true if the member name is one of the paths or is below one of them"""
+    if paths is None:
+        return True
+    name = _normalize_member_name(name).rstrip('/')
+    for path in paths:
+        path = _normalize_member_name(path).rstrip('/')
+        if name == path or name.startswith(path + '/'):
+            return True
+    return False
+
+
+def _write_file(path: str, data: bytes, mode: int, mtime: float):
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.chmod(path, mode)
+    os.utime(path, (mtime, mtime))
+
+
+def extract_targz(fileobj, dest_dir: str, paths: Optional[Iterable[str]] = None,
+                  write_workers: int = DEFAULT_WRITE_WORKERS) -> int:
+    """Extracts a tar.gz stream into a directory
+    :param fileobj: file-like object from which the compressed archive is read (e.g. an HTTP response)
+    :param dest_dir: directory the archive is extracted into
+    :param paths: if given, only the members matching or below these paths are extracted
+    :param write_workers: number of threads writing extracted files
+    :return: number of members extracted
+    """
+    compressed = _PipeReader(fileobj.read, name='archive-read')
+    gzip_file = gzip.GzipFile(fileobj=compressed, mode='rb')
+    decompressed = _PipeReader(gzip_file.read, name='archive-decompress')
+    try:
+        return _extract_tar_stream(decompressed, dest_dir=dest_dir, paths=paths, write_workers=write_workers)
+    finally:
+        decompressed.close()
+        compressed.close()
+
+
+def extract_tar(fileobj, dest_dir: str, paths: Optional[Iterable[str]] = None,
+                write_workers: int = DEFAULT_WRITE_WORKERS) -> int:
+    """Extracts an uncompressed tar stream into a directory
+    :param fileobj: file-like object from which the archive is read (e.g. the output of git archive)
+    :param dest_dir: directory the archive is extracted into
+    :param paths: if given, only the members matching or below these paths are extracted
+    :param write_workers: number of threads writing extracted files
+    :return: number of members extracted
+    """
+    stream = _PipeReader(fileobj.read, name='archive-read')
+    try:
+        return _extract_tar_stream(stream, dest_dir=dest_dir, paths=paths, write_workers=write_workers)
+    finally:
+        stream.close()
+
+
+def extract_targz_file(archive_path: str, dest_dir: str, paths: Optional[Iterable[str]] = None,
+                       write_workers: int = DEFAULT_WRITE_WORKERS) -> int:
+    """Extracts a local tar.gz file into a directory, decompressing it with pigz when it is available
+    :param archive_path: path to the archive
+    :param dest_dir: directory the archive is extracted into
+    :param paths: if given, only the members matching or below these paths are extracted
+    :param write_workers: number of threads writing extracted files
+    :return: number of members extracted
+    """
+    pigz_path = shutil.which('pigz')
+    if not pigz_path:
+        with open(archive_path, 'rb') as f:
+            return extract_targz(f, dest_dir=dest_dir, paths=paths, write_workers=write_workers)
+
+    process = subprocess.Popen([pigz_path, '--decompress', '--stdout', archive_path],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    decompressed = _PipeReader(process.stdout.read, name='archive-pigz')
+    try:
+        count = _extract_tar_stream(decompressed, dest_dir=dest_dir, paths=paths, write_workers=write_workers)
+    finally:
+        decompressed.close()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise tarfile.ReadError(f'pigz failed to decompress {archive_path}: {stderr.decode("utf-8", "replace")}')
+    return count
+
+
+def _extract_tar_stream(stream, dest_dir: str, paths: Optional[Iterable[str]], write_workers: int) -> int:
+    dest_dir = os.path.abspath(dest_dir)
+    os.makedirs(dest_dir, exist_ok=True)
+    paths = list(paths) if paths is not None else None
+
+    directories: List[Tuple[str, tarfile.TarInfo]] = []
+    links: List[Tuple[str, tarfile.TarInfo]] = []
+    count = 0
+    # Bounds the number of files held in memory while waiting to be written
+    pending = threading.BoundedSemaphore(write_workers * 4)
+
+    def write(path: str, data: bytes, member: tarfile.TarInfo):
+        try:
+            _write_file(path, data, member.mode & 0o777, member.mtime)
+        finally:
+            pending.release()
+
+    with ThreadPoolExecutor(max_workers=write_workers, thread_name_prefix='archive-write') as executor:
+        futures = []
+        with tarfile.open(fileobj=stream, mode='r|') as tarball:
+            for member in tarball:
+                if not member_in_paths(member.name, paths):
+                    continue
+                check_member(member, dest_dir)
+                target = os.path.normpath(os.path.join(dest_dir, _normalize_member_name(member.name)))
+                count += 1
+
+                if member.isdir():
+                    os.makedirs(target, exist_ok=True)
+                    directories.append((target, member))
+                elif member.isfile():
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    # A streamed member must be read before the next member is read
+                    data = tarball.extractfile(member).read()
+                    pending.acquire()
+                    futures.append(executor.submit(write, target, data, member))
+                else:
+                    # Links are created once every file is written, so that no file is written through a link
+                    links.append((target, member))
+
+        for future in futures:
+            future.result()
+
+    # The link targets were only checked lexically. Links can pass through symbolic links extracted from the
+    # archive (e.g. x -> . and h -> x/../secret), so where they really lead is only known once those exist.
+    real_dest_dir = os.path.realpath(dest_dir)
+    symlinks = [(target, member) for target, member in links if member.issym()]
+    for target, member in symlinks:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.symlink(member.linkname, target)
+    for target, member in symlinks:
+        if not _is_within(real_dest_dir, os.path.realpath(target)):
+            os.unlink(target)
+            raise UnsafeArchiveMemberError(member.name, f'link to {member.linkname} resolves outside of the '
+                                                        f'target directory')
+
+    for target, member in links:
+        if member.issym():
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # os.link follows symbolic links in the target path, so the resolved path is checked
+        link_source = os.path.realpath(os.path.join(dest_dir, _normalize_member_name(member.linkname)))
+        if not _is_within(real_dest_dir, link_source):
+            raise UnsafeArchiveMemberError(member.name, f'link to {member.linkname} resolves outside of the '
+                                                        f'target directory')
+        os.link(link_source, target)
+
+    # Directory permissions and times are set last, since writing their content changes their times
+    for target, member in reversed(directories):
+        os.chmod(target, member.mode & 0o777 | 0o700)
+        os.utime(target, (member.mtime, member.mtime))
+
+    return count
@@ -1,25 +1,343 @@
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import signal
 import subprocess
-from typing import Optional, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Callable, List, Union, Deque, Iterable, Tuple
+
+# Number of bytes read from a process output stream at a time
+READ_CHUNK_SIZE = 64 * 1024
+# Lines longer than this number of bytes are split so that memory use stays bounded
+MAX_LINE_BYTES = 1024 * 1024
+# Default number of trailing lines of output retained per stream by the streaming runner
+DEFAULT_MAX_CAPTURED_LINES = 10000
+# Default number of commands run at the same time by the batch runner
+DEFAULT_BATCH_WORKERS = 4
+# Default number of seconds for which the memoized output of a read-only command is reused
+DEFAULT_CACHE_TTL_SECONDS = 5 * 60
 
 
 class ExternalProcessExecError(RuntimeError):
     """Error when an external process fails to run successfully"""
-    def __init__(self, cmd: str, message: str):
+    def __init__(self, cmd: str, message: str, returncode: Optional[int] = None,
+                 stdout: Optional[str] = None, stderr: Optional[str] = None):
         self.cmd = cmd
         self.message = message
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
         super().__init__(f"{message} when running: {cmd}")
 
 
-def run(cmd: str, suppress_error=False, env: Optional[Dict[str, str]] = None) -> (str, str):
+class ExternalProcessTimeoutError(ExternalProcessExecError):
+    """Error when an external process does not finish within its timeout"""
+    def __init__(self, cmd: str, timeout: float):
+        self.timeout = timeout
+        super().__init__(cmd=cmd, message=f'Process timed out after {timeout} seconds')
+
+
+class CommandResult:
+    """Outcome of a single command run as part of a batch"""
+    cmd: str
+    stdout: Optional[str]
+    stderr: Optional[str]
+    duration: float
+    error: Optional[Exception]
+
+    def __init__(self, cmd: str, stdout: Optional[str], stderr: Optional[str], duration: float,
+                 error: Optional[Exception] = None):
+        self.cmd = cmd
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.error = error
+
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+class ExternalProcessBatchError(RuntimeError):
+    """Error when one or more of the commands in a batch fail to run successfully"""
+    def __init__(self, results: List[CommandResult]):
+        self.results = results
+        self.failures = [result for result in results if not result.succeeded()]
+        super().__init__(f'{len(self.failures)} of {len(results)} commands failed - first failure: '
+                         f'{self.failures[0].error}')
+
+
+def run(cmd: str, suppress_error=False, env: Optional[Dict[str, str]] = None, cwd: Optional[str] = None) -> (str, str):
     """Runs an external command and returns back its stdout and stderr"""
 
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, env=env)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, env=env, cwd=cwd)
     (res, err) = proc.communicate()
     res = res.decode(encoding="utf-8", errors="ignore")
     err = err.decode(encoding="utf-8", errors="ignore")
 
     if proc.returncode != 0 and not suppress_error:
         msg = f"Failed to execute external process: {cmd}\n{res}\nError: {err}"
-        raise ExternalProcessExecError(msg, cmd)
+        raise ExternalProcessExecError(cmd=cmd, message=msg, returncode=proc.returncode, stdout=res, stderr=err)
+
+    return res, err
+
+
+async def _read_lines(stream: asyncio.StreamReader,
+                      captured: Deque[str],
+                      on_line: Optional[Callable[[str], None]]):
+    """Reads a process output stream line by line, handing each line to the callback as it arrives and
+    retaining only the most recent lines"""
+    def emit(line_bytes: bytes):
+        line = line_bytes.decode(encoding='utf-8', errors='ignore').rstrip('\r')
+        captured.append(line)
+        if on_line:
+            on_line(line)
+
+    pending = b''
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            emit(line)
+        if len(pending) > MAX_LINE_BYTES:
+            emit(pending)
+            pending = b''
+
+    if pending:
+        emit(pending)
+
+
+def _kill_process_group(proc: asyncio.subprocess.Process):
+    """Kills the process and any children that it started"""
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def run_async(cmd: Union[str, List[str]],
+                    suppress_error: bool = False,
+                    env: Optional[Dict[str, str]] = None,
+                    cwd: Optional[str] = None,
+                    timeout: Optional[float] = None,
+                    on_stdout_line: Optional[Callable[[str], None]] = None,
+                    on_stderr_line: Optional[Callable[[str], None]] = None,
+                    max_captured_lines: Optional[int] = DEFAULT_MAX_CAPTURED_LINES) -> (str, str):
+    """Runs an external command, streaming its output line by line to the passed callbacks as it is produced.
+
+    :param cmd: command string to run with the shell, or list of arguments to execute directly without a shell
+    :param suppress_error: if true, no error is raised when the command exits with a non-zero status
+    :param env: environment variables to run the command with
+    :param cwd: working directory to run the command in
+    :param timeout: number of seconds after which the command and all of its child processes are killed
+    :param on_stdout_line: function called with each line written to stdout
+    :param on_stderr_line: function called with each line written to stderr
+    :param max_captured_lines: number of trailing lines of each stream to return (None for unlimited)
+    :return: the captured (trailing) stdout and stderr
+    """
+    cmd_str = cmd if isinstance(cmd, str) else ' '.join(cmd)
+    # A new session is started so that the process and all of its children can be killed as a group
+    if isinstance(cmd, str):
+        proc = await asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE,
+                                                     stderr=asyncio.subprocess.PIPE, env=env, cwd=cwd,
+                                                     start_new_session=True)
+    else:
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.PIPE, env=env, cwd=cwd,
+                                                    start_new_session=True)
+
+    stdout_lines = collections.deque(maxlen=max_captured_lines)
+    stderr_lines = collections.deque(maxlen=max_captured_lines)
+
+    async def communicate():
+        await asyncio.gather(_read_lines(proc.stdout, stdout_lines, on_stdout_line),
+                             _read_lines(proc.stderr, stderr_lines, on_stderr_line))
+        return await proc.wait()
+
+    try:
+        returncode = await asyncio.wait_for(communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        _kill_process_group(proc)
+        await proc.wait()
+        raise ExternalProcessTimeoutError(cmd=cmd_str, timeout=timeout)
+    except BaseException:
+        _kill_process_group(proc)
+        raise
+
+    res = os.linesep.join(stdout_lines)
+    err = os.linesep.join(stderr_lines)
+
+    if returncode != 0 and not suppress_error:
+        msg = f"Failed to execute external process (exit status {returncode})\n{res}\nError: {err}"
+        raise ExternalProcessExecError(cmd=cmd_str, message=msg, returncode=returncode, stdout=res, stderr=err)
 
     return res, err
+
+
+def run_streaming(cmd: Union[str, List[str]],
+                  suppress_error: bool = False,
+                  env: Optional[Dict[str, str]] = None,
+                  cwd: Optional[str] = None,
+                  timeout: Optional[float] = None,
+                  on_stdout_line: Optional[Callable[[str], None]] = None,
+                  on_stderr_line: Optional[Callable[[str], None]] = None,
+                  max_captured_lines: Optional[int] = DEFAULT_MAX_CAPTURED_LINES) -> (str, str):
+    """Synchronous version of `run_async` that can be called from code that is not running in an event loop.
+    See `run_async` for a description of the parameters."""
+    coroutine = run_async(cmd=cmd, suppress_error=suppress_error, env=env, cwd=cwd, timeout=timeout,
+                          on_stdout_line=on_stdout_line, on_stderr_line=on_stderr_line,
+                          max_captured_lines=max_captured_lines)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    # An event loop is already running in this thread, so the command is run in a loop on another thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def run_batch(cmds: List[str],
+              max_workers: int = DEFAULT_BATCH_WORKERS,
+              suppress_error: bool = False,
+              env: Optional[Dict[str, str]] = None,
+              runner: Callable[..., tuple] = run) -> List[CommandResult]:
+    """Runs independent external commands concurrently on a bounded pool of workers.
+
+    :param cmds: commands to run
+    :param max_workers: maximum number of commands run at the same time
+    :param suppress_error: if true, failed commands are only reported in their result rather than raising an error
+    :param env: environment variables to run the commands with
+    :param runner: function used to run each command (with the same signature as `run`)
+    :return: result of each command, in the same order as the commands were passed
+    """
+    def run_one(cmd: str) -> CommandResult:
+        start = time.perf_counter()
+        try:
+            res, err = runner(cmd=cmd, suppress_error=suppress_error, env=env)
+            return CommandResult(cmd=cmd, stdout=res, stderr=err, duration=time.perf_counter() - start)
+        except Exception as e:
+            return CommandResult(cmd=cmd, stdout=None, stderr=None, duration=time.perf_counter() - start, error=e)
+
+    if not cmds:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cmds)))) as executor:
+        results = list(executor.map(run_one, cmds))
+
+    if not suppress_error and any(not result.succeeded() for result in results):
+        raise ExternalProcessBatchError(results)
+
+    return results
+
+
+class RunCache:
+    """Opt-in memoization of the output of read-only commands (e.g. `pulumi whoami` or `docker image ls`) so that
+    repeated queries within the same process do not start a new process each time. Entries are keyed by the
+    command, the working directory and the values of the environment variables that the output depends on. Only
+    successful runs are remembered."""
+    ttl_seconds: float
+    hits: int
+    misses: int
+
+    def __init__(self, ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[str, float, Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(cmd: str,
+            env: Optional[Dict[str, str]] = None,
+            cwd: Optional[str] = None,
+            env_keys: Optional[Iterable[str]] = None) -> str:
+        """Returns the cache key of a command. Only the environment variables listed in env_keys are part of the
+        key (all of them when env_keys is None). The key is a digest so that secrets passed through the
+        environment are not retained in memory by the cache."""
+        if env is None:
+            env = dict(os.environ)
+        if env_keys is not None:
+            env = {name: env.get(name) for name in env_keys}
+        serialized = json.dumps({'cmd': cmd, 'cwd': cwd, 'env': env}, sort_keys=True)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def run(self,
+            cmd: str,
+            suppress_error: bool = False,
+            env: Optional[Dict[str, str]] = None,
+            cwd: Optional[str] = None,
+            env_keys: Optional[Iterable[str]] = None,
+            ttl_seconds: Optional[float] = None,
+            runner: Callable[..., tuple] = run) -> (str, str):
+        """Returns the stdout and stderr of the command from the cache, running the command when there is no
+        fresh entry for it. See `run` for a description of the command parameters.
+        :param env_keys: names of the environment variables that the output of the command depends on
+        :param ttl_seconds: number of seconds for which the output is reused (defaults to the cache's TTL)
+        :param runner: function used to run the command (with the same signature as `run`)
+        """
+        key = RunCache.key(cmd=cmd, env=env, cwd=cwd, env_keys=env_keys)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        # The runner is always asked to raise on failure, so that the failure is known and is not remembered
+        try:
+            if cwd is None:
+                output = runner(cmd=cmd, suppress_error=False, env=env)
+            else:
+                output = runner(cmd=cmd, suppress_error=False, env=env, cwd=cwd)
+        except ExternalProcessExecError as e:
+            if not suppress_error:
+                raise
+            return e.stdout or '', e.stderr or ''
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (cmd, time.monotonic() + ttl, output)
+
+        return output
+
+    def invalidate(self, cmd: Optional[str] = None):
+        """Removes the entries for the given command, or all entries when no command is given"""
+        with self._lock:
+            if cmd is None:
+                self._entries.clear()
+            else:
+                for key in [key for key, entry in self._entries.items() if entry[0] == cmd]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of cache hits, misses and entries"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+# Cache shared by the read-only helpers of this package
+default_cache = RunCache()
+
+
+def run_cached(cmd: str,
+               suppress_error: bool = False,
+               env: Optional[Dict[str, str]] = None,
+               cwd: Optional[str] = None,
+               env_keys: Optional[Iterable[str]] = None,
+               ttl_seconds: Optional[float] = None) -> (str, str):
+    """Runs a read-only external command, reusing its output from an earlier run in this process when available.
+    See `RunCache.run` for a description of the parameters."""
+    return default_cache.run(cmd=cmd, suppress_error=suppress_error, env=env, cwd=cwd, env_keys=env_keys,
+                             ttl_seconds=ttl_seconds)
@@ -0,0 +1,146 @@
+"""
+This file contains a cache of bare git mirrors, one per remote URL. Rather than cloning a repository every time a
+ref is checked out, only the refs that are not already in the mirror are fetched, and the requested tag, branch
+or commit is then checked out from the mirror into a worktree or exported into a plain directory. Tags and
+commits that are already in the mirror are checked out without contacting the remote at all.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+from git import Repo, GitCommandError
+
+from kic_util import archive_extract
+
+# Environment variable that can be set to change the directory in which git mirrors are stored
+CACHE_DIR_ENV_VAR = 'MARA_GIT_CACHE_DIR'
+# Default directory in which git mirrors are stored
+DEFAULT_CACHE_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                      'mara', 'git'])
+# Ref that the remote's default branch is fetched into when no ref is requested
+DEFAULT_BRANCH_REF = 'refs/remotes/origin/HEAD'
+
+_COMMIT_PATTERN = re.compile(r'^[0-9a-f]{7,40}$')
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def default_cache_dir() -> str:
+    return os.environ.get(CACHE_DIR_ENV_VAR) or DEFAULT_CACHE_DIR
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+class GitMirror:
+    """Bare mirror of a remote git repository"""
+    url: str
+    path: str
+
+    def __init__(self, url: str, cache_dir: Optional[str] = None) -> None:
+        self.url = url
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        self.path = os.path.sep.join([cache_dir or default_cache_dir(), 'mirrors', f'{digest}.git'])
+
+    @contextmanager
+    def _locked(self):
+        """Holds a lock on the mirror that is shared with other threads and processes"""
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        with _lock_for(self.path), open(self.path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _repo(self) -> Repo:
+        if os.path.isfile(os.path.join(self.path, 'HEAD')):
+            repo = Repo(self.path)
+            # Forget the worktrees whose directories have since been deleted
+            repo.git.worktree('prune')
+        else:
+            repo = Repo.init(self.path, bare=True)
+
+        # The remote may already exist, or be missing when the creation of the mirror was interrupted
+        if 'origin' not in [remote.name for remote in repo.remotes]:
+            repo.create_remote('origin', self.url)
+        return repo
+
+    @staticmethod
+    def _resolve_local(repo: Repo, ref: str) -> Optional[str]:
+        try:
+            return repo.git.rev_parse('--verify', '--quiet', f'{ref}^{{commit}}')
+        except GitCommandError:
+            return None
+
+    def fetch(self, ref: Optional[str] = None) -> str:
+        """Fetches the ref into the mirror unless it is already there, returning the commit it refers to.
+        Tags and commits are immutable, so they are only fetched when missing. Branches may move, so they are
+        always fetched.
+        :param ref: tag, branch or commit to fetch (defaults to the remote's default branch)
+        :return: commit id
+        """
+        with self._locked():
+            repo = self._repo()
+
+            if not ref:
+                repo.git.fetch('--no-tags', 'origin', f'+HEAD:{DEFAULT_BRANCH_REF}')
+                return self._resolve_local(repo, DEFAULT_BRANCH_REF)
+
+            for local_ref in [f'refs/tags/{ref}', ref] if _COMMIT_PATTERN.match(ref) else [f'refs/tags/{ref}']:
+                commit = self._resolve_local(repo, local_ref)
+                if commit:
+                    return commit
+
+            # Only the requested ref is fetched - objects shared with refs already in the mirror are not
+            # transferred again
+            for refspec in [f'+refs/tags/{ref}:refs/tags/{ref}', f'+refs/heads/{ref}:refs/heads/{ref}', ref]:
+                try:
+                    repo.git.fetch('--no-tags', 'origin', refspec)
+                except GitCommandError:
+                    continue
+                commit = self._resolve_local(repo, 'FETCH_HEAD')
+                if commit:
+                    return commit
+
+            raise ValueError(f'Unable to find ref [{ref}] in git repository at {self.url}')
+
+    def worktree(self, dest_dir: str, ref: Optional[str] = None) -> str:
+        """Checks out the ref into a detached worktree of the mirror, so that git commands (e.g. git describe)
+        work within it just as they would in a clone
+        :param dest_dir: directory to check the ref out into - it must not exist or be empty
+        :param ref: tag, branch or commit to check out (defaults to the remote's default branch)
+        :return: commit id checked out
+        """
+        commit = self.fetch(ref)
+        with self._locked():
+            Repo(self.path).git.worktree('add', '--detach', '--force', dest_dir, commit)
+        return commit
+
+    def export(self, dest_dir: str, ref: Optional[str] = None) -> str:
+        """Writes the files of the ref into a directory without any git metadata
+        :param dest_dir: directory to export the ref into
+        :param ref: tag, branch or commit to export (defaults to the remote's default branch)
+        :return: commit id exported
+        """
+        commit = self.fetch(ref)
+        process = subprocess.Popen(['git', f'--git-dir={self.path}', 'archive', '--format=tar', commit],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            archive_extract.extract_tar(process.stdout, dest_dir=dest_dir)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise GitCommandError(['git', 'archive', commit], returncode, stderr)
+        return commit
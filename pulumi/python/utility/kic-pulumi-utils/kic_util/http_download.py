@@ -0,0 +1,259 @@
+"""
+This file contains a resumable HTTP downloader. Content is written into a partial file next to the destination and
+only moved into place once complete. When a connection drops, the download is retried with an exponential backoff
+and resumed from the end of the partial file with a Range request. The validator of the partially downloaded
+content is sent with If-Range, so a download is restarted rather than resumed when the remote content has changed.
+Progress is reported to an optional callback as the download proceeds.
+"""
+
+import http.client
+import json
+import os
+import re
+import socket
+import time
+from typing import Optional, Callable, Dict
+from urllib import request, error
+
+# Suffix of the file that content is downloaded into until the download is complete
+PARTIAL_SUFFIX = '.partial'
+# Suffix of the file recording the validators of the partially downloaded content
+PARTIAL_METADATA_SUFFIX = '.partial.json'
+# Number of bytes read from the network at a time
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Number of seconds to wait for a response before giving up
+DOWNLOAD_TIMEOUT_SECONDS = 60
+# Number of times a failed download is retried
+DEFAULT_RETRIES = 4
+# Number of seconds waited before the first retry - each further retry waits twice as long
+DEFAULT_BACKOFF_SECONDS = 1.0
+# Maximum number of seconds waited between retries
+MAX_BACKOFF_SECONDS = 30.0
+
+_CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class DownloadProgress:
+    """Progress of a download, passed to the progress callback"""
+    url: str
+    bytes_downloaded: int
+    bytes_received: int
+    total_bytes: Optional[int]
+    resumed_from: int
+    attempts: int
+    elapsed: float
+    complete: bool
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.bytes_downloaded = 0
+        self.bytes_received = 0
+        self.total_bytes = None
+        self.resumed_from = 0
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.complete = False
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Average rate at which bytes were received during this download, including failed attempts"""
+        return self.bytes_received / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        total = f'/{self.total_bytes}' if self.total_bytes is not None else ''
+        return f'{self.url}: {self.bytes_downloaded}{total} bytes in {self.elapsed:.2f}s ' \
+               f'({self.bytes_per_second / 1024:.1f} KiB/s, attempt {self.attempts})'
+
+
+ProgressCallback = Callable[[DownloadProgress], None]
+
+
+class DownloadResult:
+    """Outcome of a completed download"""
+    path: str
+    headers: http.client.HTTPMessage
+    progress: DownloadProgress
+
+    def __init__(self, path: str, headers: http.client.HTTPMessage, progress: DownloadProgress) -> None:
+        self.path = path
+        self.headers = headers
+        self.progress = progress
+
+
+class IncompleteDownloadError(IOError):
+    """Error when the connection closed before all of the content was received"""
+    def __init__(self, url: str, received: int, expected: int):
+        self.url = url
+        self.received = received
+        self.expected = expected
+        super().__init__(f'Download of [{url}] ended after {received} of {expected} bytes')
+
+
+class RangeMismatchError(IOError):
+    """Error when a server responds to a Range request with content that does not continue a partial download"""
+    def __init__(self, url: str, offset: int, content_range: Optional[str]):
+        self.url = url
+        self.offset = offset
+        self.content_range = content_range
+        super().__init__(f'Partial content of [{url}] requested from byte {offset} was returned with '
+                         f'Content-Range [{content_range}]')
+
+
+def _read_partial_metadata(dest_path: str) -> Dict[str, str]:
+    try:
+        with open(dest_path + PARTIAL_METADATA_SUFFIX, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_partial_metadata(dest_path: str, metadata: Dict[str, str]):
+    with open(dest_path + PARTIAL_METADATA_SUFFIX, 'w') as f:
+        json.dump(metadata, f)
+
+
+def discard_partial(dest_path: str):
+    """Deletes any partially downloaded content for the destination path"""
+    for suffix in [PARTIAL_SUFFIX, PARTIAL_METADATA_SUFFIX]:
+        try:
+            os.unlink(dest_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, error.HTTPError):
+        # Client errors (and conditional responses such as 304) will not change by retrying
+        return e.code >= 500 or e.code == 429
+    return isinstance(e, (error.URLError, http.client.HTTPException, ConnectionError, TimeoutError, socket.timeout,
+                          IncompleteDownloadError, RangeMismatchError))
+
+
+def _download_attempt(url: str, dest_path: str, headers: Dict[str, str], progress: DownloadProgress,
+                      on_progress: Optional[ProgressCallback], start_time: float) -> http.client.HTTPMessage:
+    partial_path = dest_path + PARTIAL_SUFFIX
+    offset = os.path.getsize(partial_path) if os.path.isfile(partial_path) else 0
+    validator = _read_partial_metadata(dest_path).get('validator') if offset else None
+
+    request_headers = dict(headers)
+    if offset and validator:
+        request_headers['Range'] = f'bytes={offset}-'
+        request_headers['If-Range'] = validator
+    else:
+        offset = 0
+
+    with request.urlopen(request.Request(url, headers=request_headers), timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+        content_range = _CONTENT_RANGE_PATTERN.match(response.headers.get('Content-Range', ''))
+        if response.status == 206:
+            if not content_range or int(content_range.group(1)) != offset:
+                # Appending the content would corrupt the download, so it is restarted without a Range request
+                discard_partial(dest_path)
+                raise RangeMismatchError(url=url, offset=offset,
+                                         content_range=response.headers.get('Content-Range'))
+            total = content_range.group(3)
+            progress.total_bytes = int(total) if total != '*' else None
+            mode = 'ab' if offset else 'wb'
+        else:
+            # The server ignored the Range request or the content changed, so start from the beginning
+            offset = 0
+            content_length = response.headers.get('Content-Length')
+            progress.total_bytes = int(content_length) if content_length else None
+            mode = 'wb'
+
+        # Strong ETags are preferred, since Last-Modified dates are only precise to a second. Weak ETags cannot
+        # be used with If-Range.
+        etag = response.headers.get('ETag')
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+        if validator:
+            _write_partial_metadata(dest_path, {'url': url, 'validator': validator})
+        else:
+            discard_partial(dest_path)
+
+        if progress.attempts == 1:
+            progress.resumed_from = offset
+        progress.bytes_downloaded = offset
+        with open(partial_path, mode) as f:
+            while True:
+                chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                progress.bytes_downloaded += len(chunk)
+                progress.bytes_received += len(chunk)
+                progress.elapsed = time.monotonic() - start_time
+                if on_progress:
+                    on_progress(progress)
+
+        if progress.total_bytes is not None and progress.bytes_downloaded < progress.total_bytes:
+            raise IncompleteDownloadError(url=url, received=progress.bytes_downloaded,
+                                          expected=progress.total_bytes)
+        if progress.total_bytes is None and not response.chunked and validator and \
+                not _confirm_complete(url=url, offset=progress.bytes_downloaded, validator=validator):
+            # The body ended when the connection closed, which is indistinguishable from a dropped connection
+            raise IncompleteDownloadError(url=url, received=progress.bytes_downloaded,
+                                          expected=progress.bytes_downloaded + 1)
+
+        return response.headers
+
+
+def _confirm_complete(url: str, offset: int, validator: str) -> bool:
+    """Checks that a response without a length was received in full by asking for the content following it.
+    :return: false if the server has more content; true if it has none or does not support Range requests
+    """
+    probe = request.Request(url, headers={'Range': f'bytes={offset}-', 'If-Range': validator})
+    try:
+        with request.urlopen(probe, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            # 206 means that content follows what was received - 200 means that the server ignores Range requests
+            # (or the content changed), in which case completeness cannot be checked
+            return response.status != 206
+    except error.HTTPError as e:
+        # 416 Range Not Satisfiable: there is no content after the offset
+        if e.code == 416:
+            return True
+        raise
+
+
+def download(url: str,
+             dest_path: str,
+             headers: Optional[Dict[str, str]] = None,
+             retries: int = DEFAULT_RETRIES,
+             backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+             on_progress: Optional[ProgressCallback] = None) -> DownloadResult:
+    """Downloads the content at the URL into a file, resuming a partial download left by an earlier attempt
+    :param url: URL to download
+    :param dest_path: path of the file to download into - it is only written once the download is complete
+    :param headers: additional request headers (e.g. conditional request headers)
+    :param retries: number of times a failed download is retried
+    :param backoff_seconds: number of seconds waited before the first retry
+    :param on_progress: optional callback called as content is received and when the download completes
+    :return: response headers and the final progress of the download
+    :raises urllib.error.HTTPError: when the server responds with an error that retrying does not resolve
+    """
+    progress = DownloadProgress(url=url)
+    start_time = time.monotonic()
+
+    while True:
+        progress.attempts += 1
+        try:
+            response_headers = _download_attempt(url=url, dest_path=dest_path, headers=headers or {},
+                                                 progress=progress, on_progress=on_progress, start_time=start_time)
+            break
+        except error.HTTPError as e:
+            if e.code == 416:
+                # The partial file does not fit the remote content, so it cannot be resumed
+                discard_partial(dest_path)
+            if progress.attempts > retries or not (_is_retryable(e) or e.code == 416):
+                raise
+        except Exception as e:
+            if progress.attempts > retries or not _is_retryable(e):
+                raise
+        time.sleep(min(backoff_seconds * 2 ** (progress.attempts - 1), MAX_BACKOFF_SECONDS))
+
+    os.replace(dest_path + PARTIAL_SUFFIX, dest_path)
+    discard_partial(dest_path)
+    progress.elapsed = time.monotonic() - start_time
+    progress.complete = True
+    if on_progress:
+        on_progress(progress)
+
+    return DownloadResult(path=dest_path, headers=response_headers, progress=progress)
@@ -0,0 +1,169 @@
+"""
+This file provides a lookup of Pulumi project names by project directory. Rather than every project opening and
+parsing the Pulumi.yaml file of each project that it references, an index of all of the projects is generated once
+and cached on disk. The index is rebuilt whenever any of the indexed Pulumi.yaml files change.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from os import path
+from typing import Optional, Dict
+
+from kic_util import pulumi_config
+
+# Environment variable that can be set to the directory containing all of the Pulumi projects
+PROJECTS_DIR_ENV_VAR = 'MARA_PULUMI_PROJECTS_DIR'
+# Directory in which generated project indexes are stored
+INDEX_CACHE_DIR = path.sep.join([os.environ.get('XDG_CACHE_HOME', path.expanduser('~/.cache')),
+                                 'mara', 'project_index'])
+# Directories that never contain Pulumi projects and are not searched
+EXCLUDED_DIRS = ['node_modules', 'venv', '__pycache__']
+# Version of the index file format - indexes written with a different version are rebuilt
+INDEX_VERSION = 1
+
+_loaded_indexes: Dict[str, 'ProjectIndex'] = {}
+_lock = threading.Lock()
+
+
+class ProjectNotFoundError(pulumi_config.PulumiConfigError):
+    """Error when no Pulumi project exists in the requested directory"""
+    pass
+
+
+def find_projects_dir(start_dir: Optional[str] = None) -> str:
+    """Finds the directory containing all of the Pulumi projects by searching upwards from the start directory
+    :param start_dir: directory to start searching from (defaults to the current working directory, which is
+                      the project directory when run by Pulumi)
+    :return: absolute path to the directory containing all of the Pulumi projects
+    """
+    if os.environ.get(PROJECTS_DIR_ENV_VAR):
+        return path.abspath(os.environ[PROJECTS_DIR_ENV_VAR])
+
+    directory = path.abspath(start_dir or os.getcwd())
+    while True:
+        if path.isdir(path.join(directory, 'utility', 'kic-pulumi-utils')):
+            return directory
+        parent = path.dirname(directory)
+        if parent == directory:
+            raise ProjectNotFoundError(file=start_dir or os.getcwd(),
+                                       message='Unable to find the Pulumi projects directory')
+        directory = parent
+
+
+class ProjectIndex:
+    """Mapping of project directories (relative to the projects directory) to Pulumi project names"""
+    projects_dir: str
+    projects: Dict[str, str]
+    mtimes: Dict[str, int]
+
+    def __init__(self, projects_dir: str, projects: Dict[str, str], mtimes: Dict[str, int]) -> None:
+        self.projects_dir = projects_dir
+        self.projects = projects
+        self.mtimes = mtimes
+
+    @staticmethod
+    def build(projects_dir: str) -> 'ProjectIndex':
+        """Generates an index by finding and parsing every Pulumi.yaml file below the projects directory"""
+        projects = {}
+        mtimes = {}
+
+        for dirpath, dirnames, filenames in os.walk(projects_dir):
+            if 'Pulumi.yaml' in filenames:
+                project_dir = path.relpath(dirpath, projects_dir)
+                projects[project_dir] = pulumi_config.get_pulumi_project_name(dirpath)
+                mtimes[project_dir] = os.stat(path.join(dirpath, 'Pulumi.yaml')).st_mtime_ns
+                # Projects are not nested, so the rest of a project's tree does not need to be searched
+                dirnames.clear()
+            else:
+                dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in EXCLUDED_DIRS]
+
+        return ProjectIndex(projects_dir=projects_dir, projects=projects, mtimes=mtimes)
+
+    def is_current(self) -> bool:
+        """Returns true if none of the indexed Pulumi.yaml files have changed since the index was generated"""
+        for project_dir, mtime in self.mtimes.items():
+            try:
+                if os.stat(path.join(self.projects_dir, project_dir, 'Pulumi.yaml')).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def to_dict(self) -> Dict:
+        return {'version': INDEX_VERSION, 'projects_dir': self.projects_dir,
+                'projects': self.projects, 'mtimes': self.mtimes}
+
+    @staticmethod
+    def from_dict(data: Dict) -> Optional['ProjectIndex']:
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return ProjectIndex(projects_dir=data['projects_dir'], projects=data['projects'], mtimes=data['mtimes'])
+
+
+def index_path(projects_dir: str, cache_dir: str = INDEX_CACHE_DIR) -> str:
+    """Path to the generated index file for the given projects directory"""
+    digest = hashlib.sha256(projects_dir.encode('utf-8')).hexdigest()[:32]
+    return path.join(cache_dir, f'{digest}.json')
+
+
+def _read_index(index_file: str) -> Optional[ProjectIndex]:
+    try:
+        with open(index_file, 'r') as f:
+            return ProjectIndex.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_index(index_file: str, index: ProjectIndex):
+    try:
+        os.makedirs(path.dirname(index_file), mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.dirname(index_file), prefix='.index_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index.to_dict(), f)
+        os.replace(temp_path, index_file)
+    except OSError:
+        # Not being able to store the index only means that the next process generates it again
+        pass
+
+
+def load_index(projects_dir: str, cache_dir: str = INDEX_CACHE_DIR, rebuild: bool = False) -> ProjectIndex:
+    """Returns the index for the given projects directory, generating it if it does not exist or is out of date
+    :param projects_dir: directory containing all of the Pulumi projects
+    :param cache_dir: directory in which generated indexes are stored
+    :param rebuild: if true, the index is always generated again
+    :return: project index
+    """
+    projects_dir = path.abspath(projects_dir)
+    index_file = index_path(projects_dir, cache_dir)
+
+    with _lock:
+        index = None if rebuild else _loaded_indexes.get(index_file) or _read_index(index_file)
+        if index is None or not index.is_current():
+            index = ProjectIndex.build(projects_dir)
+            _write_index(index_file, index)
+        _loaded_indexes[index_file] = index
+        return index
+
+
+def project_name(project_dir: str, projects_dir: Optional[str] = None, cache_dir: str = INDEX_CACHE_DIR) -> str:
+    """Looks up the name of a Pulumi project
+    :param project_dir: directory of the project relative to the projects directory (e.g. 'kubernetes/secrets')
+    :param projects_dir: directory containing all of the Pulumi projects (found automatically when not given)
+    :param cache_dir: directory in which generated indexes are stored
+    :return: name of the Pulumi project
+    """
+    projects_dir = projects_dir or find_projects_dir()
+    key = path.normpath(project_dir)
+
+    index = load_index(projects_dir=projects_dir, cache_dir=cache_dir)
+    if key not in index.projects:
+        # The project may have been added since the index was generated
+        index = load_index(projects_dir=projects_dir, cache_dir=cache_dir, rebuild=True)
+    if key not in index.projects:
+        raise ProjectNotFoundError(file=path.join(projects_dir, key, 'Pulumi.yaml'),
+                                   message='No Pulumi project found')
+
+    return index.projects[key]
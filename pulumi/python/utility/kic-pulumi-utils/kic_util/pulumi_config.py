@@ -1,8 +1,23 @@
+import hashlib
+import json
 import os
+import tempfile
+import time
 from os import path
+from typing import Optional, Mapping
 import yaml
 from kic_util import external_process
 
+# Environment variables that determine which user the Pulumi CLI is logged in as
+PULUMI_USER_ENV_KEYS = ['PULUMI_ACCESS_TOKEN', 'PULUMI_BACKEND_URL', 'PULUMI_HOME', 'HOME']
+# Environment variable through which an already resolved Pulumi user is passed to child processes
+PULUMI_USER_ENV_VAR = 'MARA_PULUMI_USER'
+# Directory in which resolved Pulumi users are cached between processes
+PULUMI_USER_CACHE_DIR = path.sep.join([os.environ.get('XDG_CACHE_HOME', path.expanduser('~/.cache')),
+                                       'mara', 'pulumi_user'])
+# Number of seconds for which a cached Pulumi user is reused
+PULUMI_USER_CACHE_TTL_SECONDS = 60 * 60
+
 
 class PulumiConfigError(RuntimeError):
     """Base error class for Pulumi related errors"""
@@ -46,13 +61,78 @@ def get_pulumi_project_name(directory: str) -> str:
         return config_data['name']
 
 
-def get_pulumi_user() -> str:
-    """Gets the current Pulumi user by executing the pulumi CLI tool"""
+def _pulumi_credentials(env: Mapping[str, str]) -> (str, Optional[str]):
+    """Returns the backend URL and access token that the Pulumi CLI will use with the given environment"""
+    pulumi_home = env.get('PULUMI_HOME') or path.join(env.get('HOME') or path.expanduser('~'), '.pulumi')
+    try:
+        with open(path.join(pulumi_home, 'credentials.json'), 'r') as f:
+            credentials = json.load(f)
+    except (OSError, ValueError):
+        credentials = {}
+
+    backend_url = env.get('PULUMI_BACKEND_URL') or credentials.get('current') or 'https://api.pulumi.com'
+    access_token = env.get('PULUMI_ACCESS_TOKEN') or credentials.get('accessTokens', {}).get(backend_url)
+    return backend_url, access_token
+
+
+def pulumi_user_cache_path(env: Mapping[str, str], cache_dir: str = PULUMI_USER_CACHE_DIR) -> str:
+    """Returns the path of the file caching the Pulumi user for the backend and credentials of the given
+    environment. Only a fingerprint of the access token is used, so the token itself is never written to disk."""
+    backend_url, access_token = _pulumi_credentials(env)
+    digest = hashlib.sha256(f'{backend_url}\0{access_token or ""}'.encode('utf-8')).hexdigest()
+    return path.join(cache_dir, f'{digest[:32]}.json')
+
+
+def _read_cached_pulumi_user(cache_path: str) -> Optional[str]:
+    try:
+        with open(cache_path, 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get('created', 0) > PULUMI_USER_CACHE_TTL_SECONDS:
+        return None
+    return entry.get('user')
+
+
+def _write_cached_pulumi_user(cache_path: str, user: str):
+    try:
+        os.makedirs(path.dirname(cache_path), mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.dirname(cache_path), prefix='.user_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'created': time.time(), 'user': user}, f)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # Not being able to cache the user only means that the next process queries it again
+        pass
+
+
+def get_pulumi_user(env: Optional[Mapping[str, str]] = None, cache_dir: str = PULUMI_USER_CACHE_DIR) -> str:
+    """Gets the current Pulumi user. A user already resolved by a parent process (passed through the
+    MARA_PULUMI_USER environment variable) is used when present, then a user cached on disk for the same backend
+    and credentials. Otherwise, the user is queried by executing the pulumi CLI tool.
+    :param env: environment that the pulumi CLI tool is run with (defaults to the environment of this process)
+    :param cache_dir: directory in which resolved users are cached
+    :return: name of the Pulumi user
+    """
+    env = dict(os.environ if env is None else env)
+
+    if env.get(PULUMI_USER_ENV_VAR):
+        return env[PULUMI_USER_ENV_VAR]
+
+    cache_path = pulumi_user_cache_path(env=env, cache_dir=cache_dir)
+    user = _read_cached_pulumi_user(cache_path)
+    if user:
+        return user
+
     try:
-        env = dict(os.environ)
         env['PULUMI_SKIP_UPDATE_CHECK'] = 'true'
 
-        user, _ = external_process.run(cmd='pulumi --non-interactive whoami', env=env)
+        user, _ = external_process.run_cached(cmd='pulumi --non-interactive whoami', env=env,
+                                              env_keys=PULUMI_USER_ENV_KEYS)
     except RuntimeError as e:
         raise PulumiExecError("Unable to query pulumi username") from e
-    return user.strip()
+
+    user = user.strip()
+    _write_cached_pulumi_user(cache_path, user)
+    return user
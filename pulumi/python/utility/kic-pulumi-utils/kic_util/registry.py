@@ -0,0 +1,197 @@
+"""
+This file contains a minimal client of the Docker Registry HTTP API V2 that looks up the digest of the manifest an
+image tag refers to with a HEAD request, without downloading the manifest or any layers. Registries that require
+authentication are handled by following the WWW-Authenticate challenge of the registry: bearer tokens are requested
+from the token service (anonymously or with credentials) and basic credentials are sent directly. Credentials are
+read from the auths section of the Docker client configuration when not given.
+"""
+
+import base64
+import json
+import os
+import re
+from typing import Optional, Tuple, Dict
+from urllib import request, error, parse
+
+# Registry that image names without a registry host refer to
+DOCKER_HUB_REGISTRY = 'docker.io'
+# Host serving the registry API of Docker Hub
+DOCKER_HUB_API_HOST = 'registry-1.docker.io'
+# Number of seconds to wait for a response from a registry before giving up
+REGISTRY_TIMEOUT_SECONDS = 30
+# Media types of the manifests that an image tag may refer to - manifest lists and indexes are preferred so that the
+# digest is the same one Docker records when pulling a multi-platform image
+MANIFEST_MEDIA_TYPES = ['application/vnd.docker.distribution.manifest.list.v2+json',
+                        'application/vnd.oci.image.index.v1+json',
+                        'application/vnd.docker.distribution.manifest.v2+json',
+                        'application/vnd.oci.image.manifest.v1+json']
+# Registry hosts that are reached over plain HTTP, as Docker does by default
+INSECURE_HOSTS = ['localhost', '127.0.0.1', '::1']
+
+_CHALLENGE_PARAM_PATTERN = re.compile(r'(\w+)="([^"]*)"')
+
+
+class RegistryError(RuntimeError):
+    """Error class thrown when the digest of an image cannot be looked up in its registry"""
+    pass
+
+
+class ImageReference:
+    """Location of an image in a registry, parsed from an image name such as nginx/nginx-ingress:2.4.2"""
+    registry: str
+    repository: str
+    reference: str
+
+    def __init__(self, registry: str, repository: str, reference: str) -> None:
+        self.registry = registry
+        self.repository = repository
+        self.reference = reference
+
+    @staticmethod
+    def parse(image_name: str) -> 'ImageReference':
+        """Parses an image name the way that the Docker client does: the first component is the registry host only
+        when it contains a dot or a port or is localhost, and official Docker Hub images are in the library
+        namespace"""
+        name, _, digest = image_name.partition('@')
+        reference = 'latest'
+        last_component = name.rsplit('/', 1)[-1]
+        if ':' in last_component:
+            name, reference = name.rsplit(':', 1)
+        # A digest identifies the manifest regardless of any tag that is also given (e.g. repo:tag@sha256:...)
+        if digest:
+            reference = digest
+
+        components = name.split('/', 1)
+        if len(components) == 2 and ('.' in components[0] or ':' in components[0] or components[0] == 'localhost'):
+            registry, repository = components
+        else:
+            registry, repository = DOCKER_HUB_REGISTRY, name
+
+        if registry == DOCKER_HUB_REGISTRY and '/' not in repository:
+            repository = f'library/{repository}'
+
+        return ImageReference(registry=registry, repository=repository, reference=reference)
+
+    @property
+    def api_url(self) -> str:
+        """URL of the manifest of the image in the registry API"""
+        host = DOCKER_HUB_API_HOST if self.registry == DOCKER_HUB_REGISTRY else self.registry
+        scheme = 'http' if parse.urlsplit(f'//{host}').hostname in INSECURE_HOSTS else 'https'
+        return f'{scheme}://{host}/v2/{self.repository}/manifests/{self.reference}'
+
+    def __str__(self) -> str:
+        return f'{self.registry}/{self.repository}:{self.reference}'
+
+
+def docker_config_credentials(registry: str, config_path: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """Returns the user name and password stored for a registry by `docker login`
+    :param registry: registry host (e.g. docker.io)
+    :param config_path: path of the Docker client configuration (defaults to $DOCKER_CONFIG/config.json)
+    :return: user name and password or None if no credentials are stored in the configuration file (credentials
+             kept by a credential helper are not read)
+    """
+    if not config_path:
+        config_dir = os.environ.get('DOCKER_CONFIG', os.path.expanduser('~/.docker'))
+        config_path = os.path.join(config_dir, 'config.json')
+    try:
+        with open(config_path) as f:
+            auths = json.load(f).get('auths', {})
+    except (OSError, ValueError):
+        return None
+
+    candidates = [registry, f'https://{registry}', f'http://{registry}']
+    if registry == DOCKER_HUB_REGISTRY:
+        candidates.append('https://index.docker.io/v1/')
+    for candidate in candidates:
+        auth = auths.get(candidate, {}).get('auth')
+        if auth:
+            username, _, password = base64.b64decode(auth).decode('utf-8').partition(':')
+            return username, password
+    return None
+
+
+def _basic_auth_header(credentials: Tuple[str, str]) -> str:
+    token = base64.b64encode(':'.join(credentials).encode('utf-8')).decode('ascii')
+    return f'Basic {token}'
+
+
+def _parse_challenge(header: str) -> Tuple[str, Dict[str, str]]:
+    """Parses a WWW-Authenticate header such as: Bearer realm="https://auth.docker.io/token",service="..."
+    :return: authentication scheme in lower case and its parameters
+    """
+    scheme, _, params = header.strip().partition(' ')
+    return scheme.lower(), dict(_CHALLENGE_PARAM_PATTERN.findall(params))
+
+
+def _bearer_token(challenge: Dict[str, str], scope: str, credentials: Optional[Tuple[str, str]],
+                  timeout: float) -> str:
+    """Requests a token from the token service named in a bearer challenge"""
+    if 'realm' not in challenge:
+        raise RegistryError('registry requested bearer authentication without a token service realm')
+    query = {'scope': challenge.get('scope', scope)}
+    if 'service' in challenge:
+        query['service'] = challenge['service']
+    token_request = request.Request(f"{challenge['realm']}?{parse.urlencode(query)}")
+    if credentials:
+        token_request.add_header('Authorization', _basic_auth_header(credentials))
+
+    try:
+        with request.urlopen(token_request, timeout=timeout) as response:
+            body = json.load(response)
+    except error.HTTPError as e:
+        raise RegistryError(f'token service {challenge["realm"]} refused access to {scope}: HTTP {e.code}') from e
+    token = body.get('token') or body.get('access_token')
+    if not token:
+        raise RegistryError(f'token service {challenge["realm"]} did not return a token')
+    return token
+
+
+def _head_manifest(url: str, authorization: Optional[str], timeout: float):
+    head_request = request.Request(url, method='HEAD')
+    head_request.add_header('Accept', ', '.join(MANIFEST_MEDIA_TYPES))
+    if authorization:
+        head_request.add_header('Authorization', authorization)
+    return request.urlopen(head_request, timeout=timeout)
+
+
+def manifest_digest(image_name: str,
+                    credentials: Optional[Tuple[str, str]] = None,
+                    timeout: float = REGISTRY_TIMEOUT_SECONDS) -> str:
+    """Returns the digest of the manifest that an image name refers to in its registry
+    :param image_name: image name (e.g. nginx/nginx-ingress:2.4.2)
+    :param credentials: user name and password for the registry (defaults to those stored by `docker login`, or
+                        anonymous access when there are none)
+    :param timeout: number of seconds to wait for each response
+    :return: digest of the manifest (e.g. sha256:9358...)
+    """
+    image = ImageReference.parse(image_name)
+    url = image.api_url
+    if credentials is None:
+        credentials = docker_config_credentials(image.registry)
+
+    try:
+        try:
+            response = _head_manifest(url=url, authorization=None, timeout=timeout)
+        except error.HTTPError as e:
+            if e.code != 401:
+                raise
+            scheme, challenge = _parse_challenge(e.headers.get('WWW-Authenticate', ''))
+            if scheme == 'bearer':
+                token = _bearer_token(challenge=challenge, scope=f'repository:{image.repository}:pull',
+                                      credentials=credentials, timeout=timeout)
+                authorization = f'Bearer {token}'
+            elif scheme == 'basic' and credentials:
+                authorization = _basic_auth_header(credentials)
+            else:
+                raise RegistryError(f'registry {image.registry} requires credentials for {image}') from e
+            response = _head_manifest(url=url, authorization=authorization, timeout=timeout)
+    except error.HTTPError as e:
+        raise RegistryError(f'unable to look up {image} in registry: HTTP {e.code}') from e
+    except (error.URLError, OSError) as e:
+        raise RegistryError(f'unable to reach registry {image.registry}: {e}') from e
+
+    with response:
+        digest = response.headers.get('Docker-Content-Digest')
+    if not digest:
+        raise RegistryError(f'registry {image.registry} did not return the digest of {image}')
+    return digest
@@ -0,0 +1,83 @@
+"""
+This file computes deterministic content hashes of source trees. The hash covers the relative path, type, executable
+bit and content of every file and the target of every symbolic link, so two trees have the same hash exactly when
+building them produces the same result - regardless of where they are on disk, when they were extracted or the
+order in which the file system lists them.
+"""
+
+import hashlib
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterable, Dict, List, Tuple
+
+# Number of bytes read at a time when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+# Number of threads hashing files - hashlib releases the GIL while hashing, so files are hashed in parallel
+DEFAULT_HASH_WORKERS = 4
+# Names of the files and directories that are not part of a source tree's content
+DEFAULT_EXCLUDED_NAMES = ['.git']
+
+
+def file_hash(path: str) -> str:
+    """Returns the SHA-256 digest of the content of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_hash(directory: str,
+              excluded_names: Optional[Iterable[str]] = None,
+              workers: int = DEFAULT_HASH_WORKERS) -> str:
+    """Returns the SHA-256 digest of the content of a directory tree
+    :param directory: root of the tree
+    :param excluded_names: names of files and directories that are skipped wherever they appear in the tree
+                           (defaults to version control metadata)
+    :param workers: number of threads hashing files
+    :return: hex digest
+    """
+    excluded = set(DEFAULT_EXCLUDED_NAMES if excluded_names is None else excluded_names)
+    # (relative path, type, link target or executable bit) of every entry of the tree
+    entries: List[Tuple[str, str, str]] = []
+    files: Dict[str, str] = {}
+
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if d not in excluded)
+        rel_dir = os.path.relpath(dirpath, directory)
+        for name in sorted(filenames) + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+            if name in excluded:
+                continue
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.normpath(os.path.join(rel_dir, name)).replace(os.path.sep, '/')
+            mode = os.lstat(path).st_mode
+            if stat.S_ISLNK(mode):
+                entries.append((rel_path, 'link', os.readlink(path)))
+            elif stat.S_ISREG(mode):
+                entries.append((rel_path, 'file', 'x' if mode & stat.S_IXUSR else '-'))
+                files[rel_path] = path
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = dict(zip(files.keys(), executor.map(file_hash, files.values())))
+
+    digest = hashlib.sha256()
+    for rel_path, kind, detail in sorted(entries):
+        fields = [rel_path, kind, detail, digests[rel_path] if kind == 'file' else '']
+        digest.update('\0'.join(fields).encode('utf-8', 'surrogateescape'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def combined_hash(**inputs: Optional[str]) -> str:
+    """Returns the SHA-256 digest of named inputs (e.g. a tree hash and build parameters), independent of the
+    order in which they are given"""
+    digest = hashlib.sha256()
+    for name in sorted(inputs):
+        value = '' if inputs[name] is None else str(inputs[name])
+        digest.update(f'{name}={value}'.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
@@ -0,0 +1,69 @@
+"""
+This file provides access to the outputs of the other Pulumi projects that a project depends on. Stack reference
+ids are resolved from the project index and a single StackReference is created per referenced stack within a
+process. A StackReference is only created when one of its outputs is first requested, so stacks that are
+referenced conditionally are never read from the backend when they are not used.
+"""
+
+import threading
+from typing import Optional, Dict, Tuple
+
+import pulumi
+
+from kic_util import pulumi_config, project_index
+
+_references: Dict[str, pulumi.StackReference] = {}
+_outputs: Dict[Tuple[str, str, bool], pulumi.Output] = {}
+_lock = threading.RLock()
+
+
+def stack_reference_id(project_dir: str, stack_name: Optional[str] = None, pulumi_user: Optional[str] = None) -> str:
+    """Returns the fully qualified id of the stack of a project
+    :param project_dir: directory of the project relative to the projects directory (e.g. 'kubernetes/secrets')
+    :param stack_name: name of the stack (defaults to the stack currently being run)
+    :param pulumi_user: Pulumi user or organization owning the stack (defaults to the current Pulumi user)
+    :return: stack id in the format of user/project/stack
+    """
+    user = pulumi_user or pulumi_config.get_pulumi_user()
+    project_name = project_index.project_name(project_dir)
+    return f'{user}/{project_name}/{stack_name or pulumi.get_stack()}'
+
+
+def stack_reference(project_dir: str, stack_name: Optional[str] = None) -> pulumi.StackReference:
+    """Returns the StackReference to the stack of a project, creating it only the first time it is requested
+    :param project_dir: directory of the project relative to the projects directory (e.g. 'kubernetes/secrets')
+    :param stack_name: name of the stack (defaults to the stack currently being run)
+    :return: reference to the stack
+    """
+    ref_id = stack_reference_id(project_dir=project_dir, stack_name=stack_name)
+    with _lock:
+        if ref_id not in _references:
+            _references[ref_id] = pulumi.StackReference(ref_id)
+        return _references[ref_id]
+
+
+def _output(project_dir: str, name: str, required: bool, stack_name: Optional[str]) -> pulumi.Output:
+    ref_id = stack_reference_id(project_dir=project_dir, stack_name=stack_name)
+    key = (ref_id, name, required)
+    with _lock:
+        if key not in _outputs:
+            ref = stack_reference(project_dir=project_dir, stack_name=stack_name)
+            _outputs[key] = ref.require_output(name) if required else ref.get_output(name)
+        return _outputs[key]
+
+
+def get_output(project_dir: str, name: str, stack_name: Optional[str] = None) -> pulumi.Output:
+    """Returns an output of the stack of a project, which resolves to None if the output does not exist"""
+    return _output(project_dir=project_dir, name=name, required=False, stack_name=stack_name)
+
+
+def require_output(project_dir: str, name: str, stack_name: Optional[str] = None) -> pulumi.Output:
+    """Returns an output of the stack of a project, which fails if the output does not exist"""
+    return _output(project_dir=project_dir, name=name, required=True, stack_name=stack_name)
+
+
+def clear():
+    """Forgets all of the stack references and outputs created within this process"""
+    with _lock:
+        _references.clear()
+        _outputs.clear()
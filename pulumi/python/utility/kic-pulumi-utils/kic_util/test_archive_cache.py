@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from kic_util import archive_extract
+from kic_util.archive_cache import ArchiveCache, ArchiveChecksumError
+
+
+def make_targz(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tarball:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name=name)
+            info.size = len(content)
+            tarball.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = f'"{hashlib.sha256(server.archive).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        server.downloads += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(len(server.archive)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 19 Oct 2026 00:00:00 GMT')
+        self.end_headers()
+        if server.delay:
+            # Send the archive slowly, so that concurrent downloads overlap
+            half = len(server.archive) // 2
+            self.wfile.write(server.archive[:half])
+            self.wfile.flush()
+            time.sleep(server.delay)
+            self.wfile.write(server.archive[half:])
+        else:
+            self.wfile.write(server.archive)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestArchiveCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ArchiveCache(cache_dir=self.tmp_dir.name)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+        self.server.archive = make_targz({'kubernetes-ingress/Makefile': b'all:\n'})
+        self.server.requests = []
+        self.server.downloads = 0
+        self.server.delay = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/kic.tar.gz'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_unchanged_archive_is_revalidated_not_downloaded(self):
+        first = self.cache.fetch(self.url)
+        second = self.cache.fetch(self.url)
+        self.assertEqual(first, second)
+        self.assertEqual(2, len(self.server.requests))
+        self.assertEqual(1, self.server.downloads)
+        self.assertEqual(f'"{first}"', self.server.requests[1].get('If-None-Match'))
+
+    def test_changed_archive_is_downloaded_again(self):
+        first = self.cache.fetch(self.url)
+        self.server.archive = make_targz({'kubernetes-ingress/Makefile': b'changed:\n'})
+        second = self.cache.fetch(self.url)
+        self.assertNotEqual(first, second)
+        self.assertEqual(2, self.server.downloads)
+        self.assertTrue(os.path.isfile(self.cache.blob_path(second)))
+
+    def test_concurrent_fetches_of_same_url_download_once(self):
+        self.server.archive = make_targz({f'kubernetes-ingress/{i}': os.urandom(1024) for i in range(64)})
+        self.server.delay = 0.2
+        expected = hashlib.sha256(self.server.archive).hexdigest()
+
+        # Each fetch uses its own cache object, as separate processes would
+        def fetch(_):
+            return ArchiveCache(cache_dir=self.tmp_dir.name).fetch(self.url)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            digests = list(executor.map(fetch, range(3)))
+        self.assertEqual([expected] * 3, digests)
+        self.assertEqual(1, self.server.downloads)
+
+    def test_checksum_mismatch_raises(self):
+        with self.assertRaises(ArchiveChecksumError):
+            self.cache.fetch(self.url, expected_sha256='0' * 64)
+
+    def test_cached_checksum_makes_no_request(self):
+        sha256 = self.cache.fetch(self.url)
+        self.assertEqual(sha256, self.cache.fetch(self.url, expected_sha256=f'sha256:{sha256.upper()}'))
+        self.assertEqual(1, len(self.server.requests))
+
+    def test_extraction_is_reused(self):
+        first = self.cache.extract(self.url)
+        with open(os.path.join(first, 'kubernetes-ingress', 'Makefile'), 'rb') as f:
+            self.assertEqual(b'all:\n', f.read())
+        marker = os.path.join(first, 'kubernetes-ingress', 'marker')
+        with open(marker, 'w'):
+            pass
+
+        second = self.cache.extract(self.url)
+        self.assertEqual(first, second)
+        # The archive was not extracted again, so the file written into the extraction is still there
+        self.assertTrue(os.path.isfile(marker))
+
+    def test_extraction_completed_by_another_process_is_kept(self):
+        sha256 = self.cache.fetch(self.url)
+        extract_dir = self.cache.extraction_path(sha256)
+        marker = os.path.join(extract_dir, 'in-use')
+        extract_targz_file = archive_extract.extract_targz_file
+
+        # Another process completes the same extraction while this one is still extracting
+        def extract_concurrently(archive_path: str, dest_dir: str):
+            os.makedirs(extract_dir)
+            with open(marker, 'w'):
+                pass
+            with open(f'{extract_dir}.complete', 'w'):
+                pass
+            extract_targz_file(archive_path=archive_path, dest_dir=dest_dir)
+
+        with mock.patch.object(archive_extract, 'extract_targz_file', side_effect=extract_concurrently):
+            self.assertEqual(extract_dir, self.cache.extract(self.url))
+        self.assertTrue(os.path.isfile(marker))
+        self.assertFalse([name for name in os.listdir(os.path.dirname(extract_dir)) if name.startswith('.extract_')])
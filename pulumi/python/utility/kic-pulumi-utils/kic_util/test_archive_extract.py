@@ -0,0 +1,193 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from kic_util import archive_extract
+from kic_util.archive_extract import UnsafeArchiveMemberError
+
+
+def make_targz(members) -> bytes:
+    """Builds a tar.gz archive from (TarInfo, content) pairs"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tarball:
+        for info, content in members:
+            if content is not None:
+                info.size = len(content)
+                tarball.addfile(info, io.BytesIO(content))
+            else:
+                tarball.addfile(info)
+    return buffer.getvalue()
+
+
+def file_member(name: str, content: bytes, mode: int = 0o644):
+    info = tarfile.TarInfo(name=name)
+    info.mode = mode
+    return info, content
+
+
+def link_member(name: str, linkname: str, link_type=tarfile.SYMTYPE):
+    info = tarfile.TarInfo(name=name)
+    info.type = link_type
+    info.linkname = linkname
+    return info, None
+
+
+def dir_member(name: str):
+    info = tarfile.TarInfo(name=name)
+    info.type = tarfile.DIRTYPE
+    info.mode = 0o755
+    return info, None
+
+
+class SlowReader:
+    """Simulates a network stream by waiting before each read"""
+    def __init__(self, data: bytes, chunk_size: int, delay: float):
+        self.stream = io.BytesIO(data)
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    def read(self, size: int = -1) -> bytes:
+        time.sleep(self.delay)
+        return self.stream.read(min(size, self.chunk_size) if size >= 0 else self.chunk_size)
+
+
+class TestArchiveExtract(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dest_dir = os.path.join(self.tmp_dir.name, 'dest')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def extract(self, members, paths=None) -> int:
+        return archive_extract.extract_targz(io.BytesIO(make_targz(members)), dest_dir=self.dest_dir, paths=paths)
+
+    def read(self, *parts) -> bytes:
+        with open(os.path.join(self.dest_dir, *parts), 'rb') as f:
+            return f.read()
+
+    def test_extract_files_dirs_and_links(self):
+        count = self.extract([dir_member('src'),
+                              file_member('src/Makefile', b'all:\n'),
+                              file_member('src/build.sh', b'#!/bin/sh\n', mode=0o755),
+                              link_member('src/GNUmakefile', 'Makefile'),
+                              link_member('src/hardlink', 'src/Makefile', link_type=tarfile.LNKTYPE)])
+        self.assertEqual(5, count)
+        self.assertEqual(b'all:\n', self.read('src', 'Makefile'))
+        self.assertEqual(b'all:\n', self.read('src', 'GNUmakefile'))
+        self.assertEqual(b'all:\n', self.read('src', 'hardlink'))
+        self.assertTrue(os.path.islink(os.path.join(self.dest_dir, 'src', 'GNUmakefile')))
+        self.assertTrue(os.access(os.path.join(self.dest_dir, 'src', 'build.sh'), os.X_OK))
+
+    def test_extract_path_subset(self):
+        count = self.extract([file_member('kic/Makefile', b'all:\n'),
+                              file_member('kic/docs/index.md', b'docs'),
+                              file_member('kic/build/Dockerfile', b'FROM scratch\n')],
+                             paths=['kic/Makefile', './kic/build/'])
+        self.assertEqual(2, count)
+        self.assertEqual(b'FROM scratch\n', self.read('kic', 'build', 'Dockerfile'))
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, 'kic', 'docs')))
+
+    def test_path_traversal_rejected(self):
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([file_member('../escaped', b'x')])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'escaped')))
+
+    def test_absolute_path_rejected(self):
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([file_member('/tmp/absolute', b'x')])
+
+    def test_absolute_link_rejected(self):
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([link_member('passwd', '/etc/passwd')])
+
+    def test_escaping_link_rejected(self):
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([link_member('src/up', '../../outside')])
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([link_member('hard', '../outside', link_type=tarfile.LNKTYPE)])
+
+    def test_link_through_extracted_symlink_rejected(self):
+        secret_path = os.path.join(self.tmp_dir.name, 'secret.txt')
+        with open(secret_path, 'wb') as f:
+            f.write(b'secret')
+
+        # x/../secret.txt stays inside the target directory lexically, but x resolves to the directory itself
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([link_member('x', '.'),
+                          link_member('h', 'x/../secret.txt', link_type=tarfile.LNKTYPE)])
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, 'h')))
+        self.assertEqual(1, os.stat(secret_path).st_nlink)
+
+        self.dest_dir = os.path.join(self.tmp_dir.name, 'dest2')
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([link_member('x', '.'), link_member('s', 'x/../secret.txt')])
+        self.assertFalse(os.path.lexists(os.path.join(self.dest_dir, 's')))
+
+    def test_device_rejected(self):
+        info = tarfile.TarInfo(name='dev')
+        info.type = tarfile.CHRTYPE
+        with self.assertRaises(UnsafeArchiveMemberError):
+            self.extract([(info, None)])
+
+    def test_corrupt_archive_raises(self):
+        data = make_targz([file_member('Makefile', b'all:\n' * 1000)])
+        with self.assertRaises((OSError, EOFError, tarfile.TarError)):
+            archive_extract.extract_targz(io.BytesIO(data[:len(data) // 2]), dest_dir=self.dest_dir)
+
+    def test_extract_file_without_pigz(self):
+        archive_path = os.path.join(self.tmp_dir.name, 'archive.tar.gz')
+        with open(archive_path, 'wb') as f:
+            f.write(make_targz([file_member('Makefile', b'all:\n')]))
+        with mock.patch('shutil.which', return_value=None):
+            self.assertEqual(1, archive_extract.extract_targz_file(archive_path, dest_dir=self.dest_dir))
+        self.assertEqual(b'all:\n', self.read('Makefile'))
+
+
+@unittest.skipUnless(os.environ.get('MARA_RUN_BENCHMARKS'), 'set MARA_RUN_BENCHMARKS=1 to run benchmarks')
+class BenchmarkArchiveExtract(unittest.TestCase):
+    FILE_COUNT = 2000
+    FILE_SIZE = 64 * 1024
+    NETWORK_CHUNK_SIZE = 256 * 1024
+    NETWORK_DELAY = 0.005
+
+    @classmethod
+    def setUpClass(cls):
+        members = []
+        for i in range(cls.FILE_COUNT):
+            # Half random, half repetitive content compresses roughly like a source tree
+            content = os.urandom(cls.FILE_SIZE // 2) + bytes(cls.FILE_SIZE // 2)
+            members.append(file_member(f'kic/pkg/{i // 100}/file_{i}.go', content))
+        cls.archive = make_targz(members)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def sequential(self, dest_dir: str):
+        stream = SlowReader(self.archive, self.NETWORK_CHUNK_SIZE, self.NETWORK_DELAY)
+        with gzip.GzipFile(fileobj=stream) as uncompressed:
+            with tarfile.TarFile(fileobj=uncompressed) as tarball:
+                tarball.extractall(path=dest_dir)
+
+    def pipelined(self, dest_dir: str):
+        stream = SlowReader(self.archive, self.NETWORK_CHUNK_SIZE, self.NETWORK_DELAY)
+        archive_extract.extract_targz(stream, dest_dir=dest_dir)
+
+    def test_pipelined_extraction_is_faster(self):
+        timings = {}
+        for name, func in [('sequential', self.sequential), ('pipelined', self.pipelined)]:
+            start = time.monotonic()
+            func(os.path.join(self.tmp_dir.name, name))
+            timings[name] = time.monotonic() - start
+
+        print(f'\nExtracting {len(self.archive) / 1024 / 1024:.1f} MiB archive of {self.FILE_COUNT} files: '
+              f'sequential {timings["sequential"]:.2f}s, pipelined {timings["pipelined"]:.2f}s')
+        self.assertLess(timings['pipelined'], timings['sequential'])
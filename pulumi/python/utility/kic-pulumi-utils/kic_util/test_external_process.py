@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from kic_util import external_process
+
+
+class TestExternalProcess(unittest.TestCase):
+    def test_run_streaming_calls_back_for_each_line(self):
+        stdout_lines = []
+        stderr_lines = []
+        res, err = external_process.run_streaming(cmd='echo one; echo two; echo three >&2',
+                                                  on_stdout_line=stdout_lines.append,
+                                                  on_stderr_line=stderr_lines.append)
+        self.assertEqual(['one', 'two'], stdout_lines)
+        self.assertEqual(['three'], stderr_lines)
+        self.assertEqual(os.linesep.join(['one', 'two']), res)
+        self.assertEqual('three', err)
+
+    def test_run_streaming_argv_is_not_interpreted_by_shell(self):
+        res, _ = external_process.run_streaming(cmd=['echo', '$HOME; echo injected'])
+        self.assertEqual('$HOME; echo injected', res)
+
+    def test_run_streaming_with_cwd(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            res, _ = external_process.run_streaming(cmd=[sys.executable, '-c', 'import os; print(os.getcwd())'],
+                                                    cwd=tmp_dir)
+            self.assertEqual(os.path.realpath(tmp_dir), os.path.realpath(res))
+
+    def test_run_streaming_caps_captured_output(self):
+        script = 'for i in range(1000): print(i)'
+        lines = []
+        res, _ = external_process.run_streaming(cmd=[sys.executable, '-c', script], max_captured_lines=3,
+                                                on_stdout_line=lines.append)
+        self.assertEqual(1000, len(lines))
+        self.assertEqual(os.linesep.join(['997', '998', '999']), res)
+
+    def test_run_streaming_failure_raises(self):
+        with self.assertRaises(external_process.ExternalProcessExecError):
+            external_process.run_streaming(cmd='echo failing; exit 3')
+
+    def test_run_failure_reports_exit_status_and_output(self):
+        with self.assertRaises(external_process.ExternalProcessExecError) as context:
+            external_process.run('echo out; exit 3')
+        self.assertEqual(3, context.exception.returncode)
+        self.assertEqual('out', context.exception.stdout.strip())
+        self.assertEqual('echo out; exit 3', context.exception.cmd)
+
+    def test_run_streaming_failure_suppressed(self):
+        res, _ = external_process.run_streaming(cmd='echo failing; exit 3', suppress_error=True)
+        self.assertEqual('failing', res)
+
+    def test_run_streaming_timeout_kills_process_group(self):
+        start = time.monotonic()
+        with self.assertRaises(external_process.ExternalProcessTimeoutError):
+            # The background child keeps the output pipes open, so this only returns quickly when the whole
+            # process group is killed
+            external_process.run_streaming(cmd='sleep 30 & sleep 30', timeout=0.5)
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_run_streaming_from_running_event_loop(self):
+        async def call():
+            return external_process.run_streaming(cmd=['echo', 'in loop'])
+
+        res, _ = asyncio.run(call())
+        self.assertEqual('in loop', res)
+
+    def test_run_batch_returns_results_in_order(self):
+        cmds = [f'sleep 0.{9 - i}; echo {i}' for i in range(5)]
+        results = external_process.run_batch(cmds, max_workers=5)
+        self.assertEqual([str(i) for i in range(5)], [result.stdout.strip() for result in results])
+        self.assertTrue(all(result.duration > 0 for result in results))
+
+    def test_run_batch_is_bounded(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def runner(cmd, suppress_error, env):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return cmd, ''
+
+        results = external_process.run_batch([str(i) for i in range(10)], max_workers=3, runner=runner)
+        self.assertEqual([str(i) for i in range(10)], [result.stdout for result in results])
+        self.assertLessEqual(max_running[0], 3)
+
+    def test_run_batch_failure_raises_after_all_commands_run(self):
+        with self.assertRaises(external_process.ExternalProcessBatchError) as context:
+            external_process.run_batch(['echo ok', 'exit 1', 'echo also ok'])
+        results = context.exception.results
+        self.assertEqual([True, False, True], [result.succeeded() for result in results])
+        self.assertEqual(1, len(context.exception.failures))
+
+    def test_run_batch_failure_suppressed(self):
+        results = external_process.run_batch(['echo ok', 'exit 1'], suppress_error=True)
+        self.assertEqual(['ok', ''], [result.stdout.strip() for result in results])
+
+    def test_run_cache_reuses_output(self):
+        calls = []
+
+        def runner(cmd, suppress_error, env):
+            calls.append(cmd)
+            return f'{len(calls)}', ''
+
+        cache = external_process.RunCache()
+        first = cache.run(cmd='whoami', env={}, runner=runner)
+        second = cache.run(cmd='whoami', env={}, runner=runner)
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1}, cache.stats())
+
+    def test_run_cache_key_includes_env_subset_and_cwd(self):
+        def runner(cmd, suppress_error, env, cwd=None):
+            return f'{env.get("TOKEN")}:{cwd}', ''
+
+        cache = external_process.RunCache()
+        self.assertEqual('a:None', cache.run(cmd='id', env={'TOKEN': 'a', 'OTHER': '1'}, env_keys=['TOKEN'],
+                                             runner=runner)[0])
+        # Variables not in env_keys do not affect the key
+        self.assertEqual('a:None', cache.run(cmd='id', env={'TOKEN': 'a', 'OTHER': '2'}, env_keys=['TOKEN'],
+                                             runner=runner)[0])
+        self.assertEqual('b:None', cache.run(cmd='id', env={'TOKEN': 'b'}, env_keys=['TOKEN'], runner=runner)[0])
+        self.assertEqual('a:/tmp', cache.run(cmd='id', env={'TOKEN': 'a'}, env_keys=['TOKEN'], cwd='/tmp',
+                                             runner=runner)[0])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(3, cache.misses)
+
+    def test_run_cache_expires_and_invalidates(self):
+        calls = []
+
+        def runner(cmd, suppress_error, env):
+            calls.append(cmd)
+            return cmd, ''
+
+        cache = external_process.RunCache(ttl_seconds=0)
+        cache.run(cmd='one', env={}, runner=runner)
+        cache.run(cmd='one', env={}, runner=runner)
+        self.assertEqual(2, len(calls))
+
+        cache = external_process.RunCache()
+        cache.run(cmd='one', env={}, runner=runner)
+        cache.run(cmd='two', env={}, runner=runner)
+        cache.invalidate('one')
+        cache.run(cmd='one', env={}, runner=runner)
+        cache.run(cmd='two', env={}, runner=runner)
+        self.assertEqual(['one', 'one', 'one', 'two', 'one'], calls)
+        cache.invalidate()
+        self.assertEqual(0, cache.stats()['entries'])
+
+    def test_run_cache_does_not_remember_failures(self):
+        cache = external_process.RunCache()
+        for _ in range(2):
+            with self.assertRaises(external_process.ExternalProcessExecError):
+                cache.run(cmd='exit 1')
+        self.assertEqual(2, cache.misses)
+
+        # Failures are not remembered when they are suppressed either
+        for _ in range(2):
+            self.assertEqual(('out', ''), tuple(output.strip() for output in
+                                                cache.run(cmd='echo out; exit 1', suppress_error=True)))
+        self.assertEqual(4, cache.misses)
+        self.assertEqual(0, cache.stats()['entries'])
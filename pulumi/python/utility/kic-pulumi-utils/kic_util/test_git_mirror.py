@@ -0,0 +1,124 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from git import Repo, Actor
+
+from kic_util import archive_download
+from kic_util.git_mirror import GitMirror
+from kic_util.workspace import WorkspaceManager
+
+AUTHOR = Actor('Test Author', 'author@example.com')
+
+
+class TestGitMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.origin_path = os.path.join(self.tmp_dir.name, 'kubernetes-ingress.git')
+        self.origin = Repo.init(self.origin_path)
+        self.commits = {}
+        self.commit('v1.0.0', b'version 1\n')
+        self.commit('v2.0.0', b'version 2\n')
+        self.url = f'file://{self.origin_path}'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def commit(self, tag: str, content: bytes):
+        with open(os.path.join(self.origin_path, 'VERSION'), 'wb') as f:
+            f.write(content)
+        self.origin.index.add(['VERSION'])
+        commit = self.origin.index.commit(f'Release {tag}', author=AUTHOR, committer=AUTHOR)
+        self.origin.create_tag(tag)
+        self.commits[tag] = commit.hexsha
+
+    def read_version(self, directory: str) -> bytes:
+        with open(os.path.join(directory, 'VERSION'), 'rb') as f:
+            return f.read()
+
+    def checkout(self, ref):
+        dest_dir = tempfile.mkdtemp(dir=self.tmp_dir.name)
+        commit = GitMirror(self.url, cache_dir=self.cache_dir).worktree(dest_dir=dest_dir, ref=ref)
+        return dest_dir, commit
+
+    def test_worktree_of_tag(self):
+        dest_dir, commit = self.checkout('v1.0.0')
+        self.assertEqual(self.commits['v1.0.0'], commit)
+        self.assertEqual(b'version 1\n', self.read_version(dest_dir))
+        # Git commands used by the build work within the worktree
+        self.assertEqual('v1.0.0', Repo(dest_dir).git.describe('--tags'))
+
+    def test_worktree_of_commit_and_default_branch(self):
+        dest_dir, commit = self.checkout(self.commits['v1.0.0'])
+        self.assertEqual(b'version 1\n', self.read_version(dest_dir))
+
+        dest_dir, commit = self.checkout(None)
+        self.assertEqual(self.commits['v2.0.0'], commit)
+
+    def test_cached_tag_checked_out_without_fetching(self):
+        self.checkout('v1.0.0')
+        # The remote is no longer reachable, so the tag can only come from the mirror
+        shutil.rmtree(self.origin_path)
+        dest_dir, commit = self.checkout('v1.0.0')
+        self.assertEqual(b'version 1\n', self.read_version(dest_dir))
+
+    def test_only_missing_tags_fetched(self):
+        mirror = GitMirror(self.url, cache_dir=self.cache_dir)
+        mirror.fetch('v1.0.0')
+        mirror_repo = Repo(mirror.path)
+        self.assertNotIn('v2.0.0', [tag.name for tag in mirror_repo.tags])
+
+        mirror.fetch('v2.0.0')
+        self.assertIn('v2.0.0', [tag.name for tag in mirror_repo.tags])
+
+    def test_fetch_waits_for_other_process(self):
+        mirror = GitMirror(self.url, cache_dir=self.cache_dir)
+        os.makedirs(os.path.dirname(mirror.path))
+        fetched = threading.Event()
+
+        def fetch():
+            mirror.fetch('v1.0.0')
+            fetched.set()
+
+        # Another process holds the lock on the mirror
+        with open(mirror.path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            thread = threading.Thread(target=fetch)
+            thread.start()
+            self.assertFalse(fetched.wait(0.3))
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        thread.join(timeout=30)
+        self.assertTrue(fetched.is_set())
+
+    def test_existing_origin_remote_tolerated(self):
+        mirror = GitMirror(self.url, cache_dir=self.cache_dir)
+        # Left behind by a process that created the mirror and its remote, but was stopped before writing HEAD
+        Repo.init(mirror.path, bare=True).create_remote('origin', self.url)
+        os.unlink(os.path.join(mirror.path, 'HEAD'))
+        self.assertEqual(self.commits['v1.0.0'], mirror.fetch('v1.0.0'))
+
+    def test_unknown_ref_raises(self):
+        with self.assertRaises(ValueError):
+            self.checkout('v9.9.9')
+
+    def test_export(self):
+        dest_dir = os.path.join(self.tmp_dir.name, 'export')
+        commit = GitMirror(self.url, cache_dir=self.cache_dir).export(dest_dir=dest_dir, ref='v2.0.0')
+        self.assertEqual(self.commits['v2.0.0'], commit)
+        self.assertEqual(b'version 2\n', self.read_version(dest_dir))
+        self.assertFalse(os.path.exists(os.path.join(dest_dir, '.git')))
+
+    def test_checkout_from_git_uses_mirror(self):
+        manager = WorkspaceManager(root=os.path.join(self.tmp_dir.name, 'workspaces'))
+        with mock.patch.dict(os.environ, {'MARA_GIT_CACHE_DIR': self.cache_dir}), \
+                mock.patch('kic_util.workspace.default_manager', return_value=manager):
+            source_dir = archive_download.download_and_extract_archive_from_url(f'{self.url}#v1.0.0')
+            # The checkout of the same commit is reused
+            self.assertEqual(source_dir, archive_download.download_and_extract_archive_from_url(f'{self.url}#v1.0.0'))
+        self.assertEqual(b'version 1\n', self.read_version(source_dir))
+        self.assertTrue(os.path.isdir(os.path.join(self.cache_dir, 'mirrors')))
@@ -0,0 +1,187 @@
+import os
+import re
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib import error
+
+from kic_util import http_download
+
+CONTENT = bytes(range(256)) * 4096
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the server's content, honouring Range requests and dropping connections on request"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if server.failures:
+            status = server.failures.pop(0)
+            if isinstance(status, int):
+                self.send_error(status)
+                return
+        else:
+            status = None
+
+        content = server.content
+        start = 0
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and server.ranges and (if_range is None or if_range == server.etag):
+            start = int(re.match(r'bytes=(\d+)-', range_header).group(1))
+            if start >= len(content):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            if server.misaligned_ranges:
+                # Report content starting elsewhere than requested
+                server.misaligned_ranges -= 1
+                start = start // 2
+            self.send_header('Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            self.send_response(200)
+        if server.length:
+            self.send_header('Content-Length', str(len(content) - start))
+        else:
+            # The end of the content is marked by closing the connection
+            self.close_connection = True
+        self.send_header('ETag', server.etag)
+        self.end_headers()
+
+        body = content[start:]
+        if status == 'drop':
+            # Send part of the content and then close the connection
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpDownload(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dest_path = os.path.join(self.tmp_dir.name, 'archive.tar.gz')
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.content = CONTENT
+        self.server.etag = '"v1"'
+        self.server.ranges = True
+        self.server.length = True
+        self.server.failures = []
+        self.server.misaligned_ranges = 0
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/archive.tar.gz'
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def read_dest(self) -> bytes:
+        with open(self.dest_path, 'rb') as f:
+            return f.read()
+
+    def test_download(self):
+        updates = []
+        result = http_download.download(self.url, self.dest_path, on_progress=updates.append)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertTrue(result.progress.complete)
+        self.assertEqual(len(CONTENT), result.progress.total_bytes)
+        self.assertEqual(len(CONTENT), result.progress.bytes_received)
+        self.assertGreater(result.progress.bytes_per_second, 0)
+        self.assertIs(result.progress, updates[-1])
+        self.assertEqual('"v1"', result.headers.get('etag'))
+        self.assertFalse(os.path.exists(self.dest_path + http_download.PARTIAL_SUFFIX))
+
+    def test_dropped_connection_resumed_with_range(self):
+        self.server.failures = ['drop']
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertEqual(2, result.progress.attempts)
+        self.assertEqual(len(CONTENT), result.progress.bytes_received)
+        resumed_request = self.server.requests[1]
+        self.assertEqual(f'bytes={len(CONTENT) // 3}-', resumed_request.get('Range'))
+        self.assertEqual('"v1"', resumed_request.get('If-Range'))
+        self.sleep.assert_called_once_with(http_download.DEFAULT_BACKOFF_SECONDS)
+
+    def test_misaligned_partial_content_restarts_download(self):
+        self.server.failures = ['drop']
+        self.server.misaligned_ranges = 1
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertEqual(3, result.progress.attempts)
+        self.assertIsNotNone(self.server.requests[1].get('Range'))
+        self.assertIsNone(self.server.requests[2].get('Range'))
+
+    def test_partial_download_resumed_by_later_call(self):
+        self.server.failures = ['drop']
+        with self.assertRaises(http_download.IncompleteDownloadError):
+            http_download.download(self.url, self.dest_path, retries=0)
+        self.assertFalse(os.path.exists(self.dest_path))
+
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertEqual(len(CONTENT) // 3, result.progress.resumed_from)
+
+    def test_changed_content_restarts_download(self):
+        self.server.failures = ['drop']
+        with self.assertRaises(http_download.IncompleteDownloadError):
+            http_download.download(self.url, self.dest_path, retries=0)
+
+        self.server.content = CONTENT[::-1]
+        self.server.etag = '"v2"'
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT[::-1], self.read_dest())
+        self.assertEqual(0, result.progress.resumed_from)
+
+    def test_server_without_range_support_restarts_download(self):
+        self.server.ranges = False
+        self.server.failures = ['drop']
+        http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+
+    def test_server_errors_retried_with_backoff(self):
+        self.server.failures = [503, 503]
+        result = http_download.download(self.url, self.dest_path, backoff_seconds=0.5)
+        self.assertEqual(3, result.progress.attempts)
+        self.assertEqual([mock.call(0.5), mock.call(1.0)], self.sleep.call_args_list)
+
+    def test_client_error_not_retried(self):
+        self.server.failures = [404]
+        with self.assertRaises(error.HTTPError):
+            http_download.download(self.url, self.dest_path)
+        self.assertEqual(1, len(self.server.requests))
+
+    def test_retries_exhausted(self):
+        self.server.failures = [503, 503, 503]
+        with self.assertRaises(error.HTTPError):
+            http_download.download(self.url, self.dest_path, retries=2)
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_dropped_connection_without_length_resumed(self):
+        self.server.length = False
+        self.server.failures = ['drop']
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertEqual(2, result.progress.attempts)
+        # The first body ended early, so the check for more content found some and the download was resumed
+        self.assertEqual(f'bytes={len(CONTENT) // 3}-', self.server.requests[1].get('Range'))
+
+    def test_complete_content_without_length_accepted(self):
+        self.server.length = False
+        result = http_download.download(self.url, self.dest_path)
+        self.assertEqual(CONTENT, self.read_dest())
+        self.assertEqual(1, result.progress.attempts)
+        self.assertEqual(f'bytes={len(CONTENT)}-', self.server.requests[1].get('Range'))
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+
+from kic_util import project_index
+
+
+class TestProjectIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.projects_dir = os.path.join(self.tmp_dir.name, 'python')
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        os.makedirs(os.path.join(self.projects_dir, 'utility', 'kic-pulumi-utils'))
+        self.write_project('infrastructure/kubeconfig', 'kubeconfig')
+        self.write_project('kubernetes/secrets', 'secrets')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_project(self, project_dir: str, name: str):
+        directory = os.path.join(self.projects_dir, project_dir)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'Pulumi.yaml'), 'w') as f:
+            f.write(f'name: {name}\nruntime: python\n')
+
+    def lookup(self, project_dir: str) -> str:
+        return project_index.project_name(project_dir, projects_dir=self.projects_dir, cache_dir=self.cache_dir)
+
+    def test_project_name(self):
+        self.assertEqual('kubeconfig', self.lookup('infrastructure/kubeconfig'))
+        self.assertEqual('secrets', self.lookup('kubernetes/secrets/'))
+
+    def test_index_is_stored_on_disk(self):
+        self.lookup('kubernetes/secrets')
+        index_file = project_index.index_path(os.path.abspath(self.projects_dir), self.cache_dir)
+        self.assertTrue(os.path.isfile(index_file))
+
+    def test_index_rebuilt_when_pulumi_yaml_changes(self):
+        self.assertEqual('secrets', self.lookup('kubernetes/secrets'))
+        # Ensure that the modification time changes even on file systems with a coarse resolution
+        time.sleep(0.01)
+        self.write_project('kubernetes/secrets', 'renamed-secrets')
+        pulumi_yaml = os.path.join(self.projects_dir, 'kubernetes', 'secrets', 'Pulumi.yaml')
+        stat = os.stat(pulumi_yaml)
+        os.utime(pulumi_yaml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual('renamed-secrets', self.lookup('kubernetes/secrets'))
+
+    def test_new_project_found(self):
+        self.lookup('kubernetes/secrets')
+        self.write_project('kubernetes/certmgr', 'certmgr')
+        self.assertEqual('certmgr', self.lookup('kubernetes/certmgr'))
+
+    def test_unknown_project_raises(self):
+        with self.assertRaises(project_index.ProjectNotFoundError):
+            self.lookup('kubernetes/unknown')
+
+    def test_find_projects_dir(self):
+        start_dir = os.path.join(self.projects_dir, 'kubernetes', 'secrets')
+        self.assertEqual(os.path.abspath(self.projects_dir), project_index.find_projects_dir(start_dir))
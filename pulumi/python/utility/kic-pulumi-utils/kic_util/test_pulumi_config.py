@@ -1,7 +1,7 @@
 import os
 import unittest
 import tempfile
-from kic_util import pulumi_config
+from kic_util import pulumi_config, external_process
 
 
 class TestPulumiConfig(unittest.TestCase):
@@ -45,3 +45,40 @@ config: config
             if e.message.startswith('PULUMI_ACCESS_TOKEN must be set for login during non-interactive CLI sessions'):
                 self.skipTest('Skipping error because we are running in an environment that does not '
                               f'have the Pulumi CLI configured. Error: {e.message}')
+
+    def test_get_pulumi_user_from_environment(self):
+        env = {pulumi_config.PULUMI_USER_ENV_VAR: 'passed-user', 'PATH': ''}
+        self.assertEqual('passed-user', pulumi_config.get_pulumi_user(env=env))
+
+    def test_get_pulumi_user_cached_on_disk_by_backend_and_token(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bin_dir = os.path.join(tmp_dir, 'bin')
+            os.mkdir(bin_dir)
+            calls_path = os.path.join(tmp_dir, 'calls')
+            fake_pulumi = os.path.join(bin_dir, 'pulumi')
+            with open(fake_pulumi, 'w') as f:
+                f.write(f'#!/bin/sh\n'
+                        f'echo called >> "{calls_path}"\n'
+                        'echo "user-$(printf %s "$PULUMI_ACCESS_TOKEN" | wc -c)-$PULUMI_BACKEND_URL"\n')
+            os.chmod(fake_pulumi, 0o755)
+
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            env = {'PATH': os.pathsep.join([bin_dir, os.environ.get('PATH', '')]),
+                   'HOME': tmp_dir,
+                   'PULUMI_BACKEND_URL': 'https://api.example.com',
+                   'PULUMI_ACCESS_TOKEN': 'secret-token'}
+            expected = 'user-12-https://api.example.com'
+            self.assertEqual(expected, pulumi_config.get_pulumi_user(env=env, cache_dir=cache_dir))
+            # A fresh in-process memo is used to simulate another process reading the on-disk cache
+            external_process.default_cache.invalidate()
+            self.assertEqual(expected, pulumi_config.get_pulumi_user(env=env, cache_dir=cache_dir))
+            with open(calls_path, 'r') as f:
+                self.assertEqual(1, len(f.readlines()))
+
+            for cache_file in os.listdir(cache_dir):
+                with open(os.path.join(cache_dir, cache_file), 'r') as f:
+                    self.assertNotIn('secret-token', f.read())
+
+            env['PULUMI_ACCESS_TOKEN'] = 'other-token'
+            self.assertEqual('user-11-https://api.example.com',
+                             pulumi_config.get_pulumi_user(env=env, cache_dir=cache_dir))
@@ -0,0 +1,161 @@
+import base64
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib import parse
+
+from kic_util import registry
+from kic_util.registry import ImageReference, RegistryError
+
+DIGEST = 'sha256:9358beb5cb1c6d6a9c005b18bdad08b0f2259b82d32687b03334256cbd500997'
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    """Stand-in for a registry:2 server with a token service, serving the digests of the server's manifests"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        server = self.server
+        server.requests.append((self.command, self.path, dict(self.headers)))
+        authorization = self.headers.get('Authorization')
+        if server.auth == 'bearer' and authorization != f'Bearer {server.token}':
+            realm = f'http://127.0.0.1:{server.server_address[1]}/token'
+            self.send_unauthorized(f'Bearer realm="{realm}",service="registry.test"')
+            return
+        if server.auth == 'basic' and authorization != f'Basic {server.basic}':
+            self.send_unauthorized('Basic realm="registry.test"')
+            return
+
+        digest = server.manifests.get(self.path)
+        if not digest:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Docker-Content-Digest', digest)
+        self.send_header('Content-Type', self.headers.get('Accept', '').split(',')[0])
+        self.send_header('Content-Length', '1024')
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.command, self.path, dict(self.headers)))
+        query = parse.parse_qs(parse.urlsplit(self.path).query)
+        if server.basic and self.headers.get('Authorization') != f'Basic {server.basic}':
+            self.send_unauthorized('Basic realm="token"')
+            return
+        body = json.dumps({'token': server.token, 'scope': query['scope'][0]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_unauthorized(self, challenge: str):
+        self.send_response(401)
+        self.send_header('WWW-Authenticate', challenge)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_registry(test: unittest.TestCase, auth: str = None, basic: str = None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RegistryHandler)
+    server.auth = auth
+    server.basic = basic
+    server.token = 'token-1'
+    server.manifests = {'/v2/nginx/nginx-ingress/manifests/2.4.2': DIGEST}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+class TestImageReference(unittest.TestCase):
+    def test_docker_hub_images(self):
+        image = ImageReference.parse('nginx/nginx-ingress:2.4.2')
+        self.assertEqual(('docker.io', 'nginx/nginx-ingress', '2.4.2'),
+                         (image.registry, image.repository, image.reference))
+        self.assertEqual('https://registry-1.docker.io/v2/nginx/nginx-ingress/manifests/2.4.2', image.api_url)
+        self.assertEqual('library/debian', ImageReference.parse('debian').repository)
+        self.assertEqual('latest', ImageReference.parse('debian').reference)
+
+    def test_private_registry_images(self):
+        image = ImageReference.parse('myregistryhost:5000/fedora/nginx-kic:1.11.1')
+        self.assertEqual(('myregistryhost:5000', 'fedora/nginx-kic', '1.11.1'),
+                         (image.registry, image.repository, image.reference))
+        self.assertEqual('https://myregistryhost:5000/v2/fedora/nginx-kic/manifests/1.11.1', image.api_url)
+        self.assertEqual('http://localhost:5000/v2/kic/manifests/latest',
+                         ImageReference.parse('localhost:5000/kic').api_url)
+        self.assertEqual(DIGEST, ImageReference.parse(f'registry.example.com/kic@{DIGEST}').reference)
+
+    def test_tag_and_digest(self):
+        image = ImageReference.parse(f'nginx/nginx-ingress:2.4.2@{DIGEST}')
+        self.assertEqual(('docker.io', 'nginx/nginx-ingress', DIGEST),
+                         (image.registry, image.repository, image.reference))
+        self.assertEqual(f'https://registry-1.docker.io/v2/nginx/nginx-ingress/manifests/{DIGEST}', image.api_url)
+        image = ImageReference.parse(f'localhost:5000/kic:2.4.2@{DIGEST}')
+        self.assertEqual(('localhost:5000', 'kic', DIGEST), (image.registry, image.repository, image.reference))
+
+
+class TestManifestDigest(unittest.TestCase):
+    def setUp(self):
+        # No credentials are stored for any registry
+        self.config_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.config_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'DOCKER_CONFIG': self.config_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def image_name(self, server: ThreadingHTTPServer, tag: str = '2.4.2') -> str:
+        return f'127.0.0.1:{server.server_address[1]}/nginx/nginx-ingress:{tag}'
+
+    def test_anonymous(self):
+        server = start_registry(self)
+        self.assertEqual(DIGEST, registry.manifest_digest(self.image_name(server)))
+        self.assertEqual(['HEAD'], [method for method, _, _ in server.requests])
+        self.assertIn('application/vnd.docker.distribution.manifest.list.v2+json', server.requests[0][2]['Accept'])
+
+    def test_bearer_token(self):
+        server = start_registry(self, auth='bearer')
+        self.assertEqual(DIGEST, registry.manifest_digest(self.image_name(server)))
+        token_request = server.requests[1]
+        self.assertEqual('GET', token_request[0])
+        self.assertIn('scope=repository%3Anginx%2Fnginx-ingress%3Apull', token_request[1])
+        self.assertIn('service=registry.test', token_request[1])
+
+    def test_bearer_token_with_credentials(self):
+        basic = base64.b64encode(b'user:secret').decode('ascii')
+        server = start_registry(self, auth='bearer', basic=basic)
+        self.assertEqual(DIGEST, registry.manifest_digest(self.image_name(server), credentials=('user', 'secret')))
+        with self.assertRaises(RegistryError):
+            registry.manifest_digest(self.image_name(server), credentials=('user', 'wrong'))
+
+    def test_basic_credentials_from_docker_config(self):
+        basic = base64.b64encode(b'user:secret').decode('ascii')
+        server = start_registry(self, auth='basic', basic=basic)
+        with self.assertRaises(RegistryError):
+            registry.manifest_digest(self.image_name(server))
+
+        with open(os.path.join(self.config_dir.name, 'config.json'), 'w') as f:
+            json.dump({'auths': {f'127.0.0.1:{server.server_address[1]}': {'auth': basic}}}, f)
+        self.assertEqual(DIGEST, registry.manifest_digest(self.image_name(server)))
+
+    def test_errors(self):
+        server = start_registry(self)
+        with self.assertRaises(RegistryError):
+            registry.manifest_digest(self.image_name(server, tag='missing'))
+        server = start_registry(self, auth='basic')
+        with self.assertRaises(RegistryError):
+            registry.manifest_digest(self.image_name(server))
+        with self.assertRaises(RegistryError):
+            registry.manifest_digest('127.0.0.1:1/nginx/nginx-ingress:2.4.2', timeout=2)
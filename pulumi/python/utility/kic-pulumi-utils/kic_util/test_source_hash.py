@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from kic_util import source_hash
+
+
+class TestSourceHash(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_tree(self, name: str, files: dict) -> str:
+        root = os.path.join(self.tmp_dir.name, name)
+        for rel_path, content in files.items():
+            path = os.path.join(root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+        return root
+
+    def test_identical_trees_in_different_locations_hash_equal(self):
+        files = {'Makefile': b'all:\n', 'cmd/main.go': b'package main\n', 'docs/a b.md': b'docs'}
+        first = self.make_tree('first', files)
+        second = self.make_tree('second', dict(reversed(list(files.items()))))
+        self.assertEqual(source_hash.tree_hash(first), source_hash.tree_hash(second))
+
+    def test_content_path_mode_and_links_change_hash(self):
+        root = self.make_tree('tree', {'Makefile': b'all:\n', 'build.sh': b'#!/bin/sh\n'})
+        hashes = {source_hash.tree_hash(root)}
+
+        with open(os.path.join(root, 'Makefile'), 'wb') as f:
+            f.write(b'all: build\n')
+        hashes.add(source_hash.tree_hash(root))
+
+        os.chmod(os.path.join(root, 'build.sh'), 0o755)
+        hashes.add(source_hash.tree_hash(root))
+
+        os.rename(os.path.join(root, 'build.sh'), os.path.join(root, 'make.sh'))
+        hashes.add(source_hash.tree_hash(root))
+
+        os.symlink('Makefile', os.path.join(root, 'GNUmakefile'))
+        hashes.add(source_hash.tree_hash(root))
+
+        self.assertEqual(5, len(hashes))
+
+    def test_excluded_names_ignored(self):
+        root = self.make_tree('tree', {'Makefile': b'all:\n'})
+        before = source_hash.tree_hash(root)
+        self.make_tree('tree', {'.git/HEAD': b'ref: refs/heads/main\n', 'sub/.git': b'gitdir: /elsewhere\n'})
+        # An empty directory left behind once its excluded content is skipped does not change the hash either
+        self.assertEqual(before, source_hash.tree_hash(root))
+
+    def test_combined_hash_independent_of_order(self):
+        self.assertEqual(source_hash.combined_hash(source='abc', make_target='debian-image'),
+                         source_hash.combined_hash(make_target='debian-image', source='abc'))
+        self.assertNotEqual(source_hash.combined_hash(source='abc', make_target='debian-image'),
+                            source_hash.combined_hash(source='abc', make_target='alpine-image'))
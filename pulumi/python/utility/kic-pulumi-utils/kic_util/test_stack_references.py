@@ -0,0 +1,72 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+import pulumi
+
+from kic_util import pulumi_config, stack_references
+
+
+class StackReferenceMocks(pulumi.runtime.Mocks):
+    def __init__(self):
+        self.stack_reads = []
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        if args.typ == 'pulumi:pulumi:StackReference':
+            self.stack_reads.append(args.name)
+            project = args.name.split('/')[1]
+            return args.name, {'name': args.name, 'outputs': {'kubeconfig': f'{project}-kubeconfig'},
+                               'secretOutputNames': []}
+        return f'{args.name}_id', args.inputs
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        return {}
+
+
+# The Pulumi runtime binds to the event loop that was current when it was configured
+loop = asyncio.new_event_loop()
+mocks = StackReferenceMocks()
+
+
+def project_name(project_dir: str) -> str:
+    return os.path.basename(project_dir)
+
+
+@mock.patch('kic_util.project_index.project_name', project_name)
+@mock.patch.dict(os.environ, {pulumi_config.PULUMI_USER_ENV_VAR: 'test-user'})
+class TestStackReferences(unittest.TestCase):
+    def setUp(self):
+        # Other tests may have replaced the current event loop
+        asyncio.set_event_loop(loop)
+        pulumi.runtime.set_mocks(mocks, project='test-project', stack='test-stack')
+        stack_references.clear()
+        mocks.stack_reads.clear()
+
+    def test_stack_reference_id(self):
+        self.assertEqual('test-user/secrets/test-stack', stack_references.stack_reference_id('kubernetes/secrets'))
+        self.assertEqual('other-user/secrets/other-stack',
+                         stack_references.stack_reference_id('kubernetes/secrets', stack_name='other-stack',
+                                                             pulumi_user='other-user'))
+
+    def test_stack_reference_is_memoized(self):
+        first = stack_references.stack_reference('infrastructure/kubeconfig')
+        second = stack_references.stack_reference('infrastructure/kubeconfig')
+        self.assertIs(first, second)
+        self.assertIsNot(first, stack_references.stack_reference('kubernetes/secrets'))
+
+    def test_no_reference_created_until_output_requested(self):
+        stack_references.stack_reference_id('kubernetes/secrets')
+        self.assertEqual(0, len(stack_references._references))
+
+    @pulumi.runtime.test
+    def test_require_output(self):
+        first = stack_references.require_output('infrastructure/kubeconfig', 'kubeconfig')
+        second = stack_references.require_output('infrastructure/kubeconfig', 'kubeconfig')
+        self.assertIs(first, second)
+
+        def check(value):
+            self.assertEqual('kubeconfig-kubeconfig', value)
+            self.assertEqual(['test-user/kubeconfig/test-stack'], mocks.stack_reads)
+
+        return first.apply(check)
@@ -45,6 +45,12 @@ class TestURLType(unittest.TestCase):
         actual = URLType.from_url(url)
         self.assertEqual(expected, actual, f'url [{url}] was misidentified')
 
+    def test_identify_url_type_local_git_repo_with_scheme(self):
+        url = 'file:///usr/local/src/kubernetes-ingress.git#v1.11.2'
+        expected = URLType.GIT_REPO
+        actual = URLType.from_url(url)
+        self.assertEqual(expected, actual, f'url [{url}] was misidentified')
+
     def test_identify_url_type_local_dir_without_scheme(self):
         local_path = tempfile.mkdtemp(prefix='unit_test_dir')
         atexit.register(lambda: shutil.rmtree(local_path))
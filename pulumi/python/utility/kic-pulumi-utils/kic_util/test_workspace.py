@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from kic_util import archive_download, workspace
+from kic_util.workspace import WorkspaceManager
+
+
+def writer(content: bytes, calls: list = None):
+    def prepare(path: str):
+        if calls is not None:
+            calls.append(path)
+        with open(os.path.join(path, 'file'), 'wb') as f:
+            f.write(content)
+    return prepare
+
+
+class TestWorkspaceManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manager = WorkspaceManager(root=self.tmp_dir.name, max_bytes=1000)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def age(self, name: str, seconds: float):
+        """Makes a workspace look as if it was last used the given number of seconds ago"""
+        ws = self.manager._read_metadata(name)
+        ws.last_used = time.time() - seconds
+        self.manager._write_metadata(ws)
+        self.manager.release(name)
+
+    def test_prepared_workspace_is_reused(self):
+        calls = []
+        first = self.manager.prepare('kic-v1', writer(b'v1', calls))
+        second = self.manager.prepare('kic-v1', writer(b'v1', calls))
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(calls))
+        # Reused by another manager, as it would be by another process
+        self.assertEqual(first, WorkspaceManager(root=self.tmp_dir.name).get('kic-v1'))
+
+    def test_failed_preparation_is_discarded(self):
+        def fail(path: str):
+            writer(b'partial')(path)
+            raise RuntimeError('download failed')
+
+        with self.assertRaises(RuntimeError):
+            self.manager.prepare('kic-v1', fail)
+        self.assertIsNone(self.manager.get('kic-v1'))
+        self.assertFalse(os.path.exists(self.manager.path('kic-v1')))
+
+        path = self.manager.prepare('kic-v1', writer(b'v1'))
+        with open(os.path.join(path, 'file'), 'rb') as f:
+            self.assertEqual(b'v1', f.read())
+
+    def test_incomplete_workspace_is_prepared_again(self):
+        os.makedirs(os.path.join(self.manager.path('kic-v1'), 'stale'))
+        path = self.manager.prepare('kic-v1', writer(b'v1'))
+        self.assertFalse(os.path.exists(os.path.join(path, 'stale')))
+
+    def test_least_recently_used_evicted_over_size_limit(self):
+        for name in ['oldest', 'older', 'newest']:
+            self.manager.prepare(name, writer(b'x' * 400))
+        self.age('oldest', workspace.MIN_IDLE_SECONDS + 30)
+        self.age('older', workspace.MIN_IDLE_SECONDS + 20)
+        self.age('newest', workspace.MIN_IDLE_SECONDS + 10)
+
+        self.assertEqual(['oldest'], self.manager.evict())
+        self.assertEqual({'older', 'newest'}, {w.name for w in self.manager.workspaces()})
+        self.assertFalse(os.path.exists(self.manager.path('oldest')))
+
+    def test_in_use_and_recent_workspaces_not_evicted(self):
+        for name in ['a', 'b', 'c']:
+            self.manager.prepare(name, writer(b'x' * 400))
+        # 'a' and 'b' are in use by this process and 'c' was used recently
+        self.manager.release('c')
+        self.assertEqual([], self.manager.evict())
+
+    def test_workspaces_in_use_by_other_processes_not_evicted(self):
+        path = self.manager.create_ephemeral('build_', writer(b'x'))
+        name = os.path.basename(path)
+        self.age(name, workspace.MIN_IDLE_SECONDS + 1)
+
+        # Another process has been using the workspace since before it became idle
+        other_process = WorkspaceManager(root=self.tmp_dir.name)
+        self.assertEqual(path, other_process.get(name))
+        self.age(name, workspace.MIN_IDLE_SECONDS + 1)
+        self.assertEqual([], self.manager.evict())
+        self.assertTrue(os.path.isdir(path))
+
+        other_process.release(name)
+        self.assertEqual([name], self.manager.evict())
+        self.assertFalse(os.path.exists(path))
+
+    def test_idle_ephemeral_workspaces_removed(self):
+        path = self.manager.create_ephemeral('archive_', writer(b'x'))
+        name = os.path.basename(path)
+        self.assertEqual([], self.manager.evict())
+        self.age(name, workspace.MIN_IDLE_SECONDS + 1)
+        self.assertEqual([name], self.manager.evict())
+
+    def test_background_cleanup_empties_trash(self):
+        self.manager.prepare('kic-v1', writer(b'v1'))
+        self.manager.remove('kic-v1')
+        self.manager.cleanup(background=True)
+        self.manager._cleanup_thread.join(timeout=10)
+        self.assertEqual([], os.listdir(os.path.join(self.tmp_dir.name, workspace.TRASH_DIR)))
+
+    def test_extract_stream_into_temp_dir_uses_named_workspace(self):
+        calls = []
+        first = archive_download.extract_stream_into_temp_dir(writer(b'v1', calls), temp_prefix='archive_',
+                                                              workspace_name='kic-v1', manager=self.manager)
+        second = archive_download.extract_stream_into_temp_dir(writer(b'v1', calls), temp_prefix='archive_',
+                                                               workspace_name='kic-v1', manager=self.manager)
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(calls))
+
+    def test_extract_stream_into_temp_dir_wraps_errors(self):
+        def fail(path: str):
+            raise RuntimeError('download failed')
+
+        with mock.patch('kic_util.workspace.default_manager', return_value=self.manager):
+            with self.assertRaises(archive_download.DownloadExtractError):
+                archive_download.extract_stream_into_temp_dir(fail, temp_prefix='archive_')
@@ -26,6 +26,8 @@ class URLType(Enum):
         is_tarball = result.path.endswith('.tar.gz')
 
         if result.scheme == 'file':
+            if result.path.endswith('.git'):
+                return URLType.GIT_REPO
             return URLType.LOCAL_TAR_GZ if is_tarball else URLType.LOCAL_PATH
 
         if result.path.endswith('.git'):
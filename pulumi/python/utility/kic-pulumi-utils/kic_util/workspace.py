@@ -0,0 +1,310 @@
+"""
+This file contains a manager for the working directories that source code is downloaded, extracted or checked out
+into. Workspaces are named, so that a directory prepared by one operation (or process) can be reused by the next
+one asking for the same name rather than being prepared again. Rather than deleting directories when the process
+exits, the least recently used workspaces are evicted once the workspaces exceed a size limit. Deleted workspaces
+are first moved aside, so that their removal can happen on a background thread.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Callable, List, Dict, IO
+
+# Environment variable that can be set to change the directory in which workspaces are created
+WORKSPACE_DIR_ENV_VAR = 'MARA_WORKSPACE_DIR'
+# Environment variable that can be set to change the maximum total size of all workspaces in bytes
+MAX_BYTES_ENV_VAR = 'MARA_WORKSPACE_MAX_BYTES'
+# Default directory in which workspaces are created
+DEFAULT_WORKSPACE_DIR = os.path.sep.join([os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                          'mara', 'workspaces'])
+# Default maximum total size of all workspaces in bytes
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# Workspaces used by any process within this many seconds are never evicted (workspaces that a process is using are
+# never evicted either, however long ago they were prepared)
+MIN_IDLE_SECONDS = 60 * 60
+# Suffix of the file recording the state of a workspace - a workspace without one is incomplete
+METADATA_SUFFIX = '.workspace.json'
+# Name of the directory that deleted workspaces are moved into before they are removed
+TRASH_DIR = '.trash'
+
+_NAME_PATTERN = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class Workspace:
+    """State of a prepared workspace"""
+    name: str
+    path: str
+    size: int
+    last_used: float
+    ephemeral: bool
+
+    def __init__(self, name: str, path: str, size: int, last_used: float, ephemeral: bool) -> None:
+        self.name = name
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+        self.ephemeral = ephemeral
+
+
+def _directory_size(path: str) -> int:
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class WorkspaceManager:
+    """Creates, reuses and evicts named workspace directories"""
+    root: str
+    max_bytes: int
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.root = root or os.environ.get(WORKSPACE_DIR_ENV_VAR) or DEFAULT_WORKSPACE_DIR
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(MAX_BYTES_ENV_VAR) or DEFAULT_MAX_BYTES)
+        self.max_bytes = max_bytes
+        # Lock files of the workspaces in use by this process, each holding a shared lock on its workspace
+        self._in_use: Dict[str, IO] = {}
+        self._lock = threading.Lock()
+        self._cleanup_thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def safe_name(name: str) -> str:
+        """Returns a form of the name that can be used as a directory name"""
+        return _NAME_PATTERN.sub('_', name).lstrip('.') or '_'
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, WorkspaceManager.safe_name(name))
+
+    def _metadata_path(self, name: str) -> str:
+        return self.path(name) + METADATA_SUFFIX
+
+    def _read_metadata(self, name: str) -> Optional[Workspace]:
+        try:
+            with open(self._metadata_path(name), 'r') as f:
+                data = json.load(f)
+            return Workspace(name=data['name'], path=self.path(name), size=data['size'],
+                             last_used=data['last_used'], ephemeral=data.get('ephemeral', False))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_metadata(self, workspace: Workspace):
+        path = self._metadata_path(workspace.name)
+        temp_path = f'{path}.{uuid.uuid4().hex}'
+        with open(temp_path, 'w') as f:
+            json.dump({'name': workspace.name, 'size': workspace.size, 'last_used': workspace.last_used,
+                       'ephemeral': workspace.ephemeral}, f)
+        os.replace(temp_path, path)
+
+    def _lock_path(self, name: str) -> str:
+        return self.path(name) + '.lock'
+
+    @contextmanager
+    def _locked(self, name: str):
+        """Holds an exclusive lock on the workspace that is shared with other processes, which waits until no
+        other process is using the workspace"""
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        with open(self._lock_path(name), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _hold(self, name: str) -> bool:
+        """Marks a workspace as in use by this process by holding a shared lock on it, which keeps other
+        processes from removing it
+        :return: false if the workspace was removed before the lock was taken
+        """
+        with self._lock:
+            if name in self._in_use:
+                return True
+
+        lock_file = open(self._lock_path(name), 'w')
+        # Only waits for a preparation or removal that is in progress
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+        if not os.path.isfile(self._metadata_path(name)):
+            lock_file.close()
+            return False
+
+        with self._lock:
+            if name in self._in_use:
+                # Held by another thread in the meantime
+                lock_file.close()
+            else:
+                self._in_use[name] = lock_file
+        return True
+
+    def get(self, name: str) -> Optional[str]:
+        """Returns the path of a prepared workspace, or None if no workspace with the name has been prepared"""
+        workspace = self._read_metadata(name)
+        if not workspace or not os.path.isdir(workspace.path) or not self._hold(workspace.name):
+            return None
+        workspace.last_used = time.time()
+        self._write_metadata(workspace)
+        return workspace.path
+
+    def prepare(self, name: str, prepare_func: Callable[[str], None], ephemeral: bool = False) -> str:
+        """Returns the path of a workspace, preparing it first if it has not been prepared before
+        :param name: name of the workspace - workspaces with the same name are expected to have the same content
+        :param prepare_func: function that populates the (empty) workspace directory given to it
+        :param ephemeral: if true, the workspace is removed once it has been idle rather than being kept for reuse
+        :return: path of the prepared workspace
+        """
+        existing = self.get(name)
+        if existing:
+            return existing
+
+        with self._locked(name):
+            path = self.path(name)
+            if not (os.path.isfile(self._metadata_path(name)) and os.path.isdir(path)):
+                if os.path.lexists(path):
+                    # Left behind by a preparation that did not complete
+                    self._discard(path)
+                os.makedirs(path, mode=0o700)
+                try:
+                    prepare_func(path)
+                except Exception:
+                    self._discard(path)
+                    raise
+
+                self._write_metadata(Workspace(name=name, path=path, size=_directory_size(path),
+                                               last_used=time.time(), ephemeral=ephemeral))
+
+        # The workspace was just used, so it is not evicted before this process holds it
+        if not self.get(name):
+            raise FileNotFoundError(f'workspace [{name}] was removed while it was being prepared')
+        self.evict()
+        return path
+
+    def create_ephemeral(self, prefix: str, prepare_func: Callable[[str], None]) -> str:
+        """Prepares a workspace with a unique name that is not reused"""
+        return self.prepare(name=f'{prefix}{uuid.uuid4().hex}', prepare_func=prepare_func, ephemeral=True)
+
+    def release(self, name: str):
+        """Marks a workspace as no longer in use by this process, so that it may be evicted"""
+        with self._lock:
+            lock_file = self._in_use.pop(name, None)
+        if lock_file:
+            lock_file.close()
+
+    def remove(self, name: str):
+        """Deletes a workspace once no other process is using it"""
+        self.release(name)
+        with self._locked(name):
+            self._remove(name)
+
+    def _remove(self, name: str):
+        try:
+            os.unlink(self._metadata_path(name))
+        except FileNotFoundError:
+            pass
+        self._discard(self.path(name))
+
+    def _remove_if_unused(self, name: str) -> bool:
+        """Deletes a workspace unless a process is using it
+        :return: true if the workspace was deleted
+        """
+        with open(self._lock_path(name), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                self._remove(name)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return True
+
+    def _discard(self, path: str):
+        """Moves a directory into the trash, from where it is removed by empty_trash"""
+        if not os.path.lexists(path):
+            return
+        trash_dir = os.path.join(self.root, TRASH_DIR)
+        os.makedirs(trash_dir, mode=0o700, exist_ok=True)
+        os.replace(path, os.path.join(trash_dir, uuid.uuid4().hex))
+
+    def empty_trash(self):
+        trash_dir = os.path.join(self.root, TRASH_DIR)
+        if not os.path.isdir(trash_dir):
+            return
+        for entry in os.listdir(trash_dir):
+            shutil.rmtree(os.path.join(trash_dir, entry), ignore_errors=True)
+
+    def workspaces(self) -> List[Workspace]:
+        """Returns all of the prepared workspaces"""
+        if not os.path.isdir(self.root):
+            return []
+        workspaces = []
+        for entry in os.listdir(self.root):
+            if entry.endswith(METADATA_SUFFIX):
+                workspace = self._read_metadata(entry[:-len(METADATA_SUFFIX)])
+                if workspace:
+                    workspaces.append(workspace)
+        return workspaces
+
+    def evict(self, max_bytes: Optional[int] = None) -> List[str]:
+        """Removes idle ephemeral workspaces, and then the least recently used workspaces until the total size of
+        all workspaces is within the limit. Workspaces in use by any process or recently used are kept.
+        :param max_bytes: maximum total size of all workspaces (defaults to the manager's limit)
+        :return: names of the evicted workspaces
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        with self._lock:
+            in_use = set(self._in_use.keys())
+
+        workspaces = sorted(self.workspaces(), key=lambda w: w.last_used)
+        total = sum(w.size for w in workspaces)
+        evicted = []
+        for workspace in workspaces:
+            if workspace.name in in_use or now - workspace.last_used < MIN_IDLE_SECONDS:
+                continue
+            if (workspace.ephemeral or total > max_bytes) and self._remove_if_unused(workspace.name):
+                total -= workspace.size
+                evicted.append(workspace.name)
+        return evicted
+
+    def cleanup(self, background: bool = False):
+        """Evicts workspaces over the size limit and removes deleted workspaces from disk
+        :param background: if true, the cleanup runs on a daemon thread, so that it never delays the process
+                           from exiting
+        """
+        def run():
+            self.evict()
+            self.empty_trash()
+
+        if not background:
+            run()
+            return
+
+        with self._lock:
+            if self._cleanup_thread and self._cleanup_thread.is_alive():
+                return
+            self._cleanup_thread = threading.Thread(target=run, name='workspace-cleanup', daemon=True)
+            self._cleanup_thread.start()
+
+
+_default_manager: Optional[WorkspaceManager] = None
+_default_manager_lock = threading.Lock()
+
+
+def default_manager() -> WorkspaceManager:
+    """Returns the workspace manager shared within this process, starting a background cleanup the first time"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = WorkspaceManager()
+            _default_manager.cleanup(background=True)
+        return _default_manager